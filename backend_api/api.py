@@ -1,35 +1,98 @@
+import asyncio
 import logging
 
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from ninja import Router, File, UploadedFile
-from pydantic_ai import BinaryContent
+from ninja.errors import HttpError
 
-from .ocr import get_receipt_agent
-from .schemas import OCRReceiptPostOut
-from .services import catbox_upload_file, cloudinary_upload_file
+from .ocr_jobs import create_job, get_job, job_events
+from .receipts import process_receipt, stream_receipt_events
+from .schemas import OCRJobOut, OCRReceiptBatchItemOut, OCRReceiptPostOut
+from .uploads import ReceiptUpload
 
 logger = logging.getLogger(__name__)
 
 router = Router()
 
+# Keep proxies (and nginx's buffering) from holding events back.
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
 
 @router.post("/receipt-items/", response={200: OCRReceiptPostOut})
-async def post_ocr_receipt(request, file: File[UploadedFile]):
-    agent = get_receipt_agent()
-
-    result = await agent.run(
-        [
-            """
-            here is the image receipt:
-            """,
-            BinaryContent(data=file.read(), media_type="image/jpg"),
-        ]
+async def post_ocr_receipt(
+    request, file: File[UploadedFile], bypass_cache: bool = False
+):
+    # One read-only view of the upload, shared by the hasher, preprocessing and
+    # the uploaders; nothing below takes its own copy of the file.
+    upload = ReceiptUpload.from_uploaded_file(file)
+    return await process_receipt(upload, bypass_cache)
+
+
+@router.post("/receipt-items/stream/")
+async def post_ocr_receipt_stream(
+    request, file: File[UploadedFile], bypass_cache: bool = False
+):
+    upload = ReceiptUpload.from_uploaded_file(file)
+
+    return StreamingHttpResponse(
+        stream_receipt_events(upload, bypass_cache),
+        content_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.post("/receipt-items/batch/", response={200: list[OCRReceiptBatchItemOut]})
+async def post_ocr_receipts_batch(
+    request, files: File[list[UploadedFile]], bypass_cache: bool = False
+):
+    if len(files) > settings.RECEIPT_BATCH_MAX_FILES:
+        raise HttpError(
+            400, f"At most {settings.RECEIPT_BATCH_MAX_FILES} receipts per batch."
+        )
+
+    llm_slots = asyncio.Semaphore(settings.RECEIPT_BATCH_LLM_CONCURRENCY)
+
+    async def process(index: int, file: UploadedFile) -> OCRReceiptBatchItemOut:
+        item = OCRReceiptBatchItemOut(index=index, filename=file.name or "")
+        try:
+            upload = ReceiptUpload.from_uploaded_file(file)
+            item.receipt = await process_receipt(upload, bypass_cache, llm_slots)
+        except HttpError as e:
+            item.error = str(e)
+        except Exception as e:
+            # One bad receipt is reported in place; the rest of the batch stands.
+            logger.warning("Batch receipt %d (%s) failed: %s", index, file.name, e)
+            item.error = str(e) or type(e).__name__
+        return item
+
+    return await asyncio.gather(
+        *(process(index, file) for index, file in enumerate(files))
     )
-    results = result.output
 
-    try:
-        url = cloudinary_upload_file(file)
-    except Exception as e:
-        logger.warning("Cloudinary upload failed; falling back to catbox: %s", e)
-        url = catbox_upload_file(file)
 
-    return OCRReceiptPostOut(**results.model_dump(), receipt_image_url=url)
+@router.post("/receipt-jobs/", response={202: OCRJobOut})
+async def post_ocr_receipt_job(
+    request, file: File[UploadedFile], bypass_cache: bool = False
+):
+    upload = ReceiptUpload.from_uploaded_file(file)
+    return 202, await create_job(upload, bypass_cache)
+
+
+@router.get("/receipt-jobs/{job_id}/", response={200: OCRJobOut})
+async def get_ocr_receipt_job(request, job_id: str):
+    if (job := await get_job(job_id)) is None:
+        raise HttpError(404, "OCR job not found or expired.")
+    return job
+
+
+@router.get("/receipt-jobs/{job_id}/events/")
+async def stream_ocr_receipt_job(request, job_id: str):
+    if await get_job(job_id) is None:
+        raise HttpError(404, "OCR job not found or expired.")
+
+    return StreamingHttpResponse(
+        job_events(job_id),
+        content_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
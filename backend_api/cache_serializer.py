@@ -0,0 +1,129 @@
+"""Compact serialization for the Redis cache.
+
+django-redis pickles every value by default. Pickled pydantic models are large
+and slow to load, and they stop loading once the class is renamed or moved.
+``CacheSerializer`` writes JSON with orjson instead.
+
+It is schema-aware for the models in ``CACHED_MODELS``. Such a model is written
+as its JSON dump plus a ``__model__`` tag naming the class. On load a single
+``model_validate`` restores what JSON flattened (datetimes, nested models), so
+nested models need no tags of their own. A model that has gained defaulted
+fields or dropped some still loads. One that no longer validates reads as a
+cache miss.
+
+Each payload starts with a one-byte format marker:
+
+- ``j``: orjson JSON, possibly with tagged models.
+- ``b``: raw ``bytes`` (e.g. queued OCR job images), stored as is.
+- ``\\x80``: pickle, the fallback for anything JSON can't round-trip exactly
+  (datetimes outside a model, dataclasses, sets, non-string keys, unregistered
+  models, ...). It is also the first byte of every entry written by the previous
+  pickle serializer, so those still load.
+
+Like django-redis's own ``JSONSerializer``, tuples come back as lists.
+
+``ThresholdCompressor`` wraps any django-redis compressor and only compresses
+payloads of at least ``COMPRESS_MIN_LENGTH`` bytes. Smaller ones are not worth
+the CPU, and django-redis reads them back uncompressed. Raw ``bytes`` payloads
+are never compressed: the only ones we cache are JPEG/HEIF/PNG images, which
+are compressed already. Any other payload is stored as is when compressing it
+saves less than ``MIN_COMPRESSION_SAVING``.
+"""
+
+import logging
+import pickle
+
+import orjson
+from django.utils.module_loading import import_string
+from django_redis.compressors.base import BaseCompressor
+from django_redis.serializers.base import BaseSerializer
+from pydantic import BaseModel, ValidationError
+
+from backend_api.dataclasses.receipt_item import ReceiptItemData
+from backend_api.dataclasses.settleup import SettleUpGroup
+from backend_api.schemas import OCRReceiptPostOut
+
+logger = logging.getLogger(__name__)
+
+JSON, BYTES = b"j", b"b"
+MODEL_TAG = "__model__"
+# Models written as tagged JSON. Renaming one orphans its cached entries.
+CACHED_MODELS: dict[str, type[BaseModel]] = {
+    cls.__name__: cls for cls in (SettleUpGroup, OCRReceiptPostOut, ReceiptItemData)
+}
+OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+_TAG_BYTES = orjson.dumps(MODEL_TAG) + b":"
+# Fraction of a payload compression must save for the compressed form to be kept.
+MIN_COMPRESSION_SAVING = 0.1
+
+
+class CacheSerializer(BaseSerializer):
+    def dumps(self, value) -> bytes:
+        if isinstance(value, bytes):
+            return BYTES + value
+
+        tagged = 0
+
+        def default(obj):
+            nonlocal tagged
+            name = type(obj).__name__
+            if CACHED_MODELS.get(name) is not type(obj):
+                raise TypeError
+            tagged += 1
+            return {MODEL_TAG: name, **obj.model_dump(mode="json")}
+
+        try:
+            data = orjson.dumps(value, default=default, option=OPTIONS)
+        except TypeError:
+            return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        # A plain dict that happens to use the tag key would be revived as a model.
+        if data.count(_TAG_BYTES) != tagged:
+            return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return JSON + data
+
+    def loads(self, value: bytes):
+        marker, data = value[:1], value[1:]
+        if marker == BYTES:
+            return data
+        if marker != JSON:
+            return pickle.loads(value)
+
+        decoded = orjson.loads(data)
+        if _TAG_BYTES not in data:
+            return decoded
+        try:
+            return _revive(decoded)
+        except (KeyError, ValidationError) as e:
+            logger.warning("Cached model no longer loads; treating as a miss: %s", e)
+            return None
+
+
+class ThresholdCompressor(BaseCompressor):
+    """Compress with ``COMPRESSOR_BACKEND`` where it pays off (see module docs)."""
+
+    def __init__(self, options):
+        self._compressor = import_string(options["COMPRESSOR_BACKEND"])(options)
+        self.min_length = options["COMPRESS_MIN_LENGTH"]
+
+    def compress(self, value: bytes) -> bytes:
+        if len(value) < self.min_length or value[:1] == BYTES:
+            return value
+        compressed = self._compressor.compress(value)
+        if len(compressed) > len(value) * (1 - MIN_COMPRESSION_SAVING):
+            return value
+        return compressed
+
+    def decompress(self, value: bytes) -> bytes:
+        return self._compressor.decompress(value)
+
+
+def _revive(value):
+    """Rebuild tagged models through their schema."""
+    if isinstance(value, list):
+        return [_revive(item) for item in value]
+    if isinstance(value, dict):
+        if (name := value.pop(MODEL_TAG, None)) is not None:
+            return CACHED_MODELS[name].model_validate(value)
+        return {key: _revive(item) for key, item in value.items()}
+    return value
@@ -27,9 +27,10 @@ class ReceiptItemData(BaseModel):
 
 
 class ReceiptData(BaseModel):
-    receipt_items: list[ReceiptItemData] = Field(
-        default_factory=list, description="The list of items in the receipt"
-    )
+    # Field order is the order the model writes them in. Header fields come
+    # first so a streamed run can validate (and report) the shop and date while
+    # the items are still arriving; the required shop names would otherwise
+    # fail every partial validation until the whole item list was written.
     en_shop_name: str = Field(
         ..., description="The name of the shop in the receipt in english"
     )
@@ -45,3 +46,6 @@ class ReceiptData(BaseModel):
     receipt_date: datetime = Field(
         default_factory=timezone.now, description="The date of the receipt"
     )
+    receipt_items: list[ReceiptItemData] = Field(
+        default_factory=list, description="The list of items in the receipt"
+    )
@@ -0,0 +1,39 @@
+"""Shared async HTTP connection pool.
+
+One keep-alive, HTTP/2-capable ``httpx.AsyncClient`` is created lazily per
+event loop and reused by every request on it, so outbound calls (e.g. to the
+Settle Up Firebase REST API) skip the TCP+TLS handshake after the first one.
+
+Keyed by loop rather than a plain module global because an ``AsyncClient`` is
+bound to the loop it first ran on: under hypercorn each worker has a single
+loop (one pool per process), while ``runserver`` spins a loop per async
+request, which would otherwise hit a closed-loop error on the shared client.
+"""
+
+import asyncio
+from weakref import WeakKeyDictionary
+
+import httpx
+from django.conf import settings
+
+_clients: WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+    WeakKeyDictionary()
+)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the pooled client for the running event loop, creating it once."""
+    loop = asyncio.get_running_loop()
+
+    if (client := _clients.get(loop)) is None:
+        client = httpx.AsyncClient(
+            http2=True,
+            timeout=settings.HTTP_CLIENT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+            ),
+        )
+        _clients[loop] = client
+
+    return client
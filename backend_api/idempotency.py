@@ -0,0 +1,112 @@
+"""At-most-once transaction posting.
+
+A mobile client that retries ``POST /settle-up/transactions/`` after a timeout
+must not create a second expense. Each request is identified by its
+``Idempotency-Key`` header, or by a hash of the payload when the header is
+absent. The outcome is recorded in Redis, so a retry gets the stored result
+without touching Firebase. Payload hashes are only remembered for
+``TRANSACTION_IDEMPOTENCY_PAYLOAD_TIMEOUT``: long enough to cover retries,
+short enough that the same coffee bought again later is not swallowed.
+
+The record is written *before* the transaction. It reserves a push key
+(``push_ids``), and the transaction is PUT at that key rather than POSTed.
+A retry after a write that landed but timed out therefore overwrites the same
+transaction instead of adding one. A record without a result just means "try
+again, at the same key".
+
+Concurrent duplicates are coalesced behind a short Redis lock: the first
+request writes, the others wait for its result (or take over if it fails).
+"""
+
+import asyncio
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from ninja.errors import HttpError
+
+from backend_api.push_ids import generate_push_id
+from backend_api.schemas import TransactionPostIn
+
+KEY_PREFIX = "transaction_idempotency"
+# How often a coalesced duplicate checks whether the first request finished.
+POLL_INTERVAL = 0.05
+
+
+def idempotency_key(payload: TransactionPostIn, header: str | None) -> str:
+    if header:
+        scope = "key:" + hashlib.sha256(header.encode()).hexdigest()
+    else:
+        scope = "payload:" + payload_fingerprint(payload)
+    return f"{KEY_PREFIX}:{scope}"
+
+
+def payload_fingerprint(payload: TransactionPostIn) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+async def create_transaction_once(
+    client, payload: TransactionPostIn, header: str | None = None
+) -> tuple[str, bool]:
+    """Create the transaction at most once per key.
+
+    Returns the transaction id and whether it was replayed from an earlier
+    request. Raises 422 if an ``Idempotency-Key`` is reused with a different
+    payload, and 409 if a duplicate is still in flight when the lock expires.
+    """
+    key = idempotency_key(payload, header)
+    timeout = (
+        settings.TRANSACTION_IDEMPOTENCY_TIMEOUT
+        if header
+        else settings.TRANSACTION_IDEMPOTENCY_PAYLOAD_TIMEOUT
+    )
+    lock_key = f"{key}:lock"
+    fingerprint = payload_fingerprint(payload)
+    deadline = time.monotonic() + settings.TRANSACTION_IDEMPOTENCY_LOCK_TIMEOUT
+
+    while True:
+        record = await _get_record(key, fingerprint)
+        if record and record.get("done"):
+            return record["transaction_id"], True
+
+        token = uuid.uuid4().hex
+        if await cache.aadd(
+            lock_key, token, timeout=settings.TRANSACTION_IDEMPOTENCY_LOCK_TIMEOUT
+        ):
+            try:
+                return await _create(client, payload, key, fingerprint, timeout)
+            finally:
+                if await cache.aget(lock_key) == token:
+                    await cache.adelete(lock_key)
+
+        if time.monotonic() >= deadline:
+            raise HttpError(
+                409, "A request with this idempotency key is still in progress."
+            )
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+async def _get_record(key: str, fingerprint: str) -> dict | None:
+    record = await cache.aget(key)
+    if record and record["fingerprint"] != fingerprint:
+        raise HttpError(422, "Idempotency-Key was already used for another payload.")
+    return record
+
+
+async def _create(
+    client, payload, key: str, fingerprint: str, timeout: int
+) -> tuple[str, bool]:
+    # Re-read under the lock: the previous holder may have just finished.
+    record = await _get_record(key, fingerprint)
+    if record is None:
+        record = {"fingerprint": fingerprint, "transaction_id": generate_push_id()}
+        await cache.aset(key, record, timeout=timeout)
+    elif record.get("done"):
+        return record["transaction_id"], True
+
+    await client.put_transaction(payload, record["transaction_id"])
+
+    await cache.aset(key, {**record, "done": True}, timeout=timeout)
+    return record["transaction_id"], False
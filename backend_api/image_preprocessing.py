@@ -0,0 +1,192 @@
+"""Receipt image preprocessing before LLM submission.
+
+Phone photos arrive as multi-megabyte, 4000px JPEG/PNG/HEIC files, often with
+the wrong declared type. The LLM only needs legible text, so each image is
+normalized once before ``agent.run``: EXIF rotation, grayscale, deskew, crop to
+the (bright) receipt area, downscale to ``RECEIPT_IMAGE_MAX_EDGE``, contrast
+stretch, and a JPEG re-encode with the media type that matches the bytes. That
+cuts request bytes, vision tokens and LLM latency.
+
+Only the LLM payload is preprocessed; the stored receipt image is the original
+upload. Uploads Pillow can't decode never get here: ``ReceiptUpload`` rejects
+them. Input may be the shared upload ``memoryview``; it is decoded in place,
+never copied.
+"""
+
+import io
+import math
+
+from django.conf import settings
+from PIL import Image, ImageOps, ImageStat, UnidentifiedImageError
+
+from .uploads import BufferReader, sniff_media_type
+
+# Bump when the pipeline changes output for the same settings (cache key input).
+PIPELINE_VERSION = 1
+
+# Analysis (deskew / crop) runs on a thumbnail this size; it only needs layout.
+ANALYSIS_EDGE = 400
+SKEW_ANGLES = range(-10, 11)
+# Rotate only if the best angle's row-profile variance beats level by this
+# share; on blank or low-texture images the winner is just noise.
+MIN_SKEW_GAIN = 0.1
+# Crop only if the bright region is a meaningful but not total part of the frame.
+MIN_CROP_AREA = 0.2
+MAX_CROP_AREA = 0.9
+
+# OpenAI's published image costing for patch-based models (gpt-5-mini).
+MAX_PATCHES = 1536
+TOKEN_MULTIPLIER = 1.62
+
+
+def preprocess_fingerprint() -> str:
+    """Identify the preprocessing output for a given input (for cache keys)."""
+    if not settings.RECEIPT_IMAGE_PREPROCESS:
+        return "raw"
+    return (
+        f"v{PIPELINE_VERSION}-{settings.RECEIPT_IMAGE_MAX_EDGE}"
+        f"-q{settings.RECEIPT_IMAGE_JPEG_QUALITY}"
+    )
+
+
+def image_size(image: bytes | memoryview) -> tuple[int, int]:
+    """Width and height of the encoded image, ``(0, 0)`` if undecodable."""
+    try:
+        with Image.open(BufferReader(memoryview(image))) as img:
+            return img.size
+    except (UnidentifiedImageError, OSError):
+        return 0, 0
+
+
+def estimate_vision_tokens(width: int, height: int) -> int:
+    """Patch-based image token estimate for the gpt-5-mini family."""
+    patches = math.ceil(width / 32) * math.ceil(height / 32)
+    if patches > MAX_PATCHES:
+        shrink = math.sqrt(32**2 * MAX_PATCHES / (width * height))
+        shrink *= min(
+            math.floor(width * shrink / 32) / (width * shrink / 32),
+            math.floor(height * shrink / 32) / (height * shrink / 32),
+        )
+        width, height = int(width * shrink), int(height * shrink)
+        patches = math.ceil(width / 32) * math.ceil(height / 32)
+    return math.ceil(patches * TOKEN_MULTIPLIER)
+
+
+def crop_bottom(image: bytes, fraction: float) -> bytes | None:
+    """The bottom ``fraction`` of the image as JPEG, ``None`` if undecodable."""
+    try:
+        with Image.open(BufferReader(memoryview(image))) as img:
+            width, height = img.size
+            img = img.crop((0, int(height * (1 - fraction)), width, height))
+    except (UnidentifiedImageError, OSError):
+        return None
+    if img.mode not in ("L", "RGB"):
+        img = img.convert("RGB")
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=settings.RECEIPT_IMAGE_JPEG_QUALITY)
+    return out.getvalue()
+
+
+def estimate_skew(img: Image.Image) -> int:
+    """Angle (degrees) that best aligns text rows horizontally.
+
+    Projection-profile method: text lines produce alternating dark/bright row
+    means, so the rotation that maximizes the variance of the row profile is
+    the one that levels them. Resizing to one column yields row means in C.
+    Returns 0 unless some angle scores ``MIN_SKEW_GAIN`` better than level.
+    """
+    thumb = ImageOps.invert(img.copy())
+    thumb.thumbnail((ANALYSIS_EDGE, ANALYSIS_EDGE))
+    # Only score the middle that every rotation still covers: the fill in the
+    # corners would otherwise favour the steepest angles.
+    slope = math.tan(math.radians(max(map(abs, SKEW_ANGLES))))
+    margin_x = math.ceil(thumb.height / 2 * slope)
+    margin_y = math.ceil(thumb.width / 2 * slope)
+    inner = (margin_x, margin_y, thumb.width - margin_x, thumb.height - margin_y)
+    if inner[2] <= inner[0] or inner[3] <= inner[1]:
+        return 0  # too narrow to tell
+
+    def score(angle: int) -> float:
+        rotated = thumb.rotate(angle, resample=Image.Resampling.BILINEAR).crop(inner)
+        profile = rotated.resize((1, rotated.height), Image.Resampling.BOX)
+        return ImageStat.Stat(profile).var[0]
+
+    scores = {angle: score(angle) for angle in SKEW_ANGLES}
+    best = max(SKEW_ANGLES, key=lambda angle: (scores[angle], -abs(angle)))
+    if scores[best] <= scores[0] * (1 + MIN_SKEW_GAIN):
+        return 0
+    return best
+
+
+def receipt_bbox(img: Image.Image) -> tuple[int, int, int, int] | None:
+    """Bounding box of the bright paper against a darker background, if any."""
+    thumb = img.copy()
+    thumb.thumbnail((ANALYSIS_EDGE, ANALYSIS_EDGE))
+    threshold = max(ImageStat.Stat(thumb).mean[0] + 20, 160)
+    bbox = thumb.point(lambda p: 255 if p > threshold else 0).getbbox()
+
+    if bbox is None:
+        return None
+    left, top, right, bottom = bbox
+    area = (right - left) * (bottom - top) / (thumb.width * thumb.height)
+    if not MIN_CROP_AREA <= area <= MAX_CROP_AREA:
+        return None
+
+    scale = img.width / thumb.width
+    return (
+        int(left * scale),
+        int(top * scale),
+        min(int(right * scale) + 1, img.width),
+        min(int(bottom * scale) + 1, img.height),
+    )
+
+
+def preprocess_receipt_image(image: bytes | memoryview) -> tuple[bytes, str]:
+    """Return the LLM-ready ``(bytes, media_type)`` for an uploaded image.
+
+    Raises ``UnidentifiedImageError`` (or ``OSError``, for a corrupt file) if
+    Pillow can't decode it.
+    """
+    if not settings.RECEIPT_IMAGE_PREPROCESS:
+        if (media_type := sniff_media_type(image)) is None:
+            raise UnidentifiedImageError("Receipt image format is not supported.")
+        return bytes(image), media_type
+
+    max_edge = settings.RECEIPT_IMAGE_MAX_EDGE
+    # Rotating and cropping full 12MP frames dominates the cost; work at a size
+    # that still leaves headroom for the crop. JPEG decodes at reduced scale.
+    work_edge = int(max_edge * 1.5)
+
+    with Image.open(BufferReader(memoryview(image))) as original:
+        original.draft("L", (work_edge, work_edge))
+        img = ImageOps.exif_transpose(original).convert("L")
+
+    img.thumbnail((work_edge, work_edge), Image.Resampling.BILINEAR)
+    width, height = img.size
+
+    if angle := estimate_skew(img):
+        img = img.rotate(
+            angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=0
+        )
+    if bbox := receipt_bbox(img):
+        img = img.crop(bbox)
+    if img.width > width or img.height > height:
+        # Rotation grew the canvas and no crop took it back: trim the added
+        # corners, so deskewing never costs more vision tokens than it saves.
+        left = max(img.width - width, 0) // 2
+        top = max(img.height - height, 0) // 2
+        img = img.crop(
+            (left, top, left + min(img.width, width), top + min(img.height, height))
+        )
+
+    img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    img = ImageOps.autocontrast(img, cutoff=1)
+
+    out = io.BytesIO()
+    img.save(
+        out,
+        format="JPEG",
+        quality=settings.RECEIPT_IMAGE_JPEG_QUALITY,
+        optimize=True,
+    )
+    return out.getvalue(), "image/jpeg"
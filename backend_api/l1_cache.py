@@ -0,0 +1,110 @@
+"""Per-process L1 cache in front of the shared Redis cache.
+
+Hot Settle Up lookups (the group listing, a group's members) are read on
+almost every request. ``L1Cache`` keeps recently read entries in process memory,
+so a warm worker serves them without a Redis round trip. Memory is bounded:
+entries expire after ``ttl`` seconds, and the least recently used one is
+evicted past ``maxsize``.
+
+Cross-worker invalidation uses a version stamp. ``VersionStamp`` is a counter
+in Redis that writers bump whenever they change or drop an entry. Every L1
+entry remembers the stamp it was filled under and stops matching once the
+stamp moves on. Readers re-read the stamp at most once per ``check_interval``,
+so another worker's write is visible within that interval, and in-between reads
+cost nothing.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class L1Cache:
+    """A thread-safe TTL + LRU mapping. ``maxsize <= 0`` disables it."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[object, float, int]] = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: str, version: int):
+        """The value cached under ``key`` and ``version``, or ``MISSING``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic() or entry[2] != version:
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value, version: int) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class VersionStamp:
+    """A Redis counter, read by each process at most once per interval."""
+
+    def __init__(self, key: str, check_interval: float):
+        self.key = key
+        self.check_interval = check_interval
+        self._version = 0
+        self._checked_at = float("-inf")
+
+    def _due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+    def _seen(self, version) -> int:
+        self._version, self._checked_at = int(version or 0), time.monotonic()
+        return self._version
+
+    def current(self, cache) -> int:
+        return self._seen(cache.get(self.key)) if self._due() else self._version
+
+    async def acurrent(self, cache) -> int:
+        return self._seen(await cache.aget(self.key)) if self._due() else self._version
+
+    def bump(self, cache) -> int:
+        """Invalidate every process's L1 entries filled under older stamps.
+
+        Returns the new stamp, to tag the entry just written with.
+        """
+        return self._seen(
+            1 if cache.add(self.key, 1, timeout=None) else cache.incr(self.key)
+        )
+
+    async def abump(self, cache) -> int:
+        if await cache.aadd(self.key, 1, timeout=None):
+            return self._seen(1)
+        return self._seen(await cache.aincr(self.key))
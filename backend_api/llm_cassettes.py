@@ -0,0 +1,238 @@
+"""Record and replay the receipt agent's LLM calls.
+
+A cassette holds one receipt extraction: every model response in call order,
+each with a fingerprint of the request that produced it and the time the call
+took, plus the results of the tool calls made along the way. Record one by
+running the agent with ``RecordingModel`` wrapping the real model. Replay it by
+running the agent with ``ReplayModel``: the agent, its output validator and
+its tools run for real, but each model call is answered from the cassette and
+each tool call from the recorded results (see ``replay_tools``). Nothing is
+sent to the LLM or to Google.
+
+A replayed request whose fingerprint differs from the recorded one means the
+prompt, the instructions or the image preprocessing changed since recording.
+The recorded response is still served and the call counted in
+``ReplayModel.stale``. A run that needs more calls than were recorded, e.g.
+because a stricter validator now rejects a recorded answer, raises
+``CassetteMiss``. A tool call with arguments that were never recorded is
+counted in ``ReplayedTools.misses``.
+
+Only non-streamed runs (``extract_receipt``) are recorded and replayed.
+"""
+
+import hashlib
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    RetryPromptPart,
+    ToolCallPart,
+    ToolReturnPart,
+)
+from pydantic_ai.models import Model
+from pydantic_ai.models.wrapper import WrapperModel
+
+from backend_api import ocr
+
+# Fields that differ between two runs of the same conversation.
+_VOLATILE_KEYS = frozenset({"timestamp", "run_id"})
+
+
+class CassetteMiss(Exception):
+    """The replayed run asked for something the cassette doesn't hold."""
+
+
+@dataclass
+class Cassette:
+    config: dict = field(default_factory=dict)
+    # Per model call: the request fingerprint, the model that answered it,
+    # seconds taken, and the response.
+    calls: list[dict] = field(default_factory=list)
+    # Per tool call: its name, arguments and what it returned.
+    tools: list[dict] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: Path) -> "Cassette":
+        data = json.loads(Path(path).read_text())
+        return cls(data["config"], data["calls"], data["tools"])
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"config": self.config, "calls": self.calls, "tools": self.tools}
+        path.write_text(json.dumps(data, indent=1, ensure_ascii=False) + "\n")
+
+    def responses(self) -> list[ModelResponse]:
+        return ModelMessagesTypeAdapter.validate_python(
+            [call["response"] for call in self.calls]
+        )
+
+    @property
+    def duration(self) -> float:
+        return sum(call["duration"] for call in self.calls)
+
+
+def request_fingerprint(messages: list[ModelMessage]) -> str:
+    """SHA-256 of a conversation, ignoring timestamps and run ids."""
+    data = _strip(ModelMessagesTypeAdapter.dump_python(messages, mode="json"))
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def _strip(value):
+    if isinstance(value, dict):
+        return {k: _strip(v) for k, v in value.items() if k not in _VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_strip(item) for item in value]
+    return value
+
+
+class _Conversation:
+    """The messages of the latest request plus its response."""
+
+    messages: list[ModelMessage]
+
+    def __init__(self):
+        self.messages = []
+
+    def _seen(self, messages: list[ModelMessage], response: ModelResponse) -> None:
+        self.messages = [*messages, response]
+
+    @property
+    def retries(self) -> int:
+        """Retry prompts sent, for the output validator or a tool."""
+        return sum(
+            isinstance(part, RetryPromptPart)
+            for message in self.messages
+            if isinstance(message, ModelRequest)
+            for part in message.parts
+        )
+
+
+class RecordingModel(_Conversation, WrapperModel):
+    """Pass calls through to ``wrapped``, recording them into ``cassette``."""
+
+    def __init__(self, wrapped: Model, cassette: Cassette | None = None):
+        WrapperModel.__init__(self, wrapped)
+        _Conversation.__init__(self)
+        self.cassette = cassette if cassette is not None else Cassette()
+        self._tools_recorded = 0
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        start = time.perf_counter()
+        response = await super().request(
+            messages, model_settings, model_request_parameters
+        )
+        self.cassette.calls.append(
+            {
+                "request": request_fingerprint(messages),
+                "model": self.wrapped.model_name,
+                "duration": time.perf_counter() - start,
+                "response": ModelMessagesTypeAdapter.dump_python(
+                    [response], mode="json"
+                )[0],
+            }
+        )
+        self._seen(messages, response)
+        # Several models (e.g. the cascade's tiers) may share one cassette.
+        results = tool_results(self.messages)
+        self.cassette.tools.extend(results[self._tools_recorded :])
+        self._tools_recorded = len(results)
+        return response
+
+
+class ReplayModel(_Conversation, Model):
+    """Answer each model call with the next response recorded in ``cassette``."""
+
+    def __init__(self, cassette: Cassette):
+        Model.__init__(self)
+        _Conversation.__init__(self)
+        self.cassette = cassette
+        self._responses = cassette.responses()
+        self.served = 0
+        self.stale = 0
+
+    @property
+    def model_name(self) -> str:
+        return self.cassette.config.get("model", "replay")
+
+    @property
+    def system(self) -> str:
+        return "replay"
+
+    @property
+    def duration(self) -> float:
+        """Recorded seconds of the calls served so far."""
+        return sum(call["duration"] for call in self.cassette.calls[: self.served])
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        if self.served >= len(self._responses):
+            raise CassetteMiss(f"call {self.served + 1} was not recorded")
+        if request_fingerprint(messages) != self.cassette.calls[self.served]["request"]:
+            self.stale += 1
+        response = self._responses[self.served]
+        self.served += 1
+        self._seen(messages, response)
+        return response
+
+
+def tool_results(messages: list[ModelMessage]) -> list[dict]:
+    """Each tool call in ``messages`` with its arguments and what it returned."""
+    calls = {
+        part.tool_call_id: part
+        for message in messages
+        if isinstance(message, ModelResponse)
+        for part in message.parts
+        if isinstance(part, ToolCallPart)
+    }
+    return [
+        {
+            "tool_name": part.tool_name,
+            "args": calls[part.tool_call_id].args_as_dict(),
+            "content": part.content,
+        }
+        for message in messages
+        if isinstance(message, ModelRequest)
+        for part in message.parts
+        if isinstance(part, ToolReturnPart) and part.tool_call_id in calls
+    ]
+
+
+class ReplayedTools:
+    """The receipt agent's translate tool, answered from a cassette.
+
+    The tool turns any exception into a retry prompt for the model, so a
+    translation that was never recorded is counted in ``misses`` rather than
+    raised.
+    """
+
+    def __init__(self, cassette: Cassette):
+        self.translations = {
+            tuple(tool["args"]["texts"]): tool["content"]
+            for tool in cassette.tools
+            if tool["tool_name"] == "translate_jp_to_en_texts"
+        }
+        self.misses = 0
+
+    async def translate_texts(self, texts: list[str]) -> list[str]:
+        if (result := self.translations.get(tuple(texts))) is None:
+            self.misses += 1
+            raise CassetteMiss(f"translation of {texts} was not recorded")
+        return result
+
+
+@contextmanager
+def replay_tools(cassette: Cassette):
+    """Serve the agent's tool calls from ``cassette`` inside the block."""
+    tools = ReplayedTools(cassette)
+    original, ocr.translate_texts = ocr.translate_texts, tools.translate_texts
+    try:
+        yield tools
+    finally:
+        ocr.translate_texts = original
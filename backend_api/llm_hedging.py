@@ -0,0 +1,129 @@
+"""Hedged LLM requests: duplicate a slow model call and take whichever wins.
+
+``HedgedModel`` wraps the receipt agent's model. When a call is still running
+past the ``LLM_HEDGE_PERCENTILE`` of the primary's recent latencies (and at
+least ``LLM_HEDGE_MIN_DELAY`` seconds), an identical request goes to the hedge
+model, which may be another provider or base URL. The first successful response
+wins and the other call is cancelled; if one fails, the other still can win.
+
+Hedges are capped by a process-wide budget: at most ``LLM_HEDGE_BUDGET`` extra
+calls per model call (e.g. 0.05 for 5%), shared by every hedged model in the
+worker. Nothing is hedged until ``MIN_SAMPLES`` latencies have been seen, so a
+fresh worker doesn't guess a threshold.
+
+Only complete requests are hedged; streamed runs go to the primary alone, since
+their output is sent to the client as it arrives.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from pydantic_ai.models import Model
+from pydantic_ai.models.wrapper import WrapperModel
+
+from .metrics import counter
+
+HEDGES = counter(
+    "llm_hedges_total",
+    "Hedged LLM calls: hedge sent and won or lost, or skipped over budget",
+    labelnames=("result",),
+)
+
+# Recent primary latencies the hedge delay is computed from.
+WINDOW = 200
+MIN_SAMPLES = 20
+
+
+class HedgeBudget:
+    """Allows at most ``LLM_HEDGE_BUDGET`` hedges per model call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+
+    def call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def spend(self) -> bool:
+        """Take a hedge from the budget, if one is left."""
+        with self._lock:
+            if self.hedges + 1 > self.calls * settings.LLM_HEDGE_BUDGET:
+                return False
+            self.hedges += 1
+            return True
+
+
+BUDGET = HedgeBudget()
+
+
+class HedgedModel(WrapperModel):
+    """Send ``wrapped``'s slow calls to ``hedge`` too; the first to answer wins."""
+
+    def __init__(self, wrapped: Model, hedge: Model, budget: HedgeBudget = BUDGET):
+        super().__init__(wrapped)
+        self.hedge = hedge
+        self.budget = budget
+        self.latencies = deque(maxlen=WINDOW)
+
+    def delay(self) -> float | None:
+        """Seconds to wait for the primary before hedging; ``None`` to never."""
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        latencies = sorted(self.latencies)
+        rank = round(settings.LLM_HEDGE_PERCENTILE / 100 * (len(latencies) - 1))
+        return max(settings.LLM_HEDGE_MIN_DELAY, latencies[rank])
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        args = (messages, model_settings, model_request_parameters)
+        self.budget.call()
+        delay = self.delay()
+        lost = asyncio.Event()
+        primary = asyncio.ensure_future(self._timed(self.wrapped.request(*args), lost))
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+            if not self.budget.spend():
+                HEDGES.labels(result="budget").inc()
+                return await primary
+            hedge = asyncio.ensure_future(self.hedge.request(*args))
+            winner = await _first_success(primary, hedge)
+            if winner is hedge:
+                lost.set()
+            HEDGES.labels(result="won" if winner is hedge else "lost").inc()
+            return winner.result()
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def _timed(self, call, lost: asyncio.Event):
+        start = time.perf_counter()
+        try:
+            response = await call
+        except asyncio.CancelledError:
+            # Lost to the hedge: took at least this long. Any other cancel
+            # (e.g. the client went away) says nothing about its latency.
+            if lost.is_set():
+                self.latencies.append(time.perf_counter() - start)
+            raise
+        self.latencies.append(time.perf_counter() - start)
+        return response
+
+
+async def _first_success(primary: asyncio.Future, hedge: asyncio.Future):
+    """The first of the calls to succeed, or the primary if both fail."""
+    pending = {primary, hedge}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        # On a tie the primary wins; the hedge's call is cancelled either way.
+        for task in sorted(done, key=lambda task: task is not primary):
+            if task.exception() is None:
+                return task
+    return primary
@@ -0,0 +1,22 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend_api.ocr_jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run queued asynchronous OCR jobs (POST /receipt-jobs/) from Redis."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.OCR_WORKER_CONCURRENCY,
+            help="Jobs to run at once.",
+        )
+
+    def handle(self, *args, concurrency, **options):
+        self.stdout.write(f"OCR worker running {concurrency} jobs at a time")
+        asyncio.run(run_worker(concurrency))
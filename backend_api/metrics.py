@@ -0,0 +1,237 @@
+"""In-process metrics, exposed in the Prometheus text format.
+
+A small registry of cumulative-bucket histograms (Prometheus semantics: each
+bucket counts observations ``<=`` its upper bound) and counters. Values are per
+process; ``histogram(name)`` and ``counter(name)`` return the same instance for
+a name every time, so modules can fetch their metrics at import time.
+
+A metric may have label names, e.g. the upload backend. Each combination of
+label values is its own series: ``metric.labels(backend="catbox")``.
+
+Recording is a lock and a couple of additions; the text format is only built
+by ``render`` when ``GET /api/metrics`` is scraped.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, math.inf)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, description: str, labelnames=()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, ...], list] = {}
+        self._children: dict[tuple, "_Child"] = {}
+
+    def labels(self, **labels) -> "_Child":
+        """The series for one combination of label values."""
+        # Children are looked up by the call's own label items, so a repeated
+        # call skips validating and ordering the labels.
+        items = tuple(labels.items())
+        if (child := self._children.get(items)) is None:
+            child = self._children.setdefault(items, _Child(self, self._key(labels)))
+        return child
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _new_series(self) -> list:
+        raise NotImplementedError
+
+    def _get_series(self, key: tuple[str, ...]) -> list:
+        if (series := self._series.get(key)) is None:
+            series = self._series[key] = self._new_series()
+        return series
+
+    def samples(self) -> list[tuple[str, dict[str, str], float]]:
+        raise NotImplementedError
+
+
+class _Child:
+    """A metric bound to one combination of label values."""
+
+    def __init__(self, metric: _Metric, key: tuple[str, ...]):
+        self._metric = metric
+        self._key = key
+
+    def observe(self, value: float) -> None:
+        self._metric._observe(self._key, value)
+
+    def inc(self, amount: float = 1) -> None:
+        self._metric._inc(self._key, amount)
+
+    def time(self):
+        return _timer(self.observe)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self, name: str, description: str, buckets=DEFAULT_BUCKETS, labelnames=()
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_series(self) -> list:
+        # Per-bucket (not yet cumulative) counts, then count and sum.
+        return [[0] * len(self.buckets), 0, 0.0]
+
+    def observe(self, value: float) -> None:
+        self._observe(self._key({}), value)
+
+    def _observe(self, key: tuple[str, ...], value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._get_series(key)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def time(self):
+        """Observe the duration of the ``with`` block, in seconds."""
+        return _timer(self.observe)
+
+    def snapshot(self, **labels) -> dict:
+        key = self._key(labels)
+        with self._lock:
+            counts, count, total = self._series.get(key) or self._new_series()
+            cumulative = [sum(counts[: i + 1]) for i in range(len(counts))]
+        return {
+            "count": count,
+            "sum": total,
+            "buckets": dict(zip(self.buckets, cumulative)),
+        }
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(c), n, s) for key, (c, n, s) in self._series.items()}
+        samples = []
+        for key, (counts, count, total) in sorted(series.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = "+Inf" if bound == math.inf else _format(bound)
+                samples.append(
+                    (f"{self.name}_bucket", {**labels, "le": le}, cumulative)
+                )
+            if self.buckets[-1] != math.inf:
+                samples.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, count))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_series(self) -> list:
+        return [0]
+
+    def inc(self, amount: float = 1) -> None:
+        self._inc(self._key({}), amount)
+
+    def _inc(self, key: tuple[str, ...], amount: float) -> None:
+        with self._lock:
+            self._get_series(key)[0] += amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return (self._series.get(self._key(labels)) or [0])[0]
+
+    def samples(self):
+        with self._lock:
+            series = {key: value for key, (value,) in self._series.items()}
+        return [
+            (self.name, dict(zip(self.labelnames, key)), value)
+            for key, value in sorted(series.items())
+        ]
+
+
+_registry: dict[str, _Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(cls, name: str, *args, **kwargs):
+    with _registry_lock:
+        if (metric := _registry.get(name)) is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"{name} is already registered as a {metric.type}")
+        return metric
+
+
+def histogram(
+    name: str, description: str = "", buckets=DEFAULT_BUCKETS, labelnames=()
+) -> Histogram:
+    """Return the histogram registered under ``name``, creating it once."""
+    return _register(Histogram, name, description, buckets, labelnames)
+
+
+def counter(name: str, description: str = "", labelnames=()) -> Counter:
+    """Return the counter registered under ``name``, creating it once.
+
+    By Prometheus convention counter names end in ``_total``.
+    """
+    return _register(Counter, name, description, labelnames)
+
+
+# Shared by the caches in front of the LLM, translation and Settle Up calls.
+CACHE_REQUESTS = counter(
+    "cache_requests_total",
+    "Cache lookups, by cache and result (hit, miss or error)",
+    labelnames=("cache", "result"),
+)
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda metric: metric.name)
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {_escape(metric.description, help=True)}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labels, value in metric.samples():
+            if labels:
+                pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                name = f"{name}{{{pairs}}}"
+            lines.append(f"{name} {_format(value)}")
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def _timer(observe):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(time.perf_counter() - start)
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str, help: bool = False) -> str:
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value if help else value.replace('"', '\\"')
@@ -3,24 +3,80 @@
 The pydantic-ai Agent (OpenAI client + LLM7 model + translate tool) is built
 once via a lazy, cached factory. Lazy (not module-level) so importing this
 module never constructs AsyncOpenAI — which raises if LLM_API_KEY is unset.
+
+With ``LLM_FAST_MODEL`` set, ``extract_receipt`` runs a two-tier cascade: the
+receipt goes to the fast model first, and only escalates to ``LLM_MODEL`` when
+the fast output fails validation, looks implausible (see
+``cascade_escalation``) or has more than ``RECEIPT_CASCADE_MAX_ITEMS`` items.
+Streamed runs always use ``LLM_MODEL``: their items have already been sent by
+the time the output could be judged.
 """
 
+import asyncio
+import logging
+import re
+from collections.abc import AsyncIterator
 from functools import lru_cache
 
 from django.conf import settings
-from googletrans import Translator
 from openai import AsyncOpenAI
-from pydantic_ai import Agent, ModelRetry, ToolOutput
+from pydantic import ValidationError
+from pydantic_ai import Agent, BinaryContent, ModelRetry, RunContext, ToolOutput
+from pydantic_ai.exceptions import UnexpectedModelBehavior
+from pydantic_ai.messages import ModelMessage, RetryPromptPart
 from pydantic_ai.providers.openai import OpenAIProvider
 
 from .dataclasses.llm7_override import LLM7ChatModel
 from .dataclasses.receipt_item import ReceiptData
+from .image_preprocessing import preprocess_receipt_image
+from .llm_hedging import HedgedModel
+from .receipt_repair import OUTPUT_TOOL, repair_history
+from .metrics import counter, histogram
+from .translation import translate_texts
+
+logger = logging.getLogger(__name__)
+
+LLM_RUN_SECONDS = histogram(
+    "ocr_llm_run_seconds",
+    "Time for one receipt agent run, tool calls and retries included",
+    labelnames=("mode",),
+)
+TOOL_CALL_SECONDS = histogram(
+    "ocr_tool_call_seconds",
+    "Time spent in a receipt agent tool call",
+    labelnames=("tool",),
+)
+RETRIES = counter(
+    "ocr_retries_total",
+    "Retry prompts sent to the model, by the tool (or final_result output) that failed",
+    labelnames=("tool",),
+)
+STREAM_RERUNS = counter(
+    "ocr_stream_reruns_total",
+    "Streamed extractions whose output failed validation and were re-run",
+)
+CASCADE_DECISIONS = counter(
+    "ocr_cascade_decisions_total",
+    "Fast-tier extractions, by whether they were accepted or why they escalated",
+    labelnames=("outcome",),
+)
+CASCADE_TIER_SECONDS = histogram(
+    "ocr_cascade_tier_seconds",
+    "Time for one cascade tier's agent run",
+    labelnames=("tier",),
+)
+
+# Item costs over the printed total: anything outside this range (beyond tax
+# on top, rounding and small unitemized discounts) suggests misread prices.
+CASCADE_TOTAL_RATIO = (0.95, 1.15)
+_JAPANESE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uff66-\uff9f]")
 
 INSTRUCTIONS = """\
 You are an expert receipt-reading system for Japanese and English receipts.
 You receive a receipt as an image. Extract the fields defined by the output schema, following these rules:
 
 - Languages: the receipt may be Japanese, English, or both. For every name (each item and the shop), provide BOTH the original Japanese text and an English translation. Never discard or overwrite the original Japanese.
+- Translation: to translate, call `translate_jp_to_en_texts` ONCE with every Japanese name on the receipt (items and shop), not once per name.
 - Currency: every amount is Japanese yen (JPY), a whole integer. Strip thousands separators (e.g. "1,200" -> 1200). Never invent fractional yen.
 - Items: list each purchased line item. `cost` is the final price for that line AFTER any discount, for the quantity shown (it is a line total, not a per-unit price). If a line has no price or 0, omit it.
 - Discounts: when a discount line applies to the item directly above it, subtract it from that item's `cost`; do not emit discounts as their own items.
@@ -53,34 +109,175 @@ def validate_receipt_data(data: ReceiptData) -> ReceiptData:
     return data
 
 
+def cascade_escalation(data: ReceiptData) -> str | None:
+    """Why a valid fast-tier receipt should still go to the strong model.
+
+    Returns ``"long"`` for receipts with more items than
+    ``RECEIPT_CASCADE_MAX_ITEMS``, ``"confidence"`` when the item costs don't
+    roughly add up to the total or a name was left untranslated, and ``None``
+    when the fast result can be trusted.
+    """
+    if len(data.receipt_items) > settings.RECEIPT_CASCADE_MAX_ITEMS:
+        return "long"
+    subtotal = sum(item.cost for item in data.receipt_items)
+    low, high = CASCADE_TOTAL_RATIO
+    if not subtotal or not low <= data.total_amount / subtotal <= high:
+        return "confidence"
+    names = [data.en_shop_name, *(item.english_name for item in data.receipt_items)]
+    if any(not name.strip() or _JAPANESE.search(name) for name in names):
+        return "confidence"
+    return None
+
+
 @lru_cache(maxsize=1)
 def get_receipt_agent() -> Agent:
     """Build (once) and return the receipt-reading agent."""
+    return _build_receipt_agent(settings.LLM_MODEL, retries=2)
+
+
+@lru_cache(maxsize=1)
+def get_fast_receipt_agent() -> Agent:
+    """Build (once) and return the cascade's fast-tier agent.
+
+    It gets no retries: a retry would re-send the image anyway, so a failed
+    validation escalates straight to the strong model instead.
+    """
+    return _build_receipt_agent(settings.LLM_FAST_MODEL, retries=0)
+
+
+def _chat_model(model_name: str, api_key: str, base_url: str | None = None):
     client = AsyncOpenAI(
         # base_url="https://api.llm7.io/v1",
-        api_key=settings.LLM_API_KEY,
+        base_url=base_url,
+        api_key=api_key,
     )
-    model = LLM7ChatModel("gpt-5-mini", provider=OpenAIProvider(openai_client=client))
+    return LLM7ChatModel(model_name, provider=OpenAIProvider(openai_client=client))
+
+
+def _build_receipt_agent(model_name: str, retries: int) -> Agent:
+    model = _chat_model(model_name, settings.LLM_API_KEY)
+    if settings.LLM_HEDGE_ENABLED:
+        hedge = _chat_model(
+            model_name,
+            settings.LLM_HEDGE_API_KEY or settings.LLM_API_KEY,
+            settings.LLM_HEDGE_BASE_URL,
+        )
+        model = HedgedModel(model, hedge)
     agent = Agent(
         model=model,
-        output_type=ToolOutput(ReceiptData, strict=True),
+        output_type=ToolOutput(ReceiptData, name=OUTPUT_TOOL, strict=True),
         instructions=INSTRUCTIONS,
-        retries=2,
+        retries=retries,
+        history_processors=[repair_history],
     )
-    agent.output_validator(validate_receipt_data)
+
+    @agent.output_validator
+    def validate_final_receipt_data(ctx: RunContext, data: ReceiptData) -> ReceiptData:
+        # Streamed runs also validate every partial output; only judge the
+        # finished one, or a half-written item list would trigger a retry.
+        if ctx.partial_output:
+            return data
+        return validate_receipt_data(data)
 
     @agent.tool_plain
-    async def translate_jp_to_en_text(text: str) -> str:
-        """Translate Japanese text to English text."""
+    async def translate_jp_to_en_texts(texts: list[str]) -> list[str]:
+        """Translate Japanese texts to English, returning them in the same order."""
 
-        translator = Translator()
         try:
-            text_result = await translator.translate(text, dest="en")
+            with TOOL_CALL_SECONDS.labels(tool="translate_jp_to_en_texts").time():
+                return await translate_texts(texts)
         except Exception:
-            raise ModelRetry(
-                "Translation failed, please try with a shorter chunk of text."
-            )
-
-        return text_result.text
+            raise ModelRetry("Translation failed, please try with fewer texts.")
 
     return agent
+
+
+def record_retries(messages: list[ModelMessage]) -> None:
+    """Count the retry prompts of a finished run, by the tool that failed."""
+    for message in messages:
+        for part in message.parts:
+            if isinstance(part, RetryPromptPart):
+                RETRIES.labels(tool=part.tool_name or "none").inc()
+
+
+async def extract_receipt(image: bytes | memoryview) -> ReceiptData:
+    """Preprocess an uploaded receipt image and run the agent over it.
+
+    Preprocessing is CPU-bound Pillow work, so it runs off the event loop.
+    """
+    data, media_type = await asyncio.to_thread(preprocess_receipt_image, image)
+    prompt = receipt_prompt(data, media_type)
+    with LLM_RUN_SECONDS.labels(mode="run").time():
+        if settings.LLM_FAST_MODEL:
+            if (receipt := await _extract_fast(prompt)) is not None:
+                return receipt
+            with CASCADE_TIER_SECONDS.labels(tier="strong").time():
+                result = await get_receipt_agent().run(prompt)
+        else:
+            result = await get_receipt_agent().run(prompt)
+    record_retries(result.all_messages())
+    return result.output
+
+
+async def _extract_fast(prompt: list) -> ReceiptData | None:
+    """Run the cascade's fast tier; ``None`` if the receipt must escalate."""
+    try:
+        with CASCADE_TIER_SECONDS.labels(tier="fast").time():
+            result = await get_fast_receipt_agent().run(prompt)
+    except UnexpectedModelBehavior as e:
+        # The output failed the schema or validate_receipt_data.
+        logger.info("Fast-tier receipt failed validation; escalating: %s", e)
+        outcome = "validation"
+    except Exception as e:
+        logger.warning("Fast-tier extraction failed; escalating: %s", e)
+        outcome = "error"
+    else:
+        record_retries(result.all_messages())
+        outcome = cascade_escalation(result.output) or "accepted"
+    CASCADE_DECISIONS.labels(outcome=outcome).inc()
+    return result.output if outcome == "accepted" else None
+
+
+def receipt_prompt(data: bytes, media_type: str) -> list:
+    return [
+        """
+            here is the image receipt:
+            """,
+        BinaryContent(data=data, media_type=media_type),
+    ]
+
+
+async def stream_receipt(
+    image: bytes | memoryview,
+) -> AsyncIterator[tuple[ReceiptData, bool]]:
+    """Like ``extract_receipt``, but yield ``(receipt, final)`` as it streams.
+
+    Partial receipts hold whatever has parsed so far (the trailing item may be
+    incomplete); the last one yielded is final and has passed
+    ``validate_receipt_data``. A streamed run can't retry once its output has
+    been streamed, so if the finished output fails validation the receipt is
+    re-extracted with a regular run (with retries) and that result is final.
+    """
+    data, media_type = await asyncio.to_thread(preprocess_receipt_image, image)
+    prompt = receipt_prompt(data, media_type)
+
+    try:
+        with LLM_RUN_SECONDS.labels(mode="stream").time():
+            async with get_receipt_agent().run_stream(prompt) as result:
+                # Validate every delta: a partial only validates while the
+                # trailing item is between fields, so a debounce window mostly
+                # lands on prefixes that fail and the stream stalls until the
+                # output ends.
+                async for receipt in result.stream_output(debounce_by=None):
+                    yield receipt, False
+        record_retries(result.all_messages())
+        yield receipt, True
+        return
+    except (ModelRetry, ValidationError) as e:
+        logger.info("Streamed receipt failed validation; re-running: %s", e)
+        STREAM_RERUNS.inc()
+
+    with LLM_RUN_SECONDS.labels(mode="run").time():
+        result = await get_receipt_agent().run(prompt)
+    record_retries(result.all_messages())
+    yield result.output, True
@@ -0,0 +1,109 @@
+"""Content-addressed cache of OCR results.
+
+Entries are keyed by the SHA-256 of the uploaded image bytes plus the model name
+(both tiers' when the model cascade is on), a hash of the agent ``INSTRUCTIONS``
+and the image preprocessing configuration, so re-uploading the same receipt
+(e.g. a flaky mobile retry) returns the stored extraction and image URL without
+calling the LLM or Cloudinary. Changing the prompt, model or preprocessing
+yields new keys, so an old extraction is never served for a new configuration.
+
+The payload lives in the default (Redis) cache with a TTL. A sorted-set index
+scored by last access bounds the number of entries: once it grows past
+``OCR_CACHE_MAX_ENTRIES`` the least recently used receipts are evicted. Hits,
+misses and evictions are counted on ``/api/metrics``.
+
+The cache is an optimization only — Redis errors are logged and treated as a
+miss, never surfaced to the client.
+"""
+
+import hashlib
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+
+from backend_api.image_preprocessing import preprocess_fingerprint
+from backend_api.metrics import CACHE_REQUESTS, counter
+from backend_api.ocr import INSTRUCTIONS
+from backend_api.schemas import OCRReceiptPostOut
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ocr_receipt"
+INDEX_KEY = f"{KEY_PREFIX}:index"
+
+EVICTIONS = counter(
+    "ocr_cache_evictions_total",
+    "OCR results evicted to keep the cache within OCR_CACHE_MAX_ENTRIES",
+)
+
+PROMPT_HASH = hashlib.sha256(INSTRUCTIONS.encode()).hexdigest()[:16]
+
+
+def receipt_cache_key(image: bytes | memoryview) -> str:
+    """Derive the cache key for an uploaded receipt image."""
+    image_hash = hashlib.sha256(image).hexdigest()
+    model = settings.LLM_MODEL
+    if settings.LLM_FAST_MODEL:
+        model = f"{settings.LLM_FAST_MODEL}>{model}"
+    return (
+        f"{KEY_PREFIX}:{model}:{PROMPT_HASH}"
+        f":{preprocess_fingerprint()}:{image_hash}"
+    )
+
+
+def get_cached_receipt(cache_key: str) -> OCRReceiptPostOut | None:
+    """Return the stored OCR result for ``cache_key``, refreshing its recency."""
+    if not settings.OCR_CACHE_ENABLED:
+        return None
+
+    try:
+        value = cache.get(cache_key)
+        if value:
+            # Refresh recency so hot receipts survive eviction.
+            get_redis_connection("default").zadd(INDEX_KEY, {cache_key: time.time()})
+    except Exception as e:
+        logger.warning("OCR cache lookup failed; treating as a miss: %s", e)
+        CACHE_REQUESTS.labels(cache="ocr", result="error").inc()
+        return None
+
+    CACHE_REQUESTS.labels(cache="ocr", result="hit" if value else "miss").inc()
+    if not value:
+        return None
+    return OCRReceiptPostOut(**value)
+
+
+def cache_receipt(cache_key: str, receipt: OCRReceiptPostOut) -> None:
+    """Store an OCR result and evict the oldest entries past the size bound."""
+    if not settings.OCR_CACHE_ENABLED:
+        return
+
+    now = time.time()
+    try:
+        cache.set(
+            cache_key,
+            timeout=settings.OCR_CACHE_TIMEOUT,
+            value=receipt.model_dump(mode="json"),
+        )
+        redis = get_redis_connection("default")
+        with redis.pipeline() as pipe:
+            # Index members whose payload already expired are dead weight.
+            pipe.zremrangebyscore(INDEX_KEY, "-inf", now - settings.OCR_CACHE_TIMEOUT)
+            pipe.zadd(INDEX_KEY, {cache_key: now})
+            pipe.zcard(INDEX_KEY)
+            *_, size = pipe.execute()
+
+        overflow = size - settings.OCR_CACHE_MAX_ENTRIES
+        if overflow > 0:
+            evicted = [key.decode() for key, _ in redis.zpopmin(INDEX_KEY, overflow)]
+            cache.delete_many(evicted)
+            EVICTIONS.inc(len(evicted))
+    except Exception as e:
+        logger.warning("OCR cache store failed: %s", e)
+
+
+aget_cached_receipt = sync_to_async(get_cached_receipt)
+acache_receipt = sync_to_async(cache_receipt)
@@ -0,0 +1,163 @@
+"""Asynchronous OCR jobs backed by a Redis list.
+
+``POST /receipt-jobs/`` stores the image and a pending job record in the
+default cache, pushes the job id onto ``QUEUE_KEY`` and returns straight away,
+so the HTTP connection isn't held open for the whole LLM run. Workers started
+with ``manage.py ocr_worker`` pop ids off the queue and run the same pipeline
+as ``/receipt-items/``; clients poll the job record or follow it over SSE.
+
+Job records and images expire after ``OCR_JOB_TIMEOUT``. A job popped by a
+worker that then dies stays ``running`` until it expires; the client re-posts.
+"""
+
+import asyncio
+import logging
+import uuid
+from collections.abc import AsyncIterator
+
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+
+from .ocr_cache import aget_cached_receipt, receipt_cache_key
+from .receipts import process_receipt
+from .schemas import OCRJobOut, OCRReceiptPostOut
+from .uploads import ReceiptUpload
+from .utils import format_sse
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ocr_job"
+QUEUE_KEY = f"{KEY_PREFIX}:queue"
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+FINISHED = {DONE, FAILED}
+
+# Seconds a worker blocks on an empty queue before checking again.
+POP_TIMEOUT = 5
+# Seconds between SSE comments that keep idle proxies from closing the stream.
+HEARTBEAT_INTERVAL = 15
+
+
+def job_key(job_id: str) -> str:
+    return f"{KEY_PREFIX}:{job_id}"
+
+
+def job_image_key(job_id: str) -> str:
+    return f"{KEY_PREFIX}:{job_id}:image"
+
+
+async def _save_job(job: dict) -> dict:
+    await cache.aset(job_key(job["id"]), job, timeout=settings.OCR_JOB_TIMEOUT)
+    return job
+
+
+async def get_job(job_id: str) -> dict | None:
+    return await cache.aget(job_key(job_id))
+
+
+async def create_job(upload: ReceiptUpload, bypass_cache: bool = False) -> dict:
+    """Store the image and a pending job, and queue it for a worker.
+
+    A receipt already in the OCR cache completes immediately, unqueued.
+    """
+    job = {
+        "id": uuid.uuid4().hex,
+        "status": PENDING,
+        "filename": upload.name,
+        "bypass_cache": bypass_cache,
+        "receipt": None,
+        "error": None,
+    }
+    cache_key = receipt_cache_key(upload.buffer)
+    if not bypass_cache and (cached := await aget_cached_receipt(cache_key)):
+        return await finish_job(job, cached)
+
+    await cache.aset(
+        job_image_key(job["id"]),
+        bytes(upload.buffer),
+        timeout=settings.OCR_JOB_TIMEOUT,
+    )
+    await _save_job(job)
+    await asyncio.to_thread(get_redis_connection("default").lpush, QUEUE_KEY, job["id"])
+    return job
+
+
+async def finish_job(job: dict, receipt: OCRReceiptPostOut) -> dict:
+    job.update(status=DONE, receipt=receipt.model_dump(mode="json"))
+    return await _save_job(job)
+
+
+async def job_events(job_id: str) -> AsyncIterator[str]:
+    """Server-sent events for a job: one per status change, until it finishes."""
+    last, idle = None, 0.0
+
+    while (job := await get_job(job_id)) is not None:
+        if job != last:
+            yield format_sse(job["status"], OCRJobOut(**job).model_dump_json())
+            last, idle = job, 0.0
+        if job["status"] in FINISHED:
+            return
+
+        if idle >= HEARTBEAT_INTERVAL:
+            yield ": keep-alive\n\n"
+            idle = 0.0
+        await asyncio.sleep(settings.OCR_JOB_POLL_INTERVAL)
+        idle += settings.OCR_JOB_POLL_INTERVAL
+
+    yield format_sse("expired", "{}")
+
+
+async def run_job(job_id: str) -> None:
+    """Run one queued job through the OCR pipeline and record the outcome."""
+    job, image = await asyncio.gather(
+        get_job(job_id), cache.aget(job_image_key(job_id))
+    )
+    if job is None or image is None:
+        logger.warning("OCR job %s expired before it ran", job_id)
+        return
+
+    job["status"] = RUNNING
+    await _save_job(job)
+
+    try:
+        upload = ReceiptUpload(memoryview(image), name=job["filename"])
+        receipt = await process_receipt(upload, job["bypass_cache"])
+    except Exception as e:
+        logger.warning("OCR job %s failed: %s", job_id, e)
+        job.update(status=FAILED, error=str(e) or type(e).__name__)
+        await _save_job(job)
+    else:
+        await finish_job(job, receipt)
+    finally:
+        await cache.adelete(job_image_key(job_id))
+
+
+async def run_worker(concurrency: int) -> None:
+    """Pop and run queued jobs forever, at most ``concurrency`` at a time."""
+    redis = get_redis_connection("default")
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def run(job_id: str) -> None:
+        try:
+            await run_job(job_id)
+        except Exception:
+            logger.exception("OCR job %s crashed", job_id)
+        finally:
+            slots.release()
+
+    while True:
+        # Only take a job off the queue once it can start; other workers may.
+        await slots.acquire()
+        popped = await asyncio.to_thread(redis.brpop, QUEUE_KEY, POP_TIMEOUT)
+        if popped is None:
+            slots.release()
+            continue
+
+        task = asyncio.create_task(run(popped[1].decode()))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
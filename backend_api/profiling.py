@@ -0,0 +1,263 @@
+"""Opt-in sampling profiles of single requests.
+
+A caller holding the API token adds ``X-Profile: 1`` (or ``?profile=1``) to a
+request. ``RequestProfilingMiddleware`` then runs that one request under
+``SamplingProfiler`` and stores the result in Redis for
+``REQUEST_PROFILE_TIMEOUT`` seconds. The response names it in ``X-Profile-Id``
+and ``X-Profile-Url``; ``GET /api/profiles/{id}`` returns it.
+
+The sampler is a thread that reads every thread's stack from
+``sys._current_frames()`` each ``REQUEST_PROFILE_INTERVAL`` seconds. That
+covers sync code in executor threads (uploads, ``sync_to_async``) as well as
+the event loop. While the loop is idle in ``select``, the sample is charged to
+the request task's chain of suspended coroutines instead, so time spent
+awaiting the LLM or Settle Up shows up under the ``await`` that waited for it.
+Samples of the loop running some other request's task are dropped. Executor
+threads can't be told apart per request, so under concurrent load their
+samples may include other requests' work. Threads waiting on a lock, a queue
+or a selector are idle and skipped.
+
+Profiles are wall-clock samples in the collapsed-stack format (``a;b;c 12``
+per line), which ``flamegraph.pl``, ``inferno`` and speedscope read as is.
+
+With ``REQUEST_PROFILING_ENABLED`` off the middleware removes itself from the
+stack, and with it on, requests that don't opt in cost one header lookup.
+"""
+
+import asyncio
+import functools
+import hmac
+import logging
+import sys
+import threading
+import uuid
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "request_profile"
+HEADER = "X-Profile"
+QUERY_PARAM = "profile"
+_HEADER_KEY = "HTTP_" + HEADER.upper().replace("-", "_")
+
+# A thread whose innermost Python frame is in one of these modules is blocked
+# waiting (on a lock, a queue, a socket poll), not working. An executor worker
+# whose innermost frame is its own loop is waiting for a work item.
+_IDLE_MODULES = (
+    "/selectors.py",
+    "/threading.py",
+    "/queue.py",
+    "/concurrent/futures/thread.py",
+)
+
+
+class SamplingProfiler:
+    """Sample every thread's stack until ``stop``, charging the loop to ``task``.
+
+    ``start`` and ``stop`` are called from the thread that serves the request:
+    the event loop thread when ``task`` is given, otherwise the request thread
+    itself.
+    """
+
+    def __init__(self, interval: float, task: asyncio.Task | None = None):
+        self.interval = interval
+        self.task = task
+        self.samples = 0
+        self._stacks: Counter[tuple[str, ...]] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+        self._loop = task.get_loop() if task is not None else None
+        self._request_thread = threading.get_ident()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed stacks."""
+        self._stop.set()
+        self._thread.join()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{';'.join(stack)} {count}\n"
+            for stack, count in sorted(self._stacks.items())
+        )
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:
+                # A frame or task changing under the sampler; skip the tick.
+                logger.debug("Profiler sample failed", exc_info=True)
+
+    def _sample(self) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        self.samples += 1
+        running = self._running_task()
+        frames = sys._current_frames()
+        # Only charge the loop's stack to the request if it ran the request's
+        # task both before and after the stacks were read.
+        ours = running is self.task and self._running_task() is self.task
+        for ident, frame in frames.items():
+            if ident == own:
+                continue
+            if ident != self._request_thread:
+                if _is_idle(frame):
+                    continue
+                stack = _frame_stack(frame)
+            elif self._loop is None:
+                stack = _frame_stack(frame)
+            elif _is_idle(frame):
+                # The loop is waiting on I/O: charge the wait to the await
+                # chain of the request's task.
+                stack = [] if self.task.done() else _await_stack(self.task)
+            elif ours:
+                stack = _frame_stack(frame)
+            else:
+                continue
+            if stack:
+                self._stacks[(names.get(ident, str(ident)), *stack)] += 1
+
+    def _running_task(self) -> asyncio.Task | None:
+        # Private, but the only way to tell from outside the loop's thread
+        # which task it is running; a read of one dict entry.
+        if self._loop is None:
+            return None
+        return asyncio.tasks._current_tasks.get(self._loop)
+
+
+class RequestProfilingMiddleware:
+    """Profile requests that ask for it with the API token; see the module doc."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not wants_profile(request):
+            return self.get_response(request)
+
+        profiler = SamplingProfiler(settings.REQUEST_PROFILE_INTERVAL)
+        profiler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            profile = profiler.stop()
+        profile_id = uuid.uuid4().hex
+        cache.set(_key(profile_id), profile, timeout=settings.REQUEST_PROFILE_TIMEOUT)
+        return _annotate(response, profile_id, profiler)
+
+    async def __acall__(self, request):
+        if not wants_profile(request):
+            return await self.get_response(request)
+
+        profiler = SamplingProfiler(
+            settings.REQUEST_PROFILE_INTERVAL, asyncio.current_task()
+        )
+        profiler.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            # Joining the sampler blocks for at most one interval.
+            profile = profiler.stop()
+        profile_id = uuid.uuid4().hex
+        await cache.aset(
+            _key(profile_id), profile, timeout=settings.REQUEST_PROFILE_TIMEOUT
+        )
+        return _annotate(response, profile_id, profiler)
+
+
+def wants_profile(request) -> bool:
+    """Whether the request opts in and carries the API token."""
+    flag = request.META.get(_HEADER_KEY)
+    if flag is None and QUERY_PARAM in request.META.get("QUERY_STRING", ""):
+        flag = request.GET.get(QUERY_PARAM)
+    if flag not in ("1", "true"):
+        return False
+    expected = f"Bearer {settings.APP_AUTH}"
+    given = request.headers.get("Authorization", "")
+    return bool(settings.APP_AUTH) and hmac.compare_digest(
+        given.encode(), expected.encode()
+    )
+
+
+async def get_profile(profile_id: str) -> str | None:
+    return await cache.aget(_key(profile_id))
+
+
+def _key(profile_id: str) -> str:
+    return f"{KEY_PREFIX}:{profile_id}"
+
+
+def _annotate(response, profile_id: str, profiler: SamplingProfiler):
+    response["X-Profile-Id"] = profile_id
+    response["X-Profile-Url"] = f"/api/profiles/{profile_id}"
+    response["X-Profile-Samples"] = str(profiler.samples)
+    return response
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({_short_path(code.co_filename)}:{frame.f_lineno})"
+
+
+@functools.lru_cache(maxsize=1024)
+def _short_path(filename: str) -> str:
+    """``filename`` relative to the project or the ``sys.path`` entry holding it."""
+    roots = [
+        root
+        for root in (str(settings.BASE_DIR), *sys.path)
+        if root and filename.startswith(root + "/")
+    ]
+    return filename[len(max(roots, key=len)) + 1 :] if roots else filename
+
+
+def _frame_stack(frame) -> list[str]:
+    """Outermost-first labels of ``frame`` and its callers."""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _await_stack(task: asyncio.Task) -> list[str]:
+    """Outermost-first labels of the coroutines ``task`` is suspended in."""
+    stack = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(
+            awaitable, "ag_frame", None
+        )
+        if frame is None:
+            # A future or some other awaitable without a frame of its own.
+            stack.append(f"await {type(awaitable).__qualname__.removesuffix('Iter')}")
+            break
+        stack.append(_frame_label(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(
+            awaitable, "ag_await", None
+        )
+    return stack
+
+
+def _is_idle(frame) -> bool:
+    return frame.f_code.co_filename.endswith(_IDLE_MODULES)
@@ -0,0 +1,142 @@
+"""Targeted repair of receipts that fail ``validate_receipt_data``.
+
+A validator retry re-sends the whole conversation to the model, the receipt
+image included, so every retry pays the image's vision tokens again.
+``repair_history`` is the receipt agent's history processor. Before a retry of
+the output, it swaps the image in the original prompt for only what the fix
+needs. The model still sees the receipt it extracted (its own output tool
+call) and the validation error:
+
+- A negative item cost is an arithmetic slip (a discount taken as the price or
+  subtracted twice) that the extracted lines are enough to fix: no image.
+- A missing total is re-read from the bottom of the receipt, where it is
+  printed: a crop.
+- An empty item list, or output that didn't parse, needs the whole receipt:
+  the full image, as before.
+
+Each retry picks again from the latest output, so a repair that turns up a
+different error can still get the full image back.
+"""
+
+import asyncio
+from dataclasses import replace
+
+from django.conf import settings
+from pydantic import ValidationError
+from pydantic_ai import BinaryContent, RunContext
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    RetryPromptPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+
+from .dataclasses.receipt_item import ReceiptData
+from .image_preprocessing import crop_bottom, estimate_vision_tokens, image_size
+from .metrics import counter
+
+REPAIRS = counter(
+    "ocr_repairs_total",
+    "Receipt output retries, by the image sent with them (none, crop or full)",
+    labelnames=("image",),
+)
+REPAIR_TOKENS_SAVED = counter(
+    "ocr_repair_image_tokens_saved_total",
+    "Estimated vision tokens not re-sent on receipt output retries",
+)
+
+# The receipt agent's output tool.
+OUTPUT_TOOL = "final_result"
+# Share of the receipt, from the bottom, sent to re-read the total.
+TOTAL_CROP = 0.4
+
+NO_IMAGE_NOTE = (
+    "The receipt image is left out of this retry. Fix only what the error "
+    "names, using the receipt you already extracted."
+)
+CROP_NOTE = (
+    "Only the bottom of the receipt, where the total is printed, is included "
+    "in this retry. Fix only what the error names and keep the rest of the "
+    "receipt you already extracted."
+)
+
+
+def repair_image(data: ReceiptData | None) -> str:
+    """How much of the image a retry of ``data`` needs: none, crop or full."""
+    if data is None or not data.receipt_items:
+        return "full"
+    if data.total_amount <= 0:
+        return "crop"
+    return "none"
+
+
+async def repair_history(
+    ctx: RunContext, messages: list[ModelMessage]
+) -> list[ModelMessage]:
+    """Send an output retry only the part of the receipt image it needs."""
+    if not settings.RECEIPT_REPAIR_ENABLED or not _retries_output(messages[-1]):
+        return messages
+    prompt = [] if isinstance(ctx.prompt, str) else list(ctx.prompt or ())
+    image = next((c for c in prompt if isinstance(c, BinaryContent)), None)
+    if image is None:
+        return messages
+
+    need = repair_image(_last_output(messages))
+    full_tokens = estimate_vision_tokens(*image_size(image.data))
+    content, sent_tokens = prompt, full_tokens
+    if need == "crop":
+        crop = await asyncio.to_thread(crop_bottom, image.data, TOTAL_CROP)
+        if crop is None:
+            need = "full"
+        else:
+            content = _without(prompt, image) + [
+                CROP_NOTE,
+                BinaryContent(data=crop, media_type="image/jpeg"),
+            ]
+            sent_tokens = estimate_vision_tokens(*image_size(crop))
+    elif need == "none":
+        content, sent_tokens = _without(prompt, image) + [NO_IMAGE_NOTE], 0
+
+    REPAIRS.labels(image=need).inc()
+    REPAIR_TOKENS_SAVED.inc(max(0, full_tokens - sent_tokens))
+    return [_with_prompt(message, content) for message in messages]
+
+
+def _retries_output(message: ModelMessage) -> bool:
+    return isinstance(message, ModelRequest) and any(
+        isinstance(part, RetryPromptPart) and part.tool_name == OUTPUT_TOOL
+        for part in message.parts
+    )
+
+
+def _last_output(messages: list[ModelMessage]) -> ReceiptData | None:
+    """The receipt of the latest output tool call, ``None`` if it didn't parse."""
+    for message in reversed(messages):
+        if not isinstance(message, ModelResponse):
+            continue
+        for part in message.parts:
+            if isinstance(part, ToolCallPart) and part.tool_name == OUTPUT_TOOL:
+                try:
+                    return ReceiptData.model_validate(part.args_as_dict())
+                except (ValidationError, ValueError):
+                    return None
+    return None
+
+
+def _without(prompt: list, image: BinaryContent) -> list:
+    return [c for c in prompt if c is not image]
+
+
+def _with_prompt(message: ModelMessage, content: list) -> ModelMessage:
+    """``message`` with its user prompt replaced by ``content``, if it has one."""
+    if not isinstance(message, ModelRequest) or not any(
+        isinstance(part, UserPromptPart) for part in message.parts
+    ):
+        return message
+    parts = [
+        replace(part, content=content) if isinstance(part, UserPromptPart) else part
+        for part in message.parts
+    ]
+    return replace(message, parts=parts)
@@ -0,0 +1,146 @@
+"""The receipt OCR pipeline shared by the single, batch, job and stream endpoints."""
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from collections.abc import AsyncIterator
+
+from .dataclasses.receipt_item import ReceiptData
+from .metrics import histogram
+from .ocr import extract_receipt, stream_receipt
+from .ocr_cache import acache_receipt, aget_cached_receipt, receipt_cache_key
+from .schemas import OCRReceiptPostOut
+from .services import aupload_receipt_image
+from .uploads import ReceiptUpload
+from .utils import format_sse, gather_or_cancel
+
+logger = logging.getLogger(__name__)
+
+FIRST_ITEM_SECONDS = histogram(
+    "receipt_stream_first_item_seconds",
+    "Time from the start of a streamed extraction to its first item event",
+)
+COMPLETE_SECONDS = histogram(
+    "receipt_stream_complete_seconds",
+    "Time from the start of a streamed extraction to the final receipt event",
+)
+
+FIELD_ORDER = list(ReceiptData.model_fields)
+
+
+async def process_receipt(
+    upload: ReceiptUpload,
+    bypass_cache: bool = False,
+    llm_slots: asyncio.Semaphore | None = None,
+) -> OCRReceiptPostOut:
+    """Extract and upload one receipt, serving repeats from the OCR cache.
+
+    ``llm_slots`` bounds concurrent extractions; the upload isn't held to it.
+    """
+    cache_key = receipt_cache_key(upload.buffer)
+
+    if not bypass_cache and (cached := await aget_cached_receipt(cache_key)):
+        return cached
+
+    async def extract():
+        async with llm_slots or contextlib.nullcontext():
+            return await extract_receipt(upload.buffer)
+
+    # The upload doesn't depend on the extraction, so overlap the two: latency
+    # is max(LLM, upload) rather than their sum.
+    results, url = await gather_or_cancel(extract(), aupload_receipt_image(upload))
+
+    receipt = OCRReceiptPostOut(**results.model_dump(), receipt_image_url=url)
+    await acache_receipt(cache_key, receipt)
+
+    return receipt
+
+
+class ReceiptEvents:
+    """Turn successive partial receipts into one event per settled field.
+
+    The model writes fields in schema order, so a field is settled once a
+    later one has appeared (or the receipt is final). Items are settled once
+    the next item has started; the trailing one may still be mid-write.
+    """
+
+    def __init__(self):
+        self.items_sent = 0
+        self.sent = set()
+
+    def _settled(self, receipt: ReceiptData, field: str, final: bool) -> bool:
+        later = FIELD_ORDER[FIELD_ORDER.index(field) + 1 :]
+        return final or not receipt.model_fields_set.isdisjoint(later)
+
+    def _field_event(self, receipt, final, event, fields) -> tuple[str, dict] | None:
+        if event in self.sent or not self._settled(receipt, fields[-1], final):
+            return None
+        self.sent.add(event)
+        return event, receipt.model_dump(mode="json", include=set(fields))
+
+    def update(self, receipt: ReceiptData, final: bool) -> list[tuple[str, dict]]:
+        events = [
+            self._field_event(receipt, final, "shop", ["en_shop_name", "jp_shop_name"]),
+            self._field_event(receipt, final, "date", ["receipt_date"]),
+        ]
+
+        items = receipt.receipt_items
+        ready = len(items) if final else max(len(items) - 1, 0)
+        events += [
+            ("item", item.model_dump(mode="json"))
+            for item in items[self.items_sent : ready]
+        ]
+        self.items_sent = max(self.items_sent, ready)
+
+        return [event for event in events if event is not None]
+
+
+def _sse(event: str, data: dict) -> str:
+    return format_sse(event, json.dumps(data, ensure_ascii=False))
+
+
+async def stream_receipt_events(
+    upload: ReceiptUpload, bypass_cache: bool = False
+) -> AsyncIterator[str]:
+    """Server-sent events for one receipt as its extraction streams.
+
+    Emits ``shop``, ``date`` and one ``item`` per line item as soon as each
+    parses, then ``receipt`` with the validated ``OCRReceiptPostOut`` (which
+    is authoritative: if the streamed output failed validation it comes from a
+    re-run), or ``error``. The image upload runs alongside the extraction.
+    """
+    cache_key = receipt_cache_key(upload.buffer)
+
+    if not bypass_cache and (cached := await aget_cached_receipt(cache_key)):
+        receipt = ReceiptData(**cached.model_dump())
+        for event, data in ReceiptEvents().update(receipt, final=True):
+            yield _sse(event, data)
+        yield format_sse("receipt", cached.model_dump_json())
+        return
+
+    start = time.perf_counter()
+    first_item = True
+    events = ReceiptEvents()
+    uploading = asyncio.ensure_future(aupload_receipt_image(upload))
+
+    try:
+        async for receipt, final in stream_receipt(upload.buffer):
+            for event, data in events.update(receipt, final):
+                if event == "item" and first_item:
+                    FIRST_ITEM_SECONDS.observe(time.perf_counter() - start)
+                    first_item = False
+                yield _sse(event, data)
+        url = await uploading
+    except Exception as e:
+        logger.warning("Streamed receipt extraction failed: %s", e)
+        yield _sse("error", {"detail": str(e) or type(e).__name__})
+        return
+    finally:
+        uploading.cancel()
+
+    result = OCRReceiptPostOut(**receipt.model_dump(), receipt_image_url=url)
+    await acache_receipt(cache_key, result)
+    COMPLETE_SECONDS.observe(time.perf_counter() - start)
+    yield format_sse("receipt", result.model_dump_json())
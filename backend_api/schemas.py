@@ -40,6 +40,17 @@ class TransactionPostIn(Schema):
     )
 
 
+class TransactionBatchItemOut(Schema):
+    index: int = Field(..., description="Position of the transaction in the request")
+    group_id: str = Field(..., description="The group the transaction belongs to")
+    transaction_id: str | None = Field(
+        None, description="The Settle Up id of the created transaction, if written"
+    )
+    error: str | None = Field(
+        None, description="Why this transaction was not created, if it wasn't"
+    )
+
+
 class OCRReceiptPostOut(Schema):
     receipt_items: list[ReceiptItemData]
     en_shop_name: str = Field(
@@ -60,3 +71,24 @@ class OCRReceiptPostOut(Schema):
     receipt_image_url: str = Field(
         ..., description="The url of the uploaded receipt image"
     )
+
+
+class OCRReceiptBatchItemOut(Schema):
+    index: int = Field(..., description="Position of the image in the upload")
+    filename: str = Field(..., description="Name of the uploaded image file")
+    receipt: OCRReceiptPostOut | None = Field(
+        None, description="The extracted receipt, if processing succeeded"
+    )
+    error: str | None = Field(
+        None, description="Why processing this receipt failed, if it did"
+    )
+
+
+class OCRJobOut(Schema):
+    id: str = Field(..., description="The job id to poll or stream")
+    status: str = Field(..., description="One of pending, running, done, failed")
+    filename: str = Field(..., description="Name of the uploaded image file")
+    receipt: OCRReceiptPostOut | None = Field(
+        None, description="The extracted receipt, once the job is done"
+    )
+    error: str | None = Field(None, description="Why the job failed, if it did")
@@ -1,30 +1,48 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 import cloudinary
 import cloudinary.uploader
 import requests
 from django.conf import settings
-from ninja import UploadedFile
+
+from .metrics import counter, histogram
+from .uploads import ReceiptUpload
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_SECONDS = histogram(
+    "receipt_upload_seconds",
+    "Time for one receipt image upload attempt",
+    labelnames=("backend",),
+)
+UPLOAD_FAILURES = counter(
+    "receipt_upload_failures_total",
+    "Receipt image uploads that raised",
+    labelnames=("backend",),
+)
 
 
-def catbox_upload_file(file_obj: UploadedFile):
+def catbox_upload_file(upload: ReceiptUpload):
     """
     Upload to catbox.moe to retrieve file URL.
 
     Args:
-        file_obj: UploadedFile
+        upload: ReceiptUpload
 
     Returns
     """
-    file_obj.seek(0)
     response = requests.post(
-        "https://catbox.moe/user/api.php",
+        settings.CATBOX_UPLOAD_URL,
         data={"reqtype": "fileupload"},
-        files={"fileToUpload": file_obj},
+        files={"fileToUpload": (upload.name, upload.buffer)},
     )
     return response.text.strip()
 
 
-def cloudinary_upload_file(file_obj: UploadedFile):
-    file_obj.seek(0)
+def cloudinary_upload_file(upload: ReceiptUpload):
     cloudinary.config(
         cloud_name=settings.CLOUDINARY_CLOUD_NAME,
         api_key=settings.CLOUDINARY_API_KEY,
@@ -32,5 +50,45 @@ def cloudinary_upload_file(file_obj: UploadedFile):
         secure=True,
     )
 
-    upload_result = cloudinary.uploader.upload(file_obj)
+    # A (name, data) pair goes straight into the multipart body; a stream
+    # would be read() into one more full copy first.
+    upload_result = cloudinary.uploader.upload((upload.name, upload.buffer))
     return upload_result["secure_url"]
+
+
+def upload_receipt_image(upload: ReceiptUpload) -> str:
+    """Upload to Cloudinary, falling back to catbox.moe; return the image URL."""
+    try:
+        return _timed_upload("cloudinary", cloudinary_upload_file, upload)
+    except Exception as e:
+        logger.warning("Cloudinary upload failed; falling back to catbox: %s", e)
+        return _timed_upload("catbox", catbox_upload_file, upload)
+
+
+def _timed_upload(backend: str, upload_file, upload: ReceiptUpload) -> str:
+    try:
+        with UPLOAD_SECONDS.labels(backend=backend).time():
+            return upload_file(upload)
+    except Exception:
+        UPLOAD_FAILURES.labels(backend=backend).inc()
+        raise
+
+
+@lru_cache(maxsize=1)
+def get_upload_executor() -> ThreadPoolExecutor:
+    """Bounded pool the blocking upload SDKs run on, off the event loop."""
+    return ThreadPoolExecutor(
+        max_workers=settings.UPLOAD_MAX_WORKERS, thread_name_prefix="receipt-upload"
+    )
+
+
+async def aupload_receipt_image(upload: ReceiptUpload) -> str:
+    """Run ``upload_receipt_image`` on the upload pool without blocking the loop.
+
+    Cancelling the awaiting task abandons the result but cannot interrupt an
+    upload already running in a worker thread; it finishes in the background.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_upload_executor(), upload_receipt_image, upload
+    )
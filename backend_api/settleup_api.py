@@ -1,35 +1,74 @@
-from ninja import Router
+from django.conf import settings
+from django.http import HttpResponse
+from ninja import Header, Router
+from ninja.errors import HttpError
 from ninja.pagination import paginate
 
+from backend_api.idempotency import create_transaction_once
 from backend_api.schemas import (
     SettleUpGroupSchema,
+    TransactionBatchItemOut,
     TransactionPostIn,
     SettleUpUserSchema,
 )
-from backend_api.settleup_utils import SettleUpClient
+from backend_api.settleup_utils import AsyncSettleUpClient
 
 router = Router()
 
 
 @router.get("/groups/", response={200: list[SettleUpGroupSchema]})
 @paginate
-def get_settle_up_groups(request):
-    settle_up_client = SettleUpClient()
-    groups = settle_up_client.get_groups()
+async def get_settle_up_groups(request):
+    settle_up_client = await AsyncSettleUpClient.create()
+    groups = await settle_up_client.get_groups()
 
     return groups
 
 
+@router.delete("/groups/cache/", response={204: None})
+async def invalidate_settle_up_groups(request):
+    await AsyncSettleUpClient.invalidate_groups()
+    return 204, None
+
+
 @router.get("/users/", response={200: list[SettleUpUserSchema]})
 @paginate
-def get_settle_up_users(request, group_id: str):
-    settle_up_client = SettleUpClient()
-    return settle_up_client.get_group_members_by_group(group_id)
+async def get_settle_up_users(request, group_id: str):
+    settle_up_client = await AsyncSettleUpClient.create()
+    return await settle_up_client.get_group_members_by_group(group_id)
+
+
+@router.delete("/users/cache/", response={204: None})
+async def invalidate_settle_up_users(request, group_id: str):
+    await AsyncSettleUpClient.invalidate_group_members(group_id)
+    return 204, None
 
 
 @router.post("/transactions/", response={204: None})
-def post_settle_up_create_transaction(request, payload: TransactionPostIn):
-    settle_up_client = SettleUpClient()
-    settle_up_client.create_transaction(payload)
+async def post_settle_up_create_transaction(
+    request,
+    response: HttpResponse,
+    payload: TransactionPostIn,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+):
+    settle_up_client = await AsyncSettleUpClient.create()
+    transaction_id, replayed = await create_transaction_once(
+        settle_up_client, payload, idempotency_key
+    )
 
+    response["X-Transaction-Id"] = transaction_id
+    if replayed:
+        response["Idempotent-Replayed"] = "true"
     return 204, None
+
+
+@router.post("/transactions/batch/", response={200: list[TransactionBatchItemOut]})
+async def post_settle_up_create_transactions(request, payload: list[TransactionPostIn]):
+    if len(payload) > settings.SETTLE_UP_TRANSACTION_BATCH_MAX:
+        raise HttpError(
+            400,
+            f"At most {settings.SETTLE_UP_TRANSACTION_BATCH_MAX} transactions per batch.",
+        )
+
+    settle_up_client = await AsyncSettleUpClient.create()
+    return await settle_up_client.create_transactions(payload)
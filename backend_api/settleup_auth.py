@@ -0,0 +1,139 @@
+"""Process-wide Firebase credentials for the Settle Up service account.
+
+``get_token_manager()`` returns one ``FirebaseTokenManager`` per process. It
+keeps the id token in memory, so building a ``SettleUpClient`` on the hot path
+touches neither Redis nor pyrebase, and a daemon thread renews the token with
+the refresh token ``SETTLE_UP_TOKEN_REFRESH_MARGIN`` seconds before it expires.
+
+Credentials are shared across workers through the default cache. Renewals are
+single-flight behind a Redis lock: whoever wins the lock refreshes and
+publishes, everyone else adopts the published token instead of signing in too.
+"""
+
+import logging
+import threading
+import time
+from functools import cached_property, lru_cache
+
+import pyrebase
+from django.conf import settings
+from django.core.cache import cache
+from redis.exceptions import LockError
+
+logger = logging.getLogger(__name__)
+
+# Firebase id tokens live for an hour; treat them as expiring a little earlier.
+TOKEN_TTL = 3500
+# Back-off before the background thread retries a failed refresh.
+RETRY_DELAY = 30
+
+
+class FirebaseTokenManager:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._creds: dict | None = None
+        self._expires_at = 0.0
+        self._refresher: threading.Thread | None = None
+
+    @property
+    def _cache_key(self) -> str:
+        return f"{settings.SETTLE_UP_USER}_firebase_token"
+
+    @cached_property
+    def _auth(self):
+        return pyrebase.initialize_app(settings.SETTLE_UP_CONFIG).auth()
+
+    def _is_fresh(self, expires_at: float) -> bool:
+        return time.time() < expires_at - settings.SETTLE_UP_TOKEN_REFRESH_MARGIN
+
+    def has_fresh_credentials(self) -> bool:
+        return self._creds is not None and self._is_fresh(self._expires_at)
+
+    def get_credentials(self) -> dict:
+        """Return the current credentials, blocking only if none are usable."""
+        if self._creds is not None and time.time() < self._expires_at:
+            return self._creds
+
+        with self._lock:
+            if self._creds is None or time.time() >= self._expires_at:
+                self.refresh()
+            self._ensure_refresher()
+
+        return self._creds
+
+    def refresh(self) -> None:
+        """Adopt fresh shared credentials, renewing them if nobody else has."""
+        if self._adopt_cached():
+            return
+
+        try:
+            with cache.lock(f"{self._cache_key}_lock", timeout=30, blocking_timeout=30):
+                # Another worker may have renewed while we waited on the lock.
+                if self._adopt_cached():
+                    return
+                self._renew()
+        except LockError:
+            # Lock holder died or is stuck; don't leave this worker tokenless.
+            if not self._adopt_cached():
+                self._renew()
+
+    def _adopt_cached(self) -> bool:
+        if (v := cache.get(self._cache_key)) and self._is_fresh(v["expires_at"]):
+            self._creds, self._expires_at = v["creds"], v["expires_at"]
+            return True
+        return False
+
+    def _renew(self) -> None:
+        creds = None
+
+        if self._creds and (refresh_token := self._creds.get("refreshToken")):
+            try:
+                user = self._auth.refresh(refresh_token)
+                creds = {
+                    "localId": user["userId"],
+                    "idToken": user["idToken"],
+                    "refreshToken": user["refreshToken"],
+                }
+            except Exception as e:
+                logger.warning("Firebase token refresh failed; signing in: %s", e)
+
+        if creds is None:
+            creds = self._auth.sign_in_with_email_and_password(
+                settings.SETTLE_UP_USER,
+                settings.SETTLE_UP_PASSWORD,
+            )
+
+        expires_at = time.time() + TOKEN_TTL
+        cache.set(
+            self._cache_key,
+            timeout=TOKEN_TTL,
+            value={"creds": creds, "expires_at": expires_at},
+        )
+        self._creds, self._expires_at = creds, expires_at
+
+    def _ensure_refresher(self) -> None:
+        if self._refresher is None or not self._refresher.is_alive():
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name="firebase-token-refresh", daemon=True
+            )
+            self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            delay = (
+                self._expires_at - settings.SETTLE_UP_TOKEN_REFRESH_MARGIN - time.time()
+            )
+            time.sleep(max(delay, 0))
+
+            try:
+                with self._lock:
+                    self.refresh()
+            except Exception as e:
+                logger.warning("Background Firebase token refresh failed: %s", e)
+                time.sleep(RETRY_DELAY)
+
+
+@lru_cache(maxsize=1)
+def get_token_manager() -> FirebaseTokenManager:
+    """Return the process-wide token manager."""
+    return FirebaseTokenManager()
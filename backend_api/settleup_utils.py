@@ -1,75 +1,146 @@
+import asyncio
+import logging
+import math
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timezone
 
-import pyrebase
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core.cache import cache
 
 from backend_api.dataclasses.settleup import SettleUpGroup
+from backend_api.http_client import get_http_client
+from backend_api.l1_cache import MISSING, L1Cache, VersionStamp
+from backend_api.metrics import CACHE_REQUESTS, histogram
+from backend_api.push_ids import generate_push_id
+from backend_api.settleup_auth import get_token_manager
 from backend_api.utils import compute_member_totals, compute_weights
-from backend_api.schemas import TransactionPostIn, UserTransactionSchema
+from backend_api.schemas import (
+    TransactionBatchItemOut,
+    TransactionPostIn,
+    UserTransactionSchema,
+)
 
+logger = logging.getLogger(__name__)
 
-class SettleUpClient:
-    def __init__(self):
-        firebase = pyrebase.initialize_app(settings.SETTLE_UP_CONFIG)
-        pb_auth = firebase.auth()
-        cache_key = f"{settings.SETTLE_UP_USER}_token"
+GROUPS_CACHE_KEY = "settle_up_groups"
+# When the groups were last invalidated; older per-group entries aren't reused.
+GROUPS_INVALIDATED_KEY = "settle_up_groups_invalidated_at"
+# Longest a background refresh may run before another worker may start one.
+REFRESH_LOCK_TIMEOUT = 60
 
-        if v := cache.get(cache_key):
-            creds = v
-        else:
-            creds = pb_auth.sign_in_with_email_and_password(
-                settings.SETTLE_UP_USER,
-                settings.SETTLE_UP_PASSWORD,
-            )
-            cache.set(cache_key, timeout=3500, value=creds)
+REFRESH_SECONDS = {
+    kind: histogram(
+        f"settleup_{kind}_refresh_seconds",
+        f"Time to refetch Settle Up {kind} into the cache",
+    )
+    for kind in ("groups", "members")
+}
+HTTP_SECONDS = histogram(
+    "settleup_http_request_seconds",
+    "Time for one Settle Up Firebase REST call, by method and top-level node",
+    labelnames=("method", "endpoint"),
+)
+STALE_AGE_SECONDS = {
+    kind: histogram(
+        f"settleup_{kind}_stale_age_seconds",
+        f"Age of stale Settle Up {kind} served while they are refreshed",
+        buckets=(300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 86400, math.inf),
+    )
+    for kind in ("groups", "members")
+}
+
+# Per-process copies of the entries above (see l1_cache.py). Every write to
+# them bumps the stamp, so other workers drop their copies within
+# SETTLE_UP_L1_VERSION_CHECK_INTERVAL.
+L1 = L1Cache(settings.SETTLE_UP_L1_MAX_ENTRIES, settings.SETTLE_UP_L1_TTL)
+L1_VERSION = VersionStamp(
+    "settle_up_l1_version", settings.SETTLE_UP_L1_VERSION_CHECK_INTERVAL
+)
+
+# Strong references to in-flight background refreshes, so they aren't
+# garbage-collected mid-run.
+_background_refreshes: set[asyncio.Task] = set()
+
+
+def _count_lookup(cache_name: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache_name, result="hit" if hit else "miss").inc()
+
+
+class BaseSettleUpClient:
+    """Firebase auth and the I/O-free parts shared by the sync and async clients."""
+
+    def __init__(self):
+        creds = self._get_credentials()
 
         self.user_id = creds.get("localId")
         self.auth_params = {"auth": creds.get("idToken")}
 
-    def get_groups(self) -> list[SettleUpGroup]:
-        cache_key = "settle_up_groups"
+    @staticmethod
+    def _get_credentials() -> dict:
+        return get_token_manager().get_credentials()
 
-        if v := cache.get(cache_key):
-            return v
+    @staticmethod
+    def _group_cache_key(group_id: str) -> str:
+        return f"settle_up_group_{group_id}"
 
-        groups = requests.get(
-            f"{settings.SETTLE_UP_BASE_URL}/userGroups/{self.user_id}.json",
-            params=self.auth_params,
-        )
-        groups = groups.json()
-        groups_map = []
+    @staticmethod
+    def _members_cache_key(group_id: str) -> str:
+        return f"{group_id}_settle_up_users"
 
-        for group_id, metadata in groups.items():
-            group = requests.get(
-                f"{settings.SETTLE_UP_BASE_URL}/groups/{group_id}.json",
-                params=self.auth_params,
-            )
-            group = group.json()
-            groups_map.append(
-                SettleUpGroup(
-                    name=group["name"],
-                    id=group_id,
-                )
-            )
-        groups_map = groups_map[::-1]
-        cache.set(cache_key, timeout=86500, value=groups_map)
+    @staticmethod
+    def _cache_entry(value) -> dict:
+        return {"value": value, "fetched_at": time.time()}
 
-        return groups_map
+    @staticmethod
+    def _entry_age(entry) -> float | None:
+        """Seconds since ``entry`` was fetched, or None for a miss."""
+        if isinstance(entry, dict) and "fetched_at" in entry:
+            return time.time() - entry["fetched_at"]
+        return None
 
-    def get_group_members_by_group(self, group_id):
-        cache_key = f"{group_id}_settle_up_users"
+    @classmethod
+    def _cached_group(cls, cached: dict, group_id: str) -> SettleUpGroup | None:
+        """A group from a listing's ``get_many``, if fresh enough to reuse.
 
-        if v := cache.get(cache_key):
-            return v
+        Entries past the soft TTL, or fetched before the groups were last
+        invalidated, are refetched with the listing.
+        """
+        entry = cached.get(cls._group_cache_key(group_id))
+        age = cls._entry_age(entry)
+        if age is None or age >= settings.SETTLE_UP_CACHE_SOFT_TTL:
+            return None
+        if entry["fetched_at"] <= cached.get(GROUPS_INVALIDATED_KEY, 0):
+            return None
+        return entry["value"]
 
-        members = requests.get(
-            f"{settings.SETTLE_UP_BASE_URL}/members/{group_id}.json",
-            params=self.auth_params,
-        )
-        members = members.json()
+    @staticmethod
+    def _collect_groups(
+        group_ids: list[str], results: list
+    ) -> tuple[list[SettleUpGroup], bool]:
+        """Drop groups whose fetch failed; report whether the listing is complete.
+
+        ``results`` holds a ``SettleUpGroup`` or the raised exception per id, so
+        one bad group is logged and skipped instead of failing the listing.
+        """
+        groups_map = []
+        complete = True
+
+        for group_id, group in zip(group_ids, results):
+            if isinstance(group, Exception):
+                logger.warning(
+                    "Fetching Settle Up group %s failed: %s", group_id, group
+                )
+                complete = False
+                continue
+            groups_map.append(group)
+
+        return groups_map[::-1], complete
+
+    @staticmethod
+    def _parse_members(members: dict) -> list[dict]:
         result = []
 
         for member_id, metadata in members.items():
@@ -81,47 +152,47 @@ class SettleUpClient:
                 }
             )
 
-        cache.set(cache_key, timeout=86500, value=result)
-
         return result
 
     @staticmethod
     def _compute_weights(shares):
         return compute_weights(shares)
 
-    def _compute_transaction(
-        self,
-        receipt_items: list[UserTransactionSchema],
-        tax_percentage: int,
-        group_id: str,
-        total_amount: float = 0,
-        split_receipt_items: list[float] | None = None,
-    ):
-        members = self.get_group_members_by_group(group_id)
-        return compute_member_totals(
-            receipt_items=receipt_items,
-            tax_percentage=tax_percentage,
+    def _build_transaction_payload(
+        self, payload: TransactionPostIn, members: list[dict]
+    ) -> dict:
+        member_receipt_item_total_map = compute_member_totals(
+            receipt_items=payload.user_receipt_items,
+            tax_percentage=payload.tax_percentage,
             members=members,
-            total_amount=total_amount,
-            split_receipt_items=split_receipt_items,
+            total_amount=payload.total_amount,
+            split_receipt_items=payload.split_receipt_items,
         )
 
-    def create_transaction(self, payload: TransactionPostIn):
+        results = self._compute_weights(tuple(member_receipt_item_total_map.values()))
+        return self._transaction_body(payload, member_receipt_item_total_map, results)
+
+    def _build_transaction_payloads(
+        self,
+        payloads: list[TransactionPostIn],
+        members_by_group: dict[str, list[dict]],
+    ) -> list[dict]:
+        """``_build_transaction_payload`` for each payload, members fetched once."""
+        return [
+            self._build_transaction_payload(payload, members_by_group[payload.group_id])
+            for payload in payloads
+        ]
+
+    @staticmethod
+    def _transaction_body(
+        payload: TransactionPostIn, member_receipt_item_total_map: dict, results
+    ) -> dict:
         now = time.time_ns() // 1_000_000
 
         if payload.receipt_date:
             now = payload.receipt_date.replace(tzinfo=timezone.utc)
             now = int(now.timestamp() * 1000)
 
-        member_receipt_item_total_map = self._compute_transaction(
-            receipt_items=payload.user_receipt_items,
-            tax_percentage=payload.tax_percentage,
-            split_receipt_items=payload.split_receipt_items,
-            group_id=payload.group_id,
-            total_amount=payload.total_amount,
-        )
-
-        results = self._compute_weights(tuple(member_receipt_item_total_map.values()))
         for_whom = [
             {"memberId": member_id, "weight": str(total_amt)}
             for member_id, total_amt in zip(
@@ -149,10 +220,361 @@ class SettleUpClient:
         if v := payload.receipt_image_url:
             transaction_payload["receiptUrl"] = v
 
-        response = requests.post(
-            f"{settings.SETTLE_UP_BASE_URL}/transactions/{payload.group_id}.json",
-            json=transaction_payload,
-            params=self.auth_params,
+        return transaction_payload
+
+
+class SettleUpClient(BaseSettleUpClient):
+    def get_groups(self) -> list[SettleUpGroup]:
+        return self._cached(GROUPS_CACHE_KEY, "groups", self._fetch_groups)
+
+    def _fetch_groups(self) -> tuple[list[SettleUpGroup], bool]:
+        with HTTP_SECONDS.labels(method="GET", endpoint="userGroups").time():
+            groups = requests.get(
+                f"{settings.SETTLE_UP_BASE_URL}/userGroups/{self.user_id}.json",
+                params=self.auth_params,
+            )
+        group_ids = list(groups.json() or {})
+        cached = cache.get_many(
+            [GROUPS_INVALIDATED_KEY, *(self._group_cache_key(g) for g in group_ids)]
+        )
+
+        def get_group(group_id: str) -> SettleUpGroup:
+            if v := self._cached_group(cached, group_id):
+                return v
+            return self._get_group(group_id)
+
+        with ThreadPoolExecutor(
+            max_workers=settings.SETTLE_UP_GROUP_FETCH_CONCURRENCY
+        ) as pool:
+            futures = [pool.submit(get_group, group_id) for group_id in group_ids]
+        results = [future.exception() or future.result() for future in futures]
+
+        return self._collect_groups(group_ids, results)
+
+    def _get_group(self, group_id: str) -> SettleUpGroup:
+        with HTTP_SECONDS.labels(method="GET", endpoint="groups").time():
+            group = requests.get(
+                f"{settings.SETTLE_UP_BASE_URL}/groups/{group_id}.json",
+                params=self.auth_params,
+            )
+        group = group.json()
+        group = SettleUpGroup(
+            name=group["name"],
+            id=group_id,
+        )
+        cache.set(
+            self._group_cache_key(group_id),
+            timeout=settings.SETTLE_UP_CACHE_HARD_TTL,
+            value=self._cache_entry(group),
+        )
+
+        return group
+
+    def get_group_members_by_group(self, group_id):
+        def fetch():
+            with HTTP_SECONDS.labels(method="GET", endpoint="members").time():
+                members = requests.get(
+                    f"{settings.SETTLE_UP_BASE_URL}/members/{group_id}.json",
+                    params=self.auth_params,
+                )
+            return self._parse_members(members.json()), True
+
+        return self._cached(self._members_cache_key(group_id), "members", fetch)
+
+    def _cached(self, key: str, kind: str, fetch):
+        """Read ``key`` through the cache, fetching it inline on a miss.
+
+        No route uses this client, so it skips the async client's
+        stale-while-revalidate and L1; entries it writes are shared with it.
+        """
+        entry = cache.get(key)
+        _count_lookup("settleup", hit := self._entry_age(entry) is not None)
+        if hit:
+            return entry["value"]
+
+        start = time.monotonic()
+        value, cacheable = fetch()
+        REFRESH_SECONDS[kind].observe(time.monotonic() - start)
+        if cacheable:
+            cache.set(
+                key,
+                self._cache_entry(value),
+                timeout=settings.SETTLE_UP_CACHE_HARD_TTL,
+            )
+            L1_VERSION.bump(cache)
+        return value
+
+    def _compute_transaction(
+        self,
+        receipt_items: list[UserTransactionSchema],
+        tax_percentage: int,
+        group_id: str,
+        total_amount: float = 0,
+        split_receipt_items: list[float] | None = None,
+    ):
+        members = self.get_group_members_by_group(group_id)
+        return compute_member_totals(
+            receipt_items=receipt_items,
+            tax_percentage=tax_percentage,
+            members=members,
+            total_amount=total_amount,
+            split_receipt_items=split_receipt_items,
         )
 
+    def create_transaction(self, payload: TransactionPostIn):
+        members = self.get_group_members_by_group(payload.group_id)
+        transaction_payload = self._build_transaction_payload(payload, members)
+
+        with HTTP_SECONDS.labels(method="POST", endpoint="transactions").time():
+            response = requests.post(
+                f"{settings.SETTLE_UP_BASE_URL}/transactions/{payload.group_id}.json",
+                json=transaction_payload,
+                params=self.auth_params,
+            )
+
         return response.json()
+
+
+class AsyncSettleUpClient(BaseSettleUpClient):
+    """``SettleUpClient`` for async views, over the shared keep-alive pool.
+
+    Build it with ``await AsyncSettleUpClient.create()`` so a (blocking)
+    Firebase sign-in never runs on the event loop; with a fresh token in memory
+    it is built inline at no cost.
+    """
+
+    @classmethod
+    async def create(cls) -> "AsyncSettleUpClient":
+        if get_token_manager().has_fresh_credentials():
+            return cls()
+        return await sync_to_async(cls)()
+
+    async def _get_json(self, path: str):
+        endpoint = path.split("/")[1]
+        with HTTP_SECONDS.labels(method="GET", endpoint=endpoint).time():
+            response = await get_http_client().get(
+                f"{settings.SETTLE_UP_BASE_URL}{path}", params=self.auth_params
+            )
+        return response.json()
+
+    async def get_groups(self) -> list[SettleUpGroup]:
+        return await self._cached(GROUPS_CACHE_KEY, "groups", self._fetch_groups)
+
+    async def _fetch_groups(self) -> tuple[list[SettleUpGroup], bool]:
+        groups = await self._get_json(f"/userGroups/{self.user_id}.json")
+        group_ids = list(groups or {})
+        cached = await cache.aget_many(
+            [GROUPS_INVALIDATED_KEY, *(self._group_cache_key(g) for g in group_ids)]
+        )
+        semaphore = asyncio.Semaphore(settings.SETTLE_UP_GROUP_FETCH_CONCURRENCY)
+
+        async def get_group(group_id: str) -> SettleUpGroup:
+            if v := self._cached_group(cached, group_id):
+                return v
+
+            async with semaphore:
+                group = await self._get_json(f"/groups/{group_id}.json")
+            group = SettleUpGroup(
+                name=group["name"],
+                id=group_id,
+            )
+            await cache.aset(
+                self._group_cache_key(group_id),
+                timeout=settings.SETTLE_UP_CACHE_HARD_TTL,
+                value=self._cache_entry(group),
+            )
+
+            return group
+
+        results = await asyncio.gather(
+            *(get_group(group_id) for group_id in group_ids), return_exceptions=True
+        )
+
+        return self._collect_groups(group_ids, results)
+
+    async def get_group_members_by_group(self, group_id):
+        async def fetch():
+            members = await self._get_json(f"/members/{group_id}.json")
+            return self._parse_members(members), True
+
+        return await self._cached(self._members_cache_key(group_id), "members", fetch)
+
+    async def _cached(self, key: str, kind: str, fetch):
+        """Serve ``key`` stale-while-revalidate.
+
+        ``fetch`` returns ``(value, cacheable)``. A miss (or an entry past the
+        hard TTL, which Redis has dropped) fetches inline. An entry past the
+        soft TTL is returned as is while one background task per key, across
+        workers, refetches it.
+
+        Entries are read through the per-process ``L1`` first, so a warm worker
+        serves them without a Redis round trip.
+        """
+        version = await L1_VERSION.acurrent(cache)
+        if (entry := L1.get(key, version)) is MISSING:
+            entry = await cache.aget(key)
+            if hit := self._entry_age(entry) is not None:
+                L1.set(key, entry, version)
+            _count_lookup("settleup_l1", hit=False)
+            _count_lookup("settleup", hit)
+        else:
+            _count_lookup("settleup_l1", hit=True)
+        if (age := self._entry_age(entry)) is None:
+            return await self._refresh(key, kind, fetch)
+
+        if age >= settings.SETTLE_UP_CACHE_SOFT_TTL:
+            STALE_AGE_SECONDS[kind].observe(age)
+            if await cache.aadd(
+                f"{key}_refreshing", True, timeout=REFRESH_LOCK_TIMEOUT
+            ):
+                task = asyncio.create_task(self._refresh_quietly(key, kind, fetch))
+                _background_refreshes.add(task)
+                task.add_done_callback(_background_refreshes.discard)
+        return entry["value"]
+
+    async def _refresh(self, key: str, kind: str, fetch):
+        start = time.monotonic()
+        value, cacheable = await fetch()
+        REFRESH_SECONDS[kind].observe(time.monotonic() - start)
+        if cacheable:
+            entry = self._cache_entry(value)
+            await cache.aset(key, entry, timeout=settings.SETTLE_UP_CACHE_HARD_TTL)
+            L1.set(key, entry, await L1_VERSION.abump(cache))
+        return value
+
+    async def _refresh_quietly(self, key: str, kind: str, fetch) -> None:
+        try:
+            await self._refresh(key, kind, fetch)
+        except Exception as e:
+            logger.warning("Background refresh of %s failed: %s", key, e)
+        finally:
+            await cache.adelete(f"{key}_refreshing")
+
+    @classmethod
+    async def invalidate_groups(cls) -> None:
+        """Drop the cached group listing and stop reusing any cached group."""
+        await cache.aset(
+            GROUPS_INVALIDATED_KEY,
+            time.time(),
+            timeout=settings.SETTLE_UP_CACHE_HARD_TTL,
+        )
+        await cache.adelete(GROUPS_CACHE_KEY)
+        L1.delete(GROUPS_CACHE_KEY)
+        await L1_VERSION.abump(cache)
+
+    @classmethod
+    async def invalidate_group_members(cls, group_id: str) -> None:
+        await cache.adelete(cls._members_cache_key(group_id))
+        L1.delete(cls._members_cache_key(group_id))
+        await L1_VERSION.abump(cache)
+
+    async def create_transaction(self, payload: TransactionPostIn):
+        members = await self.get_group_members_by_group(payload.group_id)
+        transaction_payload = self._build_transaction_payload(payload, members)
+
+        with HTTP_SECONDS.labels(method="POST", endpoint="transactions").time():
+            response = await get_http_client().post(
+                f"{settings.SETTLE_UP_BASE_URL}/transactions/{payload.group_id}.json",
+                json=transaction_payload,
+                params=self.auth_params,
+            )
+
+        return response.json()
+
+    async def put_transaction(self, payload: TransactionPostIn, transaction_id: str):
+        """Write the transaction at a known push key (idempotent, unlike POST)."""
+        members = await self.get_group_members_by_group(payload.group_id)
+        transaction_payload = self._build_transaction_payload(payload, members)
+
+        with HTTP_SECONDS.labels(method="PUT", endpoint="transactions").time():
+            response = await get_http_client().put(
+                f"{settings.SETTLE_UP_BASE_URL}/transactions/{payload.group_id}/"
+                f"{transaction_id}.json",
+                json=transaction_payload,
+                params=self.auth_params,
+            )
+        response.raise_for_status()
+
+    async def create_transactions(
+        self, payloads: list[TransactionPostIn]
+    ) -> list[TransactionBatchItemOut]:
+        """Create many transactions with one multi-path PATCH per group.
+
+        Members are fetched once per group and shared by every body built
+        from it. Each transaction gets a client-generated push key, so
+        a group's transactions land in a single atomic write: they all succeed
+        or all fail together. Groups are written independently, and the
+        outcome is reported per transaction, in input order.
+        """
+        results = [
+            TransactionBatchItemOut(index=index, group_id=payload.group_id)
+            for index, payload in enumerate(payloads)
+        ]
+        group_ids = list(dict.fromkeys(payload.group_id for payload in payloads))
+        members = await asyncio.gather(
+            *(self.get_group_members_by_group(group_id) for group_id in group_ids),
+            return_exceptions=True,
+        )
+        members_by_group = {}
+        for group_id, group_members in zip(group_ids, members):
+            if isinstance(group_members, Exception):
+                logger.warning(
+                    "Fetching members of group %s failed: %s", group_id, group_members
+                )
+                for result in results:
+                    if result.group_id == group_id:
+                        result.error = f"Could not fetch group members: {group_members}"
+            else:
+                members_by_group[group_id] = group_members
+
+        for result in results:
+            payload = payloads[result.index]
+            # Shared items can't be split among no members; reject just that
+            # transaction instead of failing the whole batch.
+            if (
+                payload.split_receipt_items
+                and members_by_group.get(result.group_id) == []
+            ):
+                result.error = (
+                    "Cannot split shared items among a group with no members."
+                )
+
+        pending = [
+            r for r in results if r.group_id in members_by_group and r.error is None
+        ]
+        bodies = self._build_transaction_payloads(
+            [payloads[result.index] for result in pending], members_by_group
+        )
+        writes: dict[str, dict[str, dict]] = {}
+        for result, body in zip(pending, bodies):
+            if not body["items"][0]["forWhom"]:
+                result.error = "No member owes anything on this transaction."
+                continue
+            result.transaction_id = generate_push_id()
+            writes.setdefault(result.group_id, {})[result.transaction_id] = body
+
+        async def write(group_id: str, updates: dict[str, dict]):
+            try:
+                with HTTP_SECONDS.labels(
+                    method="PATCH", endpoint="transactions"
+                ).time():
+                    response = await get_http_client().patch(
+                        f"{settings.SETTLE_UP_BASE_URL}/transactions/{group_id}.json",
+                        json=updates,
+                        params=self.auth_params,
+                    )
+                response.raise_for_status()
+            except Exception as e:
+                logger.warning(
+                    "Writing transactions to group %s failed: %s", group_id, e
+                )
+                for result in results:
+                    if result.transaction_id in updates:
+                        result.transaction_id = None
+                        result.error = str(e) or type(e).__name__
+
+        await asyncio.gather(
+            *(write(group_id, updates) for group_id, updates in writes.items())
+        )
+
+        return results
@@ -1,9 +1,11 @@
 from types import SimpleNamespace
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from backend_api.settleup_utils import SettleUpClient
+from backend_api.l1_cache import L1Cache, VersionStamp
+from backend_api.settleup_auth import get_token_manager
+from backend_api.settleup_utils import AsyncSettleUpClient, SettleUpClient
 
 # Fake Firebase credentials returned by the mocked sign-in. The shape mirrors
 # what pyrebase returns so SettleUpClient.__init__ can read `localId`/`idToken`.
@@ -23,21 +25,37 @@ def mock_settleup():
 
     - Firebase auth (``pyrebase``): the real ``sign_in_with_email_and_password``
       login is replaced with fake credentials, so constructing a
-      ``SettleUpClient`` performs **no real login**.
-    - The SettleUp REST API (``requests``) used to fetch group members.
+      ``SettleUpClient`` performs **no real login**. The process-wide token
+      manager is reset around each test so credentials never leak between them,
+      and its background refresh thread is never started.
+    - The SettleUp REST API (``requests``) used to fetch group members, and
+      the pooled ``httpx`` client the async variant uses for the same calls.
     - The cache, forced to always miss so the mocked login/REST paths run and
-      Redis is never contacted.
+      Redis is never contacted. The in-process L1 in front of it is disabled.
 
     Yields the mocks so individual tests can tailor responses (for example a
     different member set) before exercising the client.
     """
+    get_token_manager.cache_clear()
     with (
-        patch("backend_api.settleup_utils.pyrebase") as mock_pyrebase,
+        patch("backend_api.settleup_auth.pyrebase") as mock_pyrebase,
+        patch("backend_api.settleup_auth.cache") as mock_auth_cache,
+        patch("backend_api.settleup_auth.FirebaseTokenManager._ensure_refresher"),
         patch("backend_api.settleup_utils.requests") as mock_requests,
         patch("backend_api.settleup_utils.cache") as mock_cache,
+        patch("backend_api.settleup_utils.get_http_client") as mock_get_http_client,
+        patch("backend_api.settleup_utils.L1", L1Cache(maxsize=0, ttl=0)),
+        patch("backend_api.settleup_utils.L1_VERSION", VersionStamp("v", 0)),
     ):
         # Force a cache miss so the (mocked) login and REST paths actually run.
+        mock_auth_cache.get.return_value = None
         mock_cache.get.return_value = None
+        mock_cache.get_many.return_value = {}
+        mock_cache.aget = AsyncMock(return_value=None)
+        mock_cache.aget_many = AsyncMock(return_value={})
+        mock_cache.aset = AsyncMock()
+        mock_cache.aadd = AsyncMock(return_value=True)
+        mock_cache.aincr = AsyncMock()
 
         # No real Firebase login — return fake credentials.
         auth = mock_pyrebase.initialize_app.return_value.auth.return_value
@@ -46,9 +64,20 @@ def mock_settleup():
         # Stub the SettleUp REST members endpoint.
         mock_requests.get.return_value.json.return_value = GROUP_MEMBERS
 
+        http_client = mock_get_http_client.return_value
+        http_client.get = AsyncMock(
+            return_value=MagicMock(json=MagicMock(return_value=GROUP_MEMBERS))
+        )
+        http_client.post = AsyncMock(return_value=MagicMock())
+
         yield SimpleNamespace(
-            pyrebase=mock_pyrebase, requests=mock_requests, cache=mock_cache
+            pyrebase=mock_pyrebase,
+            requests=mock_requests,
+            cache=mock_cache,
+            auth_cache=mock_auth_cache,
+            http_client=http_client,
         )
+    get_token_manager.cache_clear()
 
 
 @pytest.fixture
@@ -60,3 +89,9 @@ def settle_up_client(mock_settleup):
     or Redis traffic.
     """
     return SettleUpClient()
+
+
+@pytest.fixture
+def async_settle_up_client(mock_settleup):
+    """The ``AsyncSettleUpClient`` counterpart of ``settle_up_client``."""
+    return AsyncSettleUpClient()
@@ -0,0 +1,115 @@
+import asyncio
+import io
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from ninja.errors import HttpError
+from PIL import Image
+
+from backend_api.api import post_ocr_receipts_batch
+from backend_api.dataclasses.receipt_item import ReceiptData
+
+DELAY = 0.2
+
+
+def _jpeg(width: int = 8, height: int = 8) -> bytes:
+    out = io.BytesIO()
+    Image.new("L", (width, height), 255).save(out, format="JPEG")
+    return out.getvalue()
+
+
+IMAGE = _jpeg()
+# Decodes fine, but the stub extraction fails on it.
+BAD = _jpeg(16, 16)
+
+
+def _upload(name: str, data: bytes = IMAGE) -> InMemoryUploadedFile:
+    return InMemoryUploadedFile(
+        io.BytesIO(data), "files", name, "image/jpeg", len(data), None
+    )
+
+
+@pytest.fixture
+def pipeline(settings):
+    """Stub extraction and upload with fixed latency; track LLM concurrency."""
+    settings.OCR_CACHE_ENABLED = False
+    state = MagicMock(in_flight=0, max_in_flight=0)
+
+    async def extract_receipt(image):
+        state.in_flight += 1
+        state.max_in_flight = max(state.max_in_flight, state.in_flight)
+        try:
+            await asyncio.sleep(DELAY)
+            if bytes(image) == BAD:
+                raise ValueError("unreadable receipt")
+            return ReceiptData(en_shop_name="Shop", jp_shop_name="店", total_amount=1)
+        finally:
+            state.in_flight -= 1
+
+    async def aupload_receipt_image(upload):
+        await asyncio.sleep(DELAY / 2)
+        return f"https://example.com/{upload.name}"
+
+    with (
+        patch("backend_api.receipts.extract_receipt", extract_receipt),
+        patch("backend_api.receipts.aupload_receipt_image", aupload_receipt_image),
+    ):
+        yield state
+
+
+def _post(files):
+    return asyncio.run(post_ocr_receipts_batch(MagicMock(), files=files))
+
+
+class TestBatchOCR:
+    def test_results_in_upload_order_in_about_one_receipts_time(self, pipeline):
+        files = [_upload(f"{i}.jpg") for i in range(4)]
+
+        start = time.perf_counter()
+        results = _post(files)
+        elapsed = time.perf_counter() - start
+
+        assert [r.filename for r in results] == ["0.jpg", "1.jpg", "2.jpg", "3.jpg"]
+        assert [r.index for r in results] == [0, 1, 2, 3]
+        assert all(r.receipt.receipt_image_url.endswith(r.filename) for r in results)
+        assert elapsed < DELAY * 2
+
+    def test_failing_receipt_is_reported_without_failing_the_batch(self, pipeline):
+        results = _post([_upload("a.jpg"), _upload("b.jpg", BAD), _upload("c.jpg")])
+
+        assert results[1].receipt is None
+        assert results[1].error == "unreadable receipt"
+        assert results[0].receipt and results[2].receipt
+        assert results[0].error is None
+
+    def test_oversized_receipt_is_reported_in_place(self, pipeline, settings):
+        settings.RECEIPT_UPLOAD_MAX_BYTES = len(IMAGE)
+
+        results = _post([_upload("a.jpg"), _upload("big.jpg", IMAGE + b"x")])
+
+        assert results[0].receipt
+        assert "exceeds" in results[1].error
+
+    def test_unsupported_format_is_reported_in_place(self, pipeline):
+        results = _post([_upload("a.jpg"), _upload("notes.txt", b"not an image")])
+
+        assert results[0].receipt
+        assert results[1].error == "Receipt image format is not supported."
+
+    def test_llm_calls_are_bounded(self, pipeline, settings):
+        settings.RECEIPT_BATCH_LLM_CONCURRENCY = 2
+
+        results = _post([_upload(f"{i}.jpg") for i in range(5)])
+
+        assert all(r.receipt for r in results)
+        assert pipeline.max_in_flight == 2
+
+    def test_rejects_too_many_files(self, pipeline, settings):
+        settings.RECEIPT_BATCH_MAX_FILES = 2
+
+        with pytest.raises(HttpError) as exc:
+            _post([_upload(f"{i}.jpg") for i in range(3)])
+
+        assert exc.value.status_code == 400
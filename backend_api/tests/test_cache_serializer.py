@@ -0,0 +1,121 @@
+import os
+import pickle
+import time
+from datetime import datetime, timezone
+
+import pytest
+from django.conf import settings
+from django_redis.client import DefaultClient
+
+from backend_api.cache_serializer import CacheSerializer
+from backend_api.dataclasses.settleup import SettleUpGroup
+from backend_api.dataclasses.receipt_item import ReceiptItemData
+from backend_api.schemas import OCRReceiptPostOut
+
+
+@pytest.fixture
+def client() -> DefaultClient:
+    """The configured cache's encode/decode path; nothing connects to Redis."""
+    config = settings.CACHES["default"]
+    return DefaultClient(config["LOCATION"], config, backend=None)
+
+
+def _receipt(items: int) -> OCRReceiptPostOut:
+    return OCRReceiptPostOut(
+        receipt_items=[
+            ReceiptItemData(
+                english_name=f"Item {i}",
+                japanese_name=f"商品{i}",
+                item_order=i,
+                cost=100 + i,
+                quantity=1,
+            )
+            for i in range(items)
+        ],
+        en_shop_name="Lawson",
+        jp_shop_name="ローソン",
+        tax_percentage=8,
+        total_amount=1000,
+        receipt_date=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        receipt_image_url="https://example.com/receipt.jpg",
+    )
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        True,
+        "translated",
+        {"creds": {"idToken": "t"}, "expires_at": 1.5},
+        {"value": [SettleUpGroup(name="Trip", id="g1")], "fetched_at": time.time()},
+        b"\x89PNG image bytes",
+        _receipt(50),
+    ],
+)
+def test_values_round_trip(client, value):
+    assert client.decode(client.encode(value)) == value
+
+
+def test_models_are_stored_as_json_not_pickle():
+    serializer = CacheSerializer({})
+    group = SettleUpGroup(name="Trip", id="g1")
+
+    data = serializer.dumps([group])
+
+    assert data.startswith(b"j")
+    assert len(data) < len(pickle.dumps([group]))
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        {1: "int key"},
+        {"at": datetime(2026, 1, 1, tzinfo=timezone.utc)},
+        {"__model__": "not a model"},
+    ],
+)
+def test_values_json_cannot_represent_are_pickled(value):
+    serializer = CacheSerializer({})
+
+    data = serializer.dumps(value)
+
+    assert data.startswith(b"\x80")
+    assert serializer.loads(data) == value
+
+
+def test_entries_from_the_pickle_serializer_still_load(client):
+    legacy = pickle.dumps({"value": [SettleUpGroup(name="Trip", id="g1")]})
+
+    assert client.decode(legacy) == {"value": [SettleUpGroup(name="Trip", id="g1")]}
+
+
+def test_model_that_no_longer_validates_reads_as_a_miss():
+    serializer = CacheSerializer({})
+    data = serializer.dumps(SettleUpGroup(name="Trip", id="g1")).replace(
+        b'"name":"Trip",', b""
+    )
+
+    assert serializer.loads(data) is None
+
+
+def test_only_large_payloads_are_compressed(client):
+    small, large = client.encode(_receipt(1)), client.encode(_receipt(50))
+
+    assert small.startswith(b"j")
+    assert not large.startswith(b"j")
+    assert client.decode(large) == _receipt(50)
+
+
+def test_image_bytes_are_not_compressed(client):
+    image = b"\xff\xd8\xff" + b"\0" * 4096
+
+    assert client.encode(image) == b"b" + image
+    assert client.decode(client.encode(image)) == image
+
+
+def test_payloads_that_barely_compress_are_stored_as_is(client):
+    value = {"blob": os.urandom(4096)}
+    encoded = client.encode(value)
+
+    assert encoded == pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    assert client.decode(encoded) == value
@@ -1,4 +1,10 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+
 from backend_api.schemas import TransactionPostIn, UserTransactionSchema
+from backend_api.tests.conftest import GROUP_MEMBERS
 
 
 class TestCreateTransactionPayload:
@@ -63,3 +69,149 @@ class TestCreateTransactionPayload:
 
         body = mock_settleup.requests.post.call_args.kwargs["json"]
         assert body["receiptUrl"] == "https://example.com/receipt.jpg"
+
+
+class TestAsyncCreateTransactionPayload:
+    """The async client POSTs the same body as the sync one, via the pool."""
+
+    def test_matches_sync_payload(
+        self, settle_up_client, async_settle_up_client, mock_settleup
+    ):
+        payload = TransactionPostIn(
+            purpose="Lunch",
+            paying_member_id="Member 1",
+            tax_percentage=10,
+            total_amount=330.0,
+            user_receipt_items=[
+                UserTransactionSchema(member_id="Member 1", cost=100),
+                UserTransactionSchema(member_id="Member 2", cost=100),
+            ],
+            split_receipt_items=[100],
+            group_id="Group A",
+            receipt_date="2026-05-30T12:34:56",
+        )
+
+        settle_up_client.create_transaction(payload)
+        asyncio.run(async_settle_up_client.create_transaction(payload))
+
+        sync_call = mock_settleup.requests.post.call_args
+        async_call = mock_settleup.http_client.post.call_args
+        assert async_call.args == sync_call.args
+        assert async_call.kwargs == sync_call.kwargs
+
+
+def _lunch(group_id="Group A", **overrides) -> TransactionPostIn:
+    return TransactionPostIn(
+        **{
+            "purpose": "Lunch",
+            "paying_member_id": "Member 1",
+            "tax_percentage": 10,
+            "total_amount": 330.0,
+            "user_receipt_items": [
+                UserTransactionSchema(member_id="Member 1", cost=100),
+                UserTransactionSchema(member_id="Member 2", cost=100),
+            ],
+            "split_receipt_items": [100],
+            "group_id": group_id,
+            "receipt_date": "2026-05-30T12:34:56",
+            **overrides,
+        }
+    )
+
+
+class TestAsyncCreateTransactions:
+    """Bulk creation: one member fetch and one multi-path PATCH per group."""
+
+    def test_writes_each_group_in_one_patch(
+        self, settle_up_client, async_settle_up_client, mock_settleup
+    ):
+        mock_settleup.http_client.patch = AsyncMock(return_value=MagicMock())
+        payloads = [
+            _lunch("Group A"),
+            _lunch("Group B", total_amount=300.0),
+            _lunch("Group A", purpose="Dinner", split_receipt_items=[]),
+        ]
+
+        results = asyncio.run(async_settle_up_client.create_transactions(payloads))
+
+        assert [(r.index, r.group_id, r.error) for r in results] == [
+            (0, "Group A", None),
+            (1, "Group B", None),
+            (2, "Group A", None),
+        ]
+        assert mock_settleup.http_client.get.await_count == 2
+        patches = {
+            call.args[0].rsplit("/", 1)[-1]: call.kwargs["json"]
+            for call in mock_settleup.http_client.patch.call_args_list
+        }
+        assert list(patches) == ["Group A.json", "Group B.json"]
+        assert list(patches["Group A.json"]) == [
+            results[0].transaction_id,
+            results[2].transaction_id,
+        ]
+        # Same bodies the one-at-a-time path would have posted.
+        for payload, result in zip(payloads, results):
+            settle_up_client.create_transaction(payload)
+            expected = mock_settleup.requests.post.call_args.kwargs["json"]
+            group = patches[f"{payload.group_id}.json"]
+            assert group[result.transaction_id] == expected
+
+    def test_failed_group_write_is_reported_per_transaction(
+        self, async_settle_up_client, mock_settleup
+    ):
+        async def patch(url, json, params):
+            if "Group B" in url:
+                raise httpx.ConnectError("connection refused")
+            return MagicMock()
+
+        mock_settleup.http_client.patch = patch
+
+        results = asyncio.run(
+            async_settle_up_client.create_transactions(
+                [_lunch("Group A"), _lunch("Group B"), _lunch("Group B")]
+            )
+        )
+
+        assert results[0].transaction_id and results[0].error is None
+        assert [(r.transaction_id, r.error) for r in results[1:]] == [
+            (None, "connection refused"),
+            (None, "connection refused"),
+        ]
+
+    def test_transaction_nobody_owes_is_not_written(
+        self, async_settle_up_client, mock_settleup
+    ):
+        mock_settleup.http_client.patch = AsyncMock(return_value=MagicMock())
+
+        results = asyncio.run(
+            async_settle_up_client.create_transactions(
+                [_lunch(user_receipt_items=[], split_receipt_items=[])]
+            )
+        )
+
+        assert results[0].transaction_id is None
+        assert results[0].error == "No member owes anything on this transaction."
+        mock_settleup.http_client.patch.assert_not_awaited()
+
+    def test_shared_items_in_a_group_without_members_are_reported_in_place(
+        self, async_settle_up_client, mock_settleup
+    ):
+        async def get(url, params):
+            members = {} if "Group B" in url else GROUP_MEMBERS
+            return MagicMock(json=MagicMock(return_value=members))
+
+        mock_settleup.http_client.get = get
+        mock_settleup.http_client.patch = AsyncMock(return_value=MagicMock())
+
+        results = asyncio.run(
+            async_settle_up_client.create_transactions(
+                [_lunch("Group A"), _lunch("Group B")]
+            )
+        )
+
+        assert results[0].transaction_id and results[0].error is None
+        assert results[1].transaction_id is None
+        assert results[1].error == (
+            "Cannot split shared items among a group with no members."
+        )
+        mock_settleup.http_client.patch.assert_awaited_once()
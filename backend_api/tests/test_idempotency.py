@@ -0,0 +1,126 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+from ninja.errors import HttpError
+
+from backend_api.idempotency import create_transaction_once
+from backend_api.schemas import TransactionPostIn, UserTransactionSchema
+from backend_api.settleup_api import post_settle_up_create_transaction
+
+
+def _payload(**overrides) -> TransactionPostIn:
+    return TransactionPostIn(
+        **{
+            "purpose": "Lunch",
+            "paying_member_id": "Member 1",
+            "tax_percentage": 10,
+            "total_amount": 200.0,
+            "user_receipt_items": [
+                UserTransactionSchema(member_id="Member 1", cost=100),
+                UserTransactionSchema(member_id="Member 2", cost=100),
+            ],
+            "group_id": "Group A",
+            **overrides,
+        }
+    )
+
+
+@pytest.fixture
+def client():
+    """A local-memory cache and a Settle Up client whose writes are recorded."""
+    cache = LocMemCache("idempotency-test", {})
+    cache.clear()
+    client = MagicMock()
+    client.put_transaction = AsyncMock()
+    with patch("backend_api.idempotency.cache", cache):
+        yield client
+
+
+def _written_ids(client) -> list[str]:
+    return [call.args[1] for call in client.put_transaction.await_args_list]
+
+
+class TestCreateTransactionOnce:
+    def test_retry_replays_the_stored_result(self, client):
+        first = asyncio.run(create_transaction_once(client, _payload(), "key-1"))
+        retry = asyncio.run(create_transaction_once(client, _payload(), "key-1"))
+
+        assert first == (first[0], False)
+        assert retry == (first[0], True)
+        assert _written_ids(client) == [first[0]]
+
+    def test_concurrent_duplicates_write_once(self, client):
+        async def slow_put(payload, transaction_id):
+            await asyncio.sleep(0.1)
+
+        client.put_transaction.side_effect = slow_put
+
+        async def duplicates():
+            return await asyncio.gather(
+                *(
+                    create_transaction_once(client, _payload(), "key-1")
+                    for _ in range(5)
+                )
+            )
+
+        results = asyncio.run(duplicates())
+
+        assert len({transaction_id for transaction_id, _ in results}) == 1
+        assert sorted(replayed for _, replayed in results) == [False] + [True] * 4
+        assert client.put_transaction.await_count == 1
+
+    def test_failed_write_is_retried_at_the_same_key(self, client):
+        client.put_transaction.side_effect = [TimeoutError("read timeout"), None]
+
+        with pytest.raises(TimeoutError):
+            asyncio.run(create_transaction_once(client, _payload(), "key-1"))
+        transaction_id, replayed = asyncio.run(
+            create_transaction_once(client, _payload(), "key-1")
+        )
+
+        # A write that landed despite the timeout is overwritten, not duplicated.
+        assert _written_ids(client) == [transaction_id, transaction_id]
+        assert not replayed
+
+    def test_key_reused_for_another_payload_is_rejected(self, client):
+        asyncio.run(create_transaction_once(client, _payload(), "key-1"))
+
+        with pytest.raises(HttpError) as exc:
+            asyncio.run(
+                create_transaction_once(client, _payload(total_amount=300.0), "key-1")
+            )
+
+        assert exc.value.status_code == 422
+
+    def test_without_a_key_identical_payloads_are_deduplicated(self, client):
+        first, _ = asyncio.run(create_transaction_once(client, _payload()))
+        again, replayed = asyncio.run(create_transaction_once(client, _payload()))
+        other, _ = asyncio.run(create_transaction_once(client, _payload(purpose="Tea")))
+
+        assert (again, replayed) == (first, True)
+        assert other != first
+        assert client.put_transaction.await_count == 2
+
+
+def test_view_flags_replayed_responses(client):
+    async def post():
+        response = HttpResponse()
+        status, _ = await post_settle_up_create_transaction(
+            MagicMock(), response, _payload(), idempotency_key="key-1"
+        )
+        return status, response
+
+    with patch(
+        "backend_api.settleup_api.AsyncSettleUpClient.create",
+        AsyncMock(return_value=client),
+    ):
+        first_status, first = asyncio.run(post())
+        retry_status, retry = asyncio.run(post())
+
+    assert first_status == retry_status == 204
+    assert "Idempotent-Replayed" not in first
+    assert retry["Idempotent-Replayed"] == "true"
+    assert retry["X-Transaction-Id"] == first["X-Transaction-Id"]
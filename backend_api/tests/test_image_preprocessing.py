@@ -0,0 +1,99 @@
+import io
+
+import pytest
+from PIL import Image, ImageDraw, UnidentifiedImageError
+
+from backend_api.image_preprocessing import (
+    estimate_skew,
+    estimate_vision_tokens,
+    image_size,
+    preprocess_receipt_image,
+    receipt_bbox,
+)
+
+
+def _receipt_photo(size=(3000, 4000), angle=0):
+    """A bright 'receipt' with dark text rows on a darker tabletop."""
+    paper = Image.new("L", (1400, 3000), 245)
+    draw = ImageDraw.Draw(paper)
+    for y in range(100, 2900, 60):
+        draw.rectangle((80, y, 1300, y + 22), fill=20)
+    paper = paper.rotate(angle, expand=True, fillcolor=0)
+
+    photo = Image.new("L", size, 50)
+    photo.paste(paper, (600, 400), paper.point(lambda p: 255 if p else 0))
+    return photo
+
+
+def _encode(img, fmt, **kwargs):
+    out = io.BytesIO()
+    img.save(out, format=fmt, **kwargs)
+    return out.getvalue()
+
+
+class TestPreprocessReceiptImage:
+    def test_downscales_and_reencodes_as_jpeg(self, settings):
+        settings.RECEIPT_IMAGE_MAX_EDGE = 1000
+        png = _encode(_receipt_photo().convert("RGB"), "PNG")
+
+        data, media_type = preprocess_receipt_image(png)
+
+        assert media_type == "image/jpeg"
+        img = Image.open(io.BytesIO(data))
+        assert img.format == "JPEG"
+        assert max(img.size) <= 1000
+
+    def test_applies_exif_orientation(self, settings):
+        settings.RECEIPT_IMAGE_MAX_EDGE = 4000
+        img = Image.new("L", (400, 200), 255)
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90° clockwise when displayed
+
+        data, _ = preprocess_receipt_image(_encode(img, "JPEG", exif=exif))
+
+        assert Image.open(io.BytesIO(data)).size == (200, 400)
+
+    @pytest.mark.parametrize(
+        "img",
+        [
+            Image.new("RGB", (1200, 900), "white"),
+            Image.effect_noise((1200, 900), 20).convert("RGB"),
+        ],
+        ids=["blank", "low-texture"],
+    )
+    def test_textless_image_is_not_rotated_or_grown(self, settings, img):
+        settings.RECEIPT_IMAGE_MAX_EDGE = 1600
+        png = _encode(img, "PNG")
+
+        data, _ = preprocess_receipt_image(png)
+
+        assert estimate_skew(img.convert("L")) == 0
+        assert image_size(data) == (1200, 900)
+        assert estimate_vision_tokens(*image_size(data)) <= estimate_vision_tokens(
+            *image_size(png)
+        )
+
+    @pytest.mark.parametrize("preprocess", [True, False])
+    def test_undecodable_bytes_are_not_sent_as_jpeg(self, settings, preprocess):
+        settings.RECEIPT_IMAGE_PREPROCESS = preprocess
+
+        with pytest.raises(UnidentifiedImageError):
+            preprocess_receipt_image(b"not an image")
+
+    def test_disabled_sends_original_with_sniffed_type(self, settings):
+        settings.RECEIPT_IMAGE_PREPROCESS = False
+        png = _encode(Image.new("L", (10, 10)), "PNG")
+
+        assert preprocess_receipt_image(png) == (png, "image/png")
+
+
+class TestLayoutAnalysis:
+    def test_estimate_skew_levels_text_rows(self):
+        assert estimate_skew(_receipt_photo(angle=6)) == -6
+        assert estimate_skew(_receipt_photo()) == 0
+
+    def test_receipt_bbox_finds_the_paper(self):
+        left, top, right, bottom = receipt_bbox(_receipt_photo())
+
+        assert abs(left - 600) < 20 and abs(top - 400) < 20
+        assert abs(right - 2000) < 20 and abs(bottom - 3400) < 20
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+
+from backend_api.l1_cache import MISSING, L1Cache, VersionStamp
+from backend_api.settleup_api import invalidate_settle_up_users
+
+
+class TestL1Cache:
+    def test_least_recently_used_entry_is_evicted(self):
+        l1 = L1Cache(maxsize=2, ttl=60)
+        l1.set("a", 1, version=0)
+        l1.set("b", 2, version=0)
+        l1.get("a", version=0)
+        l1.set("c", 3, version=0)
+
+        assert l1.get("b", version=0) is MISSING
+        assert (l1.get("a", version=0), l1.get("c", version=0)) == (1, 3)
+        assert l1.stats()["evictions"] == 1
+
+    def test_entries_expire_and_follow_the_version(self):
+        l1 = L1Cache(maxsize=2, ttl=60)
+        l1.set("a", 1, version=3)
+
+        assert l1.get("a", version=4) is MISSING
+        with patch("backend_api.l1_cache.time.monotonic", return_value=1e12):
+            assert l1.get("a", version=3) is MISSING
+        assert l1.get("a", version=3) == 1
+        assert l1.stats() | {"hit_rate": None} == {
+            "size": 1,
+            "hits": 1,
+            "misses": 2,
+            "evictions": 0,
+            "hit_rate": None,
+        }
+
+
+class TestVersionStamp:
+    def test_stamp_is_read_at_most_once_per_interval(self):
+        cache = MagicMock()
+        cache.get.return_value = 7
+        stamp = VersionStamp("v", check_interval=60)
+
+        assert [stamp.current(cache) for _ in range(3)] == [7, 7, 7]
+        cache.get.assert_called_once_with("v")
+
+    def test_bump_increments_the_shared_counter(self):
+        cache = LocMemCache("l1-version-test", {})
+        cache.clear()
+        stamp = VersionStamp("v", check_interval=60)
+
+        assert [stamp.bump(cache), stamp.bump(cache)] == [1, 2]
+        assert stamp.current(cache) == 2
+
+
+@pytest.fixture
+def workers(mock_settleup):
+    """Two workers' L1s over one shared cache, checking the stamp every 50ms."""
+    cache = LocMemCache("l1-workers-test", {})
+    cache.clear()
+    worker_l1s = [L1Cache(maxsize=16, ttl=60) for _ in range(2)]
+    stamps = [VersionStamp("settle_up_l1_version", 0.05) for _ in range(2)]
+
+    def on(worker: int):
+        return patch.multiple(
+            "backend_api.settleup_utils",
+            cache=cache,
+            L1=worker_l1s[worker],
+            L1_VERSION=stamps[worker],
+        )
+
+    return on
+
+
+def test_other_workers_drop_invalidated_members(
+    async_settle_up_client, mock_settleup, workers
+):
+    def members(worker: int) -> list[str]:
+        with workers(worker):
+            found = asyncio.run(
+                async_settle_up_client.get_group_members_by_group("group-1")
+            )
+        return [member["id"] for member in found]
+
+    members(0), members(1)
+    assert mock_settleup.http_client.get.await_count == 1
+
+    # Served from each worker's L1; Redis is at most asked for the stamp.
+    with patch.object(
+        LocMemCache, "aget", autospec=True, side_effect=LocMemCache.aget
+    ) as aget:
+        assert members(0) == members(1) == ["Member 1", "Member 2"]
+    assert {call.args[1] for call in aget.call_args_list} <= {"settle_up_l1_version"}
+
+    mock_settleup.http_client.get.return_value.json.return_value = {
+        "Member 3": {"name": "Member 3"}
+    }
+    with workers(0):
+        asyncio.run(invalidate_settle_up_users(MagicMock(), group_id="group-1"))
+    time.sleep(0.05)
+
+    assert members(1) == ["Member 3"]
@@ -0,0 +1,138 @@
+import asyncio
+import io
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from PIL import Image
+from pydantic_ai.messages import ModelResponse, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import FunctionModel
+
+from backend_api.dataclasses.receipt_item import ReceiptData
+from backend_api.llm_cassettes import (
+    Cassette,
+    CassetteMiss,
+    RecordingModel,
+    ReplayModel,
+    replay_tools,
+)
+from backend_api.ocr import extract_receipt, get_receipt_agent
+
+RECEIPT = {
+    "en_shop_name": "Sample Mart",
+    "jp_shop_name": "サンプルマート",
+    "tax_percentage": 8,
+    "total_amount": 200,
+    "receipt_date": "2026-05-30T12:34:56Z",
+    "receipt_items": [
+        {
+            "english_name": "Milk",
+            "japanese_name": "牛乳",
+            "item_order": 1,
+            "cost": 200,
+            "quantity": 1,
+            "discount": 0,
+        }
+    ],
+}
+
+
+def _jpeg(width: int = 8, height: int = 8) -> bytes:
+    out = io.BytesIO()
+    Image.new("L", (width, height), 255).save(out, format="JPEG")
+    return out.getvalue()
+
+
+IMAGE = _jpeg()
+
+
+def _translate_then_answer(messages, info):
+    """Ask for a translation first, then write ``RECEIPT``."""
+    translated = any(
+        isinstance(part, ToolReturnPart)
+        for message in messages
+        for part in message.parts
+    )
+    if not translated:
+        return ModelResponse(
+            parts=[ToolCallPart("translate_jp_to_en_texts", {"texts": ["牛乳"]})]
+        )
+    return ModelResponse(
+        parts=[ToolCallPart(info.output_tools[0].name, json.dumps(RECEIPT))]
+    )
+
+
+@pytest.fixture
+def agent(settings):
+    settings.LLM_API_KEY = "test"
+    settings.RECEIPT_IMAGE_PREPROCESS = False
+    get_receipt_agent.cache_clear()
+    yield get_receipt_agent()
+    get_receipt_agent.cache_clear()
+
+
+@pytest.fixture
+def cassette(agent, tmp_path):
+    """A recorded run of ``_translate_then_answer``, saved and loaded back."""
+    model = RecordingModel(FunctionModel(_translate_then_answer))
+    with (
+        agent.override(model=model),
+        patch("backend_api.ocr.translate_texts", AsyncMock(return_value=["Milk"])),
+    ):
+        asyncio.run(extract_receipt(IMAGE))
+    model.cassette.save(tmp_path / "receipt.json")
+    return Cassette.load(tmp_path / "receipt.json")
+
+
+def _replay(agent, cassette, image=IMAGE):
+    model = ReplayModel(cassette)
+    with agent.override(model=model), replay_tools(cassette) as tools:
+        receipt = asyncio.run(extract_receipt(image))
+    return receipt, model, tools
+
+
+class TestCassettes:
+    def test_recording_holds_every_call_and_tool_result(self, cassette):
+        assert len(cassette.calls) == 2
+        assert all(call["duration"] >= 0 for call in cassette.calls)
+        assert cassette.tools == [
+            {
+                "tool_name": "translate_jp_to_en_texts",
+                "args": {"texts": ["牛乳"]},
+                "content": ["Milk"],
+            }
+        ]
+
+    def test_replay_reproduces_the_run_offline(self, agent, cassette):
+        with patch(
+            "backend_api.translation.translate_texts", side_effect=AssertionError
+        ):
+            receipt, model, tools = _replay(agent, cassette)
+
+        assert receipt == ReceiptData(**RECEIPT)
+        assert (model.served, model.stale, model.retries) == (2, 0, 0)
+        assert tools.misses == 0
+        assert model.duration == pytest.approx(cassette.duration)
+
+    def test_changed_requests_are_counted_stale(self, agent, cassette):
+        receipt, model, _ = _replay(agent, cassette, image=_jpeg(16, 16))
+
+        assert receipt == ReceiptData(**RECEIPT)
+        assert model.stale == 2
+
+    def test_unrecorded_translation_is_a_miss(self, agent, cassette):
+        cassette.tools = []
+
+        receipt, model, tools = _replay(agent, cassette)
+
+        # The tool's failure goes back to the model as a retry prompt, so the
+        # second request no longer matches the recording.
+        assert tools.misses == 1
+        assert (model.retries, model.stale) == (1, 1)
+        assert receipt == ReceiptData(**RECEIPT)
+
+    def test_running_past_the_recording_raises(self, agent, cassette):
+        cassette.calls = cassette.calls[:1]
+
+        with pytest.raises(CassetteMiss):
+            _replay(agent, cassette)
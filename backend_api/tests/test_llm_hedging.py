@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+
+from backend_api.llm_hedging import HEDGES, MIN_SAMPLES, HedgeBudget, HedgedModel
+from backend_api.ocr import get_receipt_agent
+
+
+def _model(answer: str, seconds: float, state: dict):
+    async def run(messages, info):
+        state["calls"] += 1
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            state["cancelled"] += 1
+            raise
+        if answer is None:
+            raise ConnectionError("model unavailable")
+        return ModelResponse(parts=[TextPart(answer)])
+
+    return FunctionModel(run)
+
+
+@pytest.fixture
+def hedged(settings):
+    """Build a ``HedgedModel`` over stub primary and hedge models.
+
+    Returns a function taking each model's delay (and optionally a ``None``
+    hedge answer, to fail it) and returning the run's output, the hedged model
+    and the per-model call state.
+    """
+    settings.LLM_HEDGE_PERCENTILE = 95
+    settings.LLM_HEDGE_MIN_DELAY = 0.01
+    settings.LLM_HEDGE_BUDGET = 1.0
+
+    def run(primary_seconds, hedge_seconds, hedge_answer="hedge", warm=True):
+        state = {
+            "primary": {"calls": 0, "cancelled": 0},
+            "hedge": {"calls": 0, "cancelled": 0},
+        }
+        model = HedgedModel(
+            _model("primary", primary_seconds, state["primary"]),
+            _model(hedge_answer, hedge_seconds, state["hedge"]),
+            budget=HedgeBudget(),
+        )
+        if warm:
+            model.latencies.extend([0.02] * MIN_SAMPLES)
+        output = asyncio.run(Agent(model).run("receipt")).output
+        return output, model, state
+
+    return run
+
+
+class TestHedgedModel:
+    def test_delay_is_the_latency_percentile_with_a_floor(self, settings):
+        settings.LLM_HEDGE_PERCENTILE = 90
+        settings.LLM_HEDGE_MIN_DELAY = 0.5
+        model = HedgedModel(_model("a", 0, {}), _model("b", 0, {}))
+
+        assert model.delay() is None
+        model.latencies.extend(i / 10 for i in range(1, 101))
+        assert model.delay() == pytest.approx(9.0)
+        model.latencies.clear()
+        model.latencies.extend([0.1] * MIN_SAMPLES)
+        assert model.delay() == 0.5
+
+    def test_fast_primary_is_not_hedged(self, hedged):
+        output, model, state = hedged(primary_seconds=0, hedge_seconds=0)
+
+        assert output == "primary"
+        assert state["hedge"]["calls"] == 0
+        assert len(model.latencies) == MIN_SAMPLES + 1
+
+    def test_slow_primary_loses_to_the_hedge_and_is_cancelled(self, hedged):
+        before = HEDGES.value(result="won")
+
+        output, model, state = hedged(primary_seconds=5, hedge_seconds=0)
+
+        assert output == "hedge"
+        assert state["primary"]["cancelled"] == 1
+        assert HEDGES.value(result="won") == before + 1
+        # The cancelled call still counts, as a lower bound of its latency.
+        assert len(model.latencies) == MIN_SAMPLES + 1
+
+    def test_cancelled_run_records_no_latency(self, settings):
+        settings.LLM_HEDGE_MIN_DELAY = 0.01
+        settings.LLM_HEDGE_BUDGET = 1.0
+        state = {"calls": 0, "cancelled": 0}
+        model = HedgedModel(
+            _model("primary", 5, state),
+            _model("hedge", 5, {"calls": 0, "cancelled": 0}),
+            budget=HedgeBudget(),
+        )
+        model.latencies.extend([0.02] * MIN_SAMPLES)
+
+        async def run_and_cancel():
+            run = asyncio.ensure_future(Agent(model).run("receipt"))
+            await asyncio.sleep(0.1)  # past the hedge delay: both calls in flight
+            run.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await run
+
+        asyncio.run(run_and_cancel())
+
+        assert state["cancelled"] == 1
+        assert len(model.latencies) == MIN_SAMPLES
+
+    def test_primary_still_wins_if_the_hedge_fails(self, hedged):
+        before = HEDGES.value(result="lost")
+
+        output, _, state = hedged(
+            primary_seconds=0.1, hedge_seconds=0, hedge_answer=None
+        )
+
+        assert output == "primary"
+        assert state["hedge"]["calls"] == 1
+        assert HEDGES.value(result="lost") == before + 1
+
+    def test_no_hedging_before_enough_latencies_are_seen(self, hedged):
+        output, _, state = hedged(primary_seconds=0.1, hedge_seconds=0, warm=False)
+
+        assert output == "primary"
+        assert state["hedge"]["calls"] == 0
+
+    def test_hedges_are_capped_by_the_budget(self, hedged, settings):
+        settings.LLM_HEDGE_BUDGET = 0.05
+        before = HEDGES.value(result="budget")
+
+        # One call in: a hedge would be 100% extra calls.
+        output, _, state = hedged(primary_seconds=0.1, hedge_seconds=0)
+
+        assert output == "primary"
+        assert state["hedge"]["calls"] == 0
+        assert HEDGES.value(result="budget") == before + 1
+
+    def test_receipt_agent_is_hedged_when_enabled(self, settings):
+        settings.LLM_API_KEY = "test"
+        settings.LLM_HEDGE_ENABLED = True
+        settings.LLM_HEDGE_BASE_URL = "https://hedge.example.com/v1"
+        get_receipt_agent.cache_clear()
+        try:
+            model = get_receipt_agent().model
+        finally:
+            get_receipt_agent.cache_clear()
+
+        assert isinstance(model, HedgedModel)
+        assert str(model.hedge.client.base_url) == "https://hedge.example.com/v1/"
+
+
+class TestHedgeBudget:
+    def test_allows_the_configured_share_of_calls(self, settings):
+        settings.LLM_HEDGE_BUDGET = 0.05
+        budget = HedgeBudget()
+
+        spent = 0
+        for _ in range(100):
+            budget.call()
+            spent += budget.spend()
+
+        assert spent == 5
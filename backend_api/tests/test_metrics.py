@@ -0,0 +1,104 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pydantic_ai.messages import ModelRequest, RetryPromptPart
+
+from backend_api import services
+from backend_api.metrics import (
+    CACHE_REQUESTS,
+    CONTENT_TYPE,
+    Counter,
+    Histogram,
+    render,
+)
+from backend_api.ocr import RETRIES, record_retries
+from backend_api.settleup_utils import HTTP_SECONDS
+from backend_api.uploads import ReceiptUpload
+from settledown.api import get_metrics
+
+
+class TestExposition:
+    def test_histogram_buckets_are_cumulative(self):
+        metric = Histogram("h_seconds", "Help", buckets=(0.5, 1), labelnames=("x",))
+        for value in (0.25, 0.5, 0.75, 3):
+            metric.labels(x="a").observe(value)
+
+        assert metric.samples() == [
+            ("h_seconds_bucket", {"x": "a", "le": "0.5"}, 2),
+            ("h_seconds_bucket", {"x": "a", "le": "1"}, 3),
+            ("h_seconds_bucket", {"x": "a", "le": "+Inf"}, 4),
+            ("h_seconds_sum", {"x": "a"}, 4.5),
+            ("h_seconds_count", {"x": "a"}, 4),
+        ]
+        assert metric.snapshot(x="a")["buckets"] == {0.5: 2, 1: 3}
+
+    def test_labels_must_match_the_label_names(self):
+        metric = Counter("c_total", "Help", labelnames=("x",))
+
+        with pytest.raises(ValueError):
+            metric.labels(y="a")
+        with pytest.raises(ValueError):
+            metric.inc()
+
+    def test_endpoint_renders_every_metric(self):
+        CACHE_REQUESTS.labels(cache="test", result='say "hi"').inc()
+
+        response = asyncio.run(get_metrics(MagicMock()))
+        body = response.content.decode()
+
+        assert response["Content-Type"] == CONTENT_TYPE
+        assert body == render()
+        assert "# TYPE cache_requests_total counter" in body
+        assert 'cache_requests_total{cache="test",result="say \\"hi\\""} ' in body
+        assert "# TYPE settleup_groups_refresh_seconds histogram" in body
+        assert "# TYPE ocr_cache_evictions_total counter" in body
+
+
+class TestStages:
+    def test_upload_fallback_is_timed_per_backend(self):
+        upload = ReceiptUpload(memoryview(b"image"))
+        cloudinary = services.UPLOAD_SECONDS.snapshot(backend="cloudinary")["count"]
+        catbox = services.UPLOAD_SECONDS.snapshot(backend="catbox")["count"]
+        failures = services.UPLOAD_FAILURES.value(backend="cloudinary")
+
+        with (
+            patch.object(services, "cloudinary_upload_file", side_effect=OSError),
+            patch.object(services, "catbox_upload_file", return_value="https://c/x"),
+        ):
+            assert services.upload_receipt_image(upload) == "https://c/x"
+
+        assert services.UPLOAD_SECONDS.snapshot(backend="cloudinary")["count"] == (
+            cloudinary + 1
+        )
+        assert services.UPLOAD_SECONDS.snapshot(backend="catbox")["count"] == catbox + 1
+        assert services.UPLOAD_FAILURES.value(backend="cloudinary") == failures + 1
+
+    def test_retry_prompts_are_counted_by_tool(self):
+        before = RETRIES.value(tool="final_result")
+
+        record_retries(
+            [
+                ModelRequest(
+                    parts=[
+                        RetryPromptPart("bad total", tool_name="final_result"),
+                        RetryPromptPart("bad total", tool_name="final_result"),
+                    ]
+                )
+            ]
+        )
+
+        assert RETRIES.value(tool="final_result") == before + 2
+
+    def test_settle_up_calls_and_lookups_are_recorded(
+        self, async_settle_up_client, mock_settleup
+    ):
+        calls = HTTP_SECONDS.snapshot(method="GET", endpoint="members")["count"]
+        misses = CACHE_REQUESTS.value(cache="settleup", result="miss")
+
+        asyncio.run(async_settle_up_client.get_group_members_by_group("group-1"))
+
+        assert HTTP_SECONDS.snapshot(method="GET", endpoint="members")["count"] == (
+            calls + 1
+        )
+        assert CACHE_REQUESTS.value(cache="settleup", result="miss") == misses + 1
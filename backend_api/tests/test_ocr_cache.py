@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+import pytest
+
+from backend_api.metrics import CACHE_REQUESTS
+from backend_api.ocr_cache import (
+    EVICTIONS,
+    INDEX_KEY,
+    cache_receipt,
+    get_cached_receipt,
+    receipt_cache_key,
+)
+from backend_api.schemas import OCRReceiptPostOut
+
+RECEIPT = OCRReceiptPostOut(
+    receipt_items=[],
+    en_shop_name="Cafe",
+    jp_shop_name="カフェ",
+    tax_percentage=10,
+    total_amount=500,
+    receipt_date="2026-05-30T12:34:56Z",
+    receipt_image_url="https://example.com/receipt.jpg",
+)
+
+
+@pytest.fixture
+def mock_cache():
+    """Patch the Django cache and the raw Redis connection the OCR cache uses."""
+    with (
+        patch("backend_api.ocr_cache.cache") as cache,
+        patch("backend_api.ocr_cache.get_redis_connection") as get_connection,
+    ):
+        redis = get_connection.return_value
+        pipe = redis.pipeline.return_value.__enter__.return_value
+        pipe.execute.return_value = [0, 1, 1]
+        yield cache, redis, pipe
+
+
+class TestReceiptCacheKey:
+    def test_same_bytes_same_key(self):
+        assert receipt_cache_key(b"image") == receipt_cache_key(b"image")
+
+    def test_different_bytes_different_key(self):
+        assert receipt_cache_key(b"image") != receipt_cache_key(b"other")
+
+    def test_model_change_changes_key(self, settings):
+        key = receipt_cache_key(b"image")
+        settings.LLM_MODEL = "another-model"
+        assert receipt_cache_key(b"image") != key
+
+    def test_enabling_the_cascade_changes_key(self, settings):
+        key = receipt_cache_key(b"image")
+        settings.LLM_FAST_MODEL = "fast-model"
+        assert receipt_cache_key(b"image") != key
+
+
+class TestOCRResultCache:
+    def test_miss_returns_none_and_counts(self, mock_cache):
+        cache, redis, _ = mock_cache
+        cache.get.return_value = None
+        before = CACHE_REQUESTS.value(cache="ocr", result="miss")
+
+        assert get_cached_receipt("key") is None
+        assert CACHE_REQUESTS.value(cache="ocr", result="miss") == before + 1
+        redis.zadd.assert_not_called()
+
+    def test_hit_returns_stored_receipt_and_refreshes_recency(self, mock_cache):
+        cache, redis, _ = mock_cache
+        cache.get.return_value = RECEIPT.model_dump(mode="json")
+        before = CACHE_REQUESTS.value(cache="ocr", result="hit")
+
+        assert get_cached_receipt("key") == RECEIPT
+        assert CACHE_REQUESTS.value(cache="ocr", result="hit") == before + 1
+        assert list(redis.zadd.call_args.args[1]) == ["key"]
+
+    def test_disabled_never_touches_cache(self, mock_cache, settings):
+        cache, _, _ = mock_cache
+        settings.OCR_CACHE_ENABLED = False
+
+        assert get_cached_receipt("key") is None
+        cache_receipt("key", RECEIPT)
+        cache.get.assert_not_called()
+        cache.set.assert_not_called()
+
+    def test_redis_error_is_a_miss(self, mock_cache):
+        cache, _, _ = mock_cache
+        cache.get.side_effect = ConnectionError("redis down")
+
+        assert get_cached_receipt("key") is None
+
+    def test_store_evicts_least_recently_used(self, mock_cache, settings):
+        cache, redis, pipe = mock_cache
+        settings.OCR_CACHE_MAX_ENTRIES = 2
+        pipe.execute.return_value = [0, 1, 3]
+        redis.zpopmin.return_value = [(b"old-key", 1.0)]
+        evicted = EVICTIONS.value()
+
+        cache_receipt("key", RECEIPT)
+
+        cache.set.assert_called_once()
+        redis.zpopmin.assert_called_once_with(INDEX_KEY, 1)
+        cache.delete_many.assert_called_once_with(["old-key"])
+        assert EVICTIONS.value() == evicted + 1
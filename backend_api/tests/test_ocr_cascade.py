@@ -0,0 +1,157 @@
+import asyncio
+import io
+import json
+
+import pytest
+from PIL import Image
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+from backend_api.dataclasses.receipt_item import ReceiptData
+from backend_api.ocr import (
+    CASCADE_DECISIONS,
+    CASCADE_TIER_SECONDS,
+    cascade_escalation,
+    extract_receipt,
+    get_fast_receipt_agent,
+    get_receipt_agent,
+)
+
+ITEMS = [
+    {
+        "english_name": "Milk",
+        "japanese_name": "牛乳",
+        "item_order": 1,
+        "cost": 200,
+        "quantity": 1,
+        "discount": 0,
+    },
+    {
+        "english_name": "Bread",
+        "japanese_name": "パン",
+        "item_order": 2,
+        "cost": 150,
+        "quantity": 1,
+        "discount": 0,
+    },
+]
+RECEIPT = {
+    "en_shop_name": "Sample Mart",
+    "jp_shop_name": "サンプルマート",
+    "tax_percentage": 8,
+    "total_amount": 378,
+    "receipt_date": "2026-05-30T12:34:56Z",
+    "receipt_items": ITEMS,
+}
+STRONG_RECEIPT = {**RECEIPT, "en_shop_name": "Strong Mart"}
+
+
+def _jpeg(width: int = 8, height: int = 8) -> bytes:
+    out = io.BytesIO()
+    Image.new("L", (width, height), 255).save(out, format="JPEG")
+    return out.getvalue()
+
+
+def _answer(receipt: dict, calls: list):
+    def run(messages, info):
+        calls.append(info)
+        if isinstance(receipt, Exception):
+            raise receipt
+        return ModelResponse(
+            parts=[ToolCallPart(info.output_tools[0].name, json.dumps(receipt))]
+        )
+
+    return FunctionModel(run)
+
+
+@pytest.fixture
+def cascade(settings):
+    """Run ``extract_receipt`` with the cascade on, over stub fast/strong models.
+
+    Returns a function taking the fast tier's answer (a receipt dict or an
+    exception to raise) and returning the extracted receipt plus the calls
+    each tier got.
+    """
+    settings.LLM_API_KEY = "test"
+    settings.LLM_FAST_MODEL = "fast-model"
+    settings.RECEIPT_IMAGE_PREPROCESS = False
+    get_receipt_agent.cache_clear()
+    get_fast_receipt_agent.cache_clear()
+
+    def run(fast_answer):
+        fast_calls, strong_calls = [], []
+        with (
+            get_fast_receipt_agent().override(model=_answer(fast_answer, fast_calls)),
+            get_receipt_agent().override(model=_answer(STRONG_RECEIPT, strong_calls)),
+        ):
+            receipt = asyncio.run(extract_receipt(_jpeg()))
+        return receipt, len(fast_calls), len(strong_calls)
+
+    yield run
+    get_receipt_agent.cache_clear()
+    get_fast_receipt_agent.cache_clear()
+
+
+def _decisions(outcome: str) -> float:
+    return CASCADE_DECISIONS.value(outcome=outcome)
+
+
+class TestCascadeEscalation:
+    def test_plausible_receipt_is_accepted(self):
+        assert cascade_escalation(ReceiptData(**RECEIPT)) is None
+
+    def test_total_far_from_item_costs_escalates(self):
+        receipt = ReceiptData(**{**RECEIPT, "total_amount": 3780})
+        assert cascade_escalation(receipt) == "confidence"
+
+    def test_untranslated_name_escalates(self):
+        items = [{**ITEMS[0], "english_name": "牛乳"}, ITEMS[1]]
+        receipt = ReceiptData(**{**RECEIPT, "receipt_items": items})
+        assert cascade_escalation(receipt) == "confidence"
+
+    def test_long_receipt_escalates(self, settings):
+        settings.RECEIPT_CASCADE_MAX_ITEMS = 1
+        assert cascade_escalation(ReceiptData(**RECEIPT)) == "long"
+
+
+class TestExtractReceiptCascade:
+    def test_accepted_fast_result_skips_the_strong_model(self, cascade):
+        before = _decisions("accepted")
+        fast_before = CASCADE_TIER_SECONDS.snapshot(tier="fast")["count"]
+
+        receipt, fast_calls, strong_calls = cascade(RECEIPT)
+
+        assert receipt.en_shop_name == "Sample Mart"
+        assert (fast_calls, strong_calls) == (1, 0)
+        assert _decisions("accepted") == before + 1
+        assert CASCADE_TIER_SECONDS.snapshot(tier="fast")["count"] == fast_before + 1
+
+    @pytest.mark.parametrize(
+        "fast_answer, outcome",
+        [
+            ({**RECEIPT, "receipt_items": []}, "validation"),
+            ({**RECEIPT, "total_amount": 3780}, "confidence"),
+            (ConnectionError("fast model down"), "error"),
+        ],
+    )
+    def test_escalates_to_the_strong_model(self, cascade, fast_answer, outcome):
+        before = _decisions(outcome)
+        strong_before = CASCADE_TIER_SECONDS.snapshot(tier="strong")["count"]
+
+        receipt, fast_calls, strong_calls = cascade(fast_answer)
+
+        # The fast tier gets no retries: one failed answer escalates.
+        assert receipt.en_shop_name == "Strong Mart"
+        assert (fast_calls, strong_calls) == (1, 1)
+        assert _decisions(outcome) == before + 1
+        assert (
+            CASCADE_TIER_SECONDS.snapshot(tier="strong")["count"] == strong_before + 1
+        )
+
+    def test_without_a_fast_model_only_the_strong_model_runs(self, cascade, settings):
+        settings.LLM_FAST_MODEL = ""
+
+        receipt, fast_calls, strong_calls = cascade(RECEIPT)
+
+        assert receipt.en_shop_name == "Strong Mart"
+        assert (fast_calls, strong_calls) == (0, 1)
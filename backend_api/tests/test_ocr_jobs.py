@@ -0,0 +1,145 @@
+import asyncio
+from collections import deque
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from ninja.errors import HttpError
+
+from backend_api import ocr_jobs
+from backend_api.api import get_ocr_receipt_job
+from backend_api.schemas import OCRReceiptPostOut
+from backend_api.uploads import ReceiptUpload
+
+RECEIPT = OCRReceiptPostOut(
+    receipt_items=[],
+    en_shop_name="Cafe",
+    jp_shop_name="カフェ",
+    total_amount=500,
+    receipt_date="2026-05-30T12:34:56Z",
+    receipt_image_url="https://example.com/receipt.jpg",
+)
+
+
+@pytest.fixture
+def jobs(settings):
+    """A local-memory cache and an in-memory Redis list for the job queue."""
+    settings.OCR_JOB_POLL_INTERVAL = 0.01
+    cache = LocMemCache("ocr-jobs-test", {})
+    cache.clear()
+    queue = deque()
+    redis = MagicMock()
+    redis.lpush.side_effect = lambda key, job_id: queue.appendleft(job_id)
+
+    def brpop(key, timeout):
+        if not queue:
+            return None
+        return key.encode(), queue.pop().encode()
+
+    redis.brpop.side_effect = brpop
+
+    with (
+        patch("backend_api.ocr_jobs.cache", cache),
+        patch("backend_api.ocr_jobs.get_redis_connection", return_value=redis),
+        patch("backend_api.ocr_jobs.aget_cached_receipt", AsyncMock(return_value=None)),
+        patch("backend_api.ocr_jobs.process_receipt", AsyncMock(return_value=RECEIPT)),
+    ):
+        yield MagicMock(cache=cache, queue=queue)
+
+
+def _upload(data=b"image"):
+    return ReceiptUpload(memoryview(data), name="receipt.jpg")
+
+
+class TestCreateJob:
+    def test_stores_the_image_and_queues_a_pending_job(self, jobs):
+        job = asyncio.run(ocr_jobs.create_job(_upload()))
+
+        assert job["status"] == ocr_jobs.PENDING
+        assert list(jobs.queue) == [job["id"]]
+        assert jobs.cache.get(ocr_jobs.job_image_key(job["id"])) == b"image"
+        assert asyncio.run(ocr_jobs.get_job(job["id"])) == job
+
+    def test_cached_receipt_completes_without_queueing(self, jobs):
+        with patch(
+            "backend_api.ocr_jobs.aget_cached_receipt",
+            AsyncMock(return_value=RECEIPT),
+        ):
+            job = asyncio.run(ocr_jobs.create_job(_upload()))
+
+        assert job["status"] == ocr_jobs.DONE
+        assert job["receipt"]["en_shop_name"] == "Cafe"
+        assert not jobs.queue
+
+
+class TestRunJob:
+    def test_records_the_receipt_and_drops_the_image(self, jobs):
+        job = asyncio.run(ocr_jobs.create_job(_upload()))
+
+        asyncio.run(ocr_jobs.run_job(job["id"]))
+
+        done = asyncio.run(ocr_jobs.get_job(job["id"]))
+        assert done["status"] == ocr_jobs.DONE
+        assert done["receipt"]["receipt_image_url"] == RECEIPT.receipt_image_url
+        assert jobs.cache.get(ocr_jobs.job_image_key(job["id"])) is None
+
+    def test_records_the_error_when_extraction_fails(self, jobs):
+        job = asyncio.run(ocr_jobs.create_job(_upload()))
+
+        with patch(
+            "backend_api.ocr_jobs.process_receipt",
+            AsyncMock(side_effect=ValueError("unreadable receipt")),
+        ):
+            asyncio.run(ocr_jobs.run_job(job["id"]))
+
+        failed = asyncio.run(ocr_jobs.get_job(job["id"]))
+        assert failed["status"] == ocr_jobs.FAILED
+        assert failed["error"] == "unreadable receipt"
+
+
+class TestWorker:
+    def test_runs_queued_jobs(self, jobs):
+        async def scenario():
+            created = [await ocr_jobs.create_job(_upload()) for _ in range(3)]
+            worker = asyncio.create_task(ocr_jobs.run_worker(concurrency=2))
+            try:
+                while True:
+                    statuses = [
+                        (await ocr_jobs.get_job(job["id"]))["status"] for job in created
+                    ]
+                    if statuses == [ocr_jobs.DONE] * 3:
+                        return
+                    await asyncio.sleep(0.01)
+            finally:
+                worker.cancel()
+
+        asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+
+
+class TestJobEvents:
+    def test_streams_status_changes_until_done(self, jobs):
+        async def scenario():
+            job = await ocr_jobs.create_job(_upload())
+            events = []
+
+            async def collect():
+                async for event in ocr_jobs.job_events(job["id"]):
+                    events.append(event)
+
+            stream = asyncio.create_task(collect())
+            await asyncio.sleep(0.05)
+            await ocr_jobs.run_job(job["id"])
+            await asyncio.wait_for(stream, timeout=1)
+            return events
+
+        events = asyncio.run(scenario())
+
+        assert events[0].startswith("event: pending\n")
+        assert events[-1].startswith("event: done\n")
+        assert '"en_shop_name":"Cafe"' in events[-1]
+
+    def test_unknown_job_is_404(self, jobs):
+        with pytest.raises(HttpError) as exc:
+            asyncio.run(get_ocr_receipt_job(MagicMock(), job_id="missing"))
+
+        assert exc.value.status_code == 404
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import sync_to_async
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory
+from ninja.errors import HttpError
+
+from backend_api.profiling import RequestProfilingMiddleware, SamplingProfiler
+from settledown.api import get_profile
+
+TOKEN = "test-token"
+
+
+@pytest.fixture
+def cache(settings):
+    settings.REQUEST_PROFILING_ENABLED = True
+    settings.REQUEST_PROFILE_INTERVAL = 0.002
+    settings.APP_AUTH = TOKEN
+    cache = LocMemCache("profiling-test", {})
+    cache.clear()
+    with patch("backend_api.profiling.cache", cache):
+        yield cache
+
+
+def _request(path="/api/v1/receipts/", token=TOKEN, **headers):
+    return RequestFactory().get(
+        path, headers={"Authorization": f"Bearer {token}", **headers}
+    )
+
+
+def _opted_in(**kwargs):
+    return _request(**kwargs, **{"X-Profile": "1"})
+
+
+def _spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def _wait_for_upstream() -> None:
+    await asyncio.sleep(0.1)
+
+
+async def _view(request):
+    await _wait_for_upstream()
+    await sync_to_async(_spin, thread_sensitive=False)(0.1)
+    return HttpResponse("ok")
+
+
+def _profile(cache, response) -> str:
+    return cache.get(f"request_profile:{response['X-Profile-Id']}")
+
+
+class TestMiddleware:
+    def test_opted_in_request_is_profiled_across_await_and_threads(self, cache):
+        middleware = RequestProfilingMiddleware(_view)
+
+        response = asyncio.run(middleware(_opted_in()))
+
+        profile = _profile(cache, response)
+        assert response["X-Profile-Url"].endswith(response["X-Profile-Id"])
+        # Time awaiting I/O is charged to the coroutine that awaited it, and
+        # sync work to the executor thread that ran it.
+        assert "_view (" in profile and "_wait_for_upstream (" in profile
+        assert "_spin (" in profile
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in profile.splitlines())
+
+    def test_query_flag_also_opts_in(self, cache):
+        middleware = RequestProfilingMiddleware(_view)
+
+        response = asyncio.run(middleware(_request("/api/v1/receipts/?profile=1")))
+
+        assert _profile(cache, response)
+
+    @pytest.mark.parametrize("request_", [_request(), _opted_in(token="wrong")])
+    def test_others_are_not_profiled(self, cache, request_):
+        middleware = RequestProfilingMiddleware(_view)
+
+        with patch("backend_api.profiling.SamplingProfiler") as profiler:
+            response = asyncio.run(middleware(request_))
+
+        profiler.assert_not_called()
+        assert "X-Profile-Id" not in response
+
+    def test_disabled_middleware_is_removed(self, settings):
+        settings.REQUEST_PROFILING_ENABLED = False
+
+        with pytest.raises(MiddlewareNotUsed):
+            RequestProfilingMiddleware(_view)
+
+    def test_sync_request_is_profiled(self, cache):
+        def view(request):
+            _spin(0.1)
+            return HttpResponse("ok")
+
+        response = RequestProfilingMiddleware(view)(_opted_in())
+
+        assert "view (" in _profile(cache, response)
+
+
+def test_loop_samples_of_other_tasks_are_dropped():
+    async def main():
+        profiler = SamplingProfiler(0.002, asyncio.current_task())
+        profiler.start()
+
+        async def someone_else():
+            _spin(0.1)
+
+        await asyncio.create_task(someone_else())
+        await asyncio.sleep(0.05)
+        return profiler.stop()
+
+    profile = asyncio.run(main())
+
+    assert "someone_else" not in profile
+    assert "main (" in profile and "sleep (" in profile
+
+
+def test_profile_endpoint(cache):
+    cache.set("request_profile:abc", "MainThread;view (api.py:1) 3\n")
+
+    response = asyncio.run(get_profile(None, "abc"))
+
+    assert response.content == b"MainThread;view (api.py:1) 3\n"
+    with pytest.raises(HttpError):
+        asyncio.run(get_profile(None, "missing"))
+
+
+def test_sampler_thread_stops():
+    profiler = SamplingProfiler(0.001)
+    profiler.start()
+
+    profiler.stop()
+
+    assert "request-profiler" not in [t.name for t in threading.enumerate()]
@@ -0,0 +1,28 @@
+from unittest.mock import patch
+
+from backend_api.push_ids import PushIdGenerator
+
+NOW_NS = 1_780_000_000_000 * 1_000_000
+
+
+def test_keys_sort_in_creation_order_within_a_millisecond():
+    generator = PushIdGenerator()
+
+    with patch("backend_api.push_ids.time.time_ns", return_value=NOW_NS):
+        keys = [generator.generate() for _ in range(200)]
+
+    # PUSH_CHARS is in ASCII order, so plain string order is creation order.
+    assert keys == sorted(set(keys))
+    assert all(len(key) == 20 for key in keys)
+
+
+def test_timestamp_prefix_orders_keys_across_milliseconds():
+    generator = PushIdGenerator()
+
+    with patch("backend_api.push_ids.time.time_ns") as time_ns:
+        time_ns.return_value = NOW_NS
+        earlier = generator.generate()
+        time_ns.return_value = NOW_NS + 1_000_000
+        later = generator.generate()
+
+    assert earlier[:8] < later[:8]
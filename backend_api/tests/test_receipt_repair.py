@@ -0,0 +1,126 @@
+import asyncio
+import io
+import json
+
+import pytest
+from PIL import Image
+from pydantic_ai import BinaryContent
+from pydantic_ai.messages import ModelRequest, ModelResponse, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+from backend_api.dataclasses.receipt_item import ReceiptData
+from backend_api.ocr import extract_receipt, get_receipt_agent
+from backend_api.receipt_repair import (
+    REPAIR_TOKENS_SAVED,
+    REPAIRS,
+    repair_image,
+)
+
+ITEM = {
+    "english_name": "Milk",
+    "japanese_name": "牛乳",
+    "item_order": 1,
+    "cost": 200,
+    "quantity": 1,
+    "discount": 0,
+}
+RECEIPT = {
+    "en_shop_name": "Sample Mart",
+    "jp_shop_name": "サンプルマート",
+    "tax_percentage": 8,
+    "total_amount": 216,
+    "receipt_date": "2026-05-30T12:34:56Z",
+    "receipt_items": [ITEM],
+}
+
+
+def _jpeg(width=600, height=1200) -> bytes:
+    out = io.BytesIO()
+    Image.new("L", (width, height), 255).save(out, format="JPEG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def retried(settings):
+    """Extract a receipt whose first output is ``bad``, then ``RECEIPT``.
+
+    Returns the images in the user prompt of the retry request.
+    """
+    settings.LLM_API_KEY = "test"
+    settings.RECEIPT_IMAGE_PREPROCESS = False
+    get_receipt_agent.cache_clear()
+
+    def run(bad: dict) -> list[BinaryContent]:
+        requests = []
+
+        def answer(messages, info):
+            requests.append(messages)
+            receipt = bad if len(requests) == 1 else RECEIPT
+            return ModelResponse(
+                parts=[ToolCallPart(info.output_tools[0].name, json.dumps(receipt))]
+            )
+
+        with get_receipt_agent().override(model=FunctionModel(answer)):
+            receipt = asyncio.run(extract_receipt(_jpeg()))
+        assert receipt == ReceiptData(**RECEIPT)
+        assert len(requests) == 2
+
+        prompt = next(
+            part.content
+            for message in requests[1]
+            if isinstance(message, ModelRequest)
+            for part in message.parts
+            if part.part_kind == "user-prompt"
+        )
+        return [c for c in prompt if isinstance(c, BinaryContent)]
+
+    yield run
+    get_receipt_agent.cache_clear()
+
+
+class TestRepairImage:
+    def test_negative_cost_needs_no_image(self):
+        bad = ReceiptData(**{**RECEIPT, "receipt_items": [{**ITEM, "cost": -50}]})
+        assert repair_image(bad) == "none"
+
+    def test_missing_total_needs_the_bottom_of_the_receipt(self):
+        assert repair_image(ReceiptData(**{**RECEIPT, "total_amount": 0})) == "crop"
+
+    def test_no_items_or_unparsed_output_needs_the_whole_image(self):
+        assert repair_image(ReceiptData(**{**RECEIPT, "receipt_items": []})) == "full"
+        assert repair_image(None) == "full"
+
+
+class TestRepairHistory:
+    def test_negative_cost_is_retried_without_the_image(self, retried):
+        before = REPAIRS.value(image="none")
+        saved = REPAIR_TOKENS_SAVED.value()
+
+        images = retried({**RECEIPT, "receipt_items": [{**ITEM, "cost": -50}]})
+
+        assert images == []
+        assert REPAIRS.value(image="none") == before + 1
+        assert REPAIR_TOKENS_SAVED.value() > saved
+
+    def test_missing_total_is_retried_with_a_crop(self, retried):
+        before = REPAIRS.value(image="crop")
+
+        (crop,) = retried({**RECEIPT, "total_amount": 0})
+
+        with Image.open(io.BytesIO(crop.data)) as img:
+            assert img.size == (600, 480)
+        assert REPAIRS.value(image="crop") == before + 1
+
+    def test_empty_items_are_retried_with_the_whole_image(self, retried):
+        (image,) = retried({**RECEIPT, "receipt_items": []})
+
+        assert image.data == _jpeg()
+
+    def test_disabled_retries_with_the_whole_image(self, retried, settings):
+        settings.RECEIPT_REPAIR_ENABLED = False
+        before = REPAIRS.value(image="none")
+
+        (image,) = retried({**RECEIPT, "receipt_items": [{**ITEM, "cost": -50}]})
+
+        assert image.data == _jpeg()
+        assert REPAIRS.value(image="none") == before
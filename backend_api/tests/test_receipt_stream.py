@@ -0,0 +1,174 @@
+import asyncio
+import io
+import json
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+from backend_api.dataclasses.receipt_item import ReceiptData, ReceiptItemData
+from backend_api.ocr import get_receipt_agent
+from backend_api.receipts import (
+    FIRST_ITEM_SECONDS,
+    ReceiptEvents,
+    stream_receipt_events,
+)
+from backend_api.uploads import ReceiptUpload
+
+ITEMS = [
+    {
+        "english_name": name,
+        "japanese_name": jp,
+        "item_order": i,
+        "cost": cost,
+        "quantity": 1,
+        "discount": 0,
+    }
+    for i, (name, jp, cost) in enumerate(
+        [("Milk", "牛乳", 200), ("Bag", "レジ袋", 5), ("Bread", "パン", 150)], start=1
+    )
+]
+RECEIPT = {
+    "en_shop_name": "Sample Mart",
+    "jp_shop_name": "サンプルマート",
+    "tax_percentage": 8,
+    "total_amount": 355,
+    "receipt_date": "2026-05-30T12:34:56Z",
+    "receipt_items": ITEMS,
+}
+
+
+def _jpeg(width: int = 8, height: int = 8) -> bytes:
+    out = io.BytesIO()
+    Image.new("L", (width, height), 255).save(out, format="JPEG")
+    return out.getvalue()
+
+
+def _chunks(payload: dict, size: int = 16) -> list[str]:
+    text = json.dumps(payload, ensure_ascii=False)
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def _parse(events: list[str]) -> list[tuple[str, dict]]:
+    parsed = []
+    for event in events:
+        name, data = event.strip().split("\n")
+        parsed.append((name.removeprefix("event: "), json.loads(data[6:])))
+    return parsed
+
+
+@pytest.fixture
+def receipt_agent(settings):
+    """The real agent, over a FunctionModel that streams ``RECEIPT``."""
+    settings.LLM_API_KEY = "test"
+    settings.OCR_CACHE_ENABLED = False
+    settings.RECEIPT_IMAGE_PREPROCESS = False
+    get_receipt_agent.cache_clear()
+    state = {"streamed": RECEIPT, "chunks_sent": 0, "fallback_runs": 0}
+
+    async def stream(messages, info):
+        name = info.output_tools[0].name
+        for i, chunk in enumerate(_chunks(state["streamed"])):
+            state["chunks_sent"] += 1
+            await asyncio.sleep(0)
+            # Deltas concatenate: the tool name is only sent with the first.
+            yield {0: DeltaToolCall(name=None if i else name, json_args=chunk)}
+
+    def run(messages, info):
+        state["fallback_runs"] += 1
+        return ModelResponse(
+            parts=[ToolCallPart(info.output_tools[0].name, json.dumps(RECEIPT))]
+        )
+
+    async def upload(upload):
+        return "https://example.com/receipt.jpg"
+
+    with (
+        get_receipt_agent().override(model=FunctionModel(run, stream_function=stream)),
+        patch("backend_api.receipts.aupload_receipt_image", upload),
+    ):
+        yield state
+    get_receipt_agent.cache_clear()
+
+
+def _stream(state=None):
+    async def collect():
+        events = []
+        async for event in stream_receipt_events(ReceiptUpload(memoryview(_jpeg()))):
+            events.append((event, state and state["chunks_sent"]))
+        return events
+
+    return asyncio.run(collect())
+
+
+class TestReceiptEvents:
+    def test_fields_are_sent_once_a_later_field_appears(self):
+        events = ReceiptEvents()
+
+        partial = ReceiptData(en_shop_name="Sample", jp_shop_name="サンプル")
+        assert events.update(partial, final=False) == []
+
+        partial = ReceiptData(
+            en_shop_name="Sample Mart", jp_shop_name="サンプルマート", tax_percentage=8
+        )
+        assert [e for e, _ in events.update(partial, final=False)] == ["shop"]
+
+        partial = ReceiptData(
+            **{**RECEIPT, "receipt_items": [ReceiptItemData(**ITEMS[0])]}
+        )
+        # The only item may still be mid-write; the date is settled.
+        assert [e for e, _ in events.update(partial, final=False)] == ["date"]
+
+        final = ReceiptData(**RECEIPT)
+        assert [e for e, _ in events.update(final, final=True)] == ["item"] * 3
+
+
+class TestStreamReceiptEvents:
+    def test_items_arrive_before_the_output_finishes(self, receipt_agent):
+        before = FIRST_ITEM_SECONDS.snapshot()["count"]
+        total_chunks = len(_chunks(RECEIPT))
+
+        events = _stream(receipt_agent)
+        parsed = _parse([event for event, _ in events])
+
+        assert [name for name, _ in parsed] == [
+            "shop",
+            "date",
+            "item",
+            "item",
+            "item",
+            "receipt",
+        ]
+        assert parsed[0][1] == {
+            "en_shop_name": "Sample Mart",
+            "jp_shop_name": "サンプルマート",
+        }
+        assert [data["english_name"] for name, data in parsed if name == "item"] == [
+            "Milk",
+            "Bag",
+            "Bread",
+        ]
+        first_item_sent_at = next(n for event, n in events if "event: item" in event)
+        assert first_item_sent_at < total_chunks
+        assert parsed[-1][1]["receipt_image_url"] == "https://example.com/receipt.jpg"
+        assert FIRST_ITEM_SECONDS.snapshot()["count"] == before + 1
+
+    def test_invalid_streamed_output_is_re_extracted(self, receipt_agent):
+        receipt_agent["streamed"] = {**RECEIPT, "receipt_items": []}
+
+        parsed = _parse([event for event, _ in _stream()])
+
+        assert receipt_agent["fallback_runs"] == 1
+        assert parsed[-1][0] == "receipt"
+        assert len(parsed[-1][1]["receipt_items"]) == 3
+
+    def test_failures_end_the_stream_with_an_error_event(self, receipt_agent):
+        async def upload(upload):
+            raise ConnectionError("cloudinary down")
+
+        with patch("backend_api.receipts.aupload_receipt_image", upload):
+            parsed = _parse([event for event, _ in _stream()])
+
+        assert parsed[-1] == ("error", {"detail": "cloudinary down"})
@@ -0,0 +1,49 @@
+import time
+
+from backend_api.settleup_auth import get_token_manager
+from backend_api.tests.conftest import FAKE_CREDS
+
+REFRESHED = {"userId": "test-local-id", "idToken": "new", "refreshToken": "r2"}
+
+
+class TestFirebaseTokenManager:
+    """In-memory credentials, single-flight renewal, refresh-token reuse."""
+
+    def test_hot_path_touches_neither_redis_nor_firebase(self, mock_settleup):
+        manager = get_token_manager()
+        assert manager.get_credentials() == FAKE_CREDS
+
+        mock_settleup.auth_cache.reset_mock()
+        mock_settleup.pyrebase.reset_mock()
+
+        assert manager.get_credentials() == FAKE_CREDS
+        assert manager.has_fresh_credentials()
+        mock_settleup.auth_cache.get.assert_not_called()
+        mock_settleup.pyrebase.initialize_app.assert_not_called()
+
+    def test_adopts_token_published_by_another_worker(self, mock_settleup):
+        shared = {"localId": "test-local-id", "idToken": "shared"}
+        mock_settleup.auth_cache.get.return_value = {
+            "creds": shared,
+            "expires_at": time.time() + 3000,
+        }
+
+        assert get_token_manager().get_credentials() == shared
+        auth = mock_settleup.pyrebase.initialize_app.return_value.auth.return_value
+        auth.sign_in_with_email_and_password.assert_not_called()
+
+    def test_renewal_uses_refresh_token(self, mock_settleup):
+        manager = get_token_manager()
+        manager._creds = {**FAKE_CREDS, "refreshToken": "r1"}
+        manager._expires_at = time.time() + 10  # inside the refresh margin
+        auth = mock_settleup.pyrebase.initialize_app.return_value.auth.return_value
+        auth.refresh.return_value = REFRESHED
+
+        manager.refresh()
+
+        auth.refresh.assert_called_once_with("r1")
+        auth.sign_in_with_email_and_password.assert_not_called()
+        assert manager.get_credentials()["idToken"] == "new"
+        mock_settleup.auth_cache.lock.assert_called_once()
+        stored = mock_settleup.auth_cache.set.call_args.kwargs["value"]
+        assert stored["creds"]["refreshToken"] == "r2"
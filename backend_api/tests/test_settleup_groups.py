@@ -0,0 +1,188 @@
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+
+from backend_api import settleup_utils
+from backend_api.dataclasses.settleup import SettleUpGroup
+from backend_api.settleup_api import (
+    invalidate_settle_up_groups,
+    invalidate_settle_up_users,
+)
+from backend_api.settleup_utils import REFRESH_SECONDS, STALE_AGE_SECONDS
+
+USER_GROUPS = {"group-1": {}, "group-2": {}, "group-3": {}}
+
+
+def _response(body):
+    return MagicMock(json=MagicMock(return_value=body))
+
+
+def _route(url, **kwargs):
+    """Stub Firebase: group-2 is broken, the rest resolve to their name."""
+    if "/userGroups/" in url:
+        return _response(USER_GROUPS)
+    group_id = url.rsplit("/", 1)[-1].removesuffix(".json")
+    if group_id == "group-2":
+        raise ConnectionError("boom")
+    return _response({"name": f"Name {group_id}"})
+
+
+async def _aroute(url, **kwargs):
+    return _route(url, **kwargs)
+
+
+class TestGetGroups:
+    """Per-group fan-out: cached individually, failures isolated per group."""
+
+    def test_failed_group_is_skipped_and_listing_not_cached(
+        self, async_settle_up_client, mock_settleup
+    ):
+        mock_settleup.http_client.get.side_effect = _aroute
+
+        groups = asyncio.run(async_settle_up_client.get_groups())
+
+        assert groups == [
+            SettleUpGroup(name="Name group-3", id="group-3"),
+            SettleUpGroup(name="Name group-1", id="group-1"),
+        ]
+        cached_keys = [c.args[0] for c in mock_settleup.cache.aset.call_args_list]
+        assert cached_keys == ["settle_up_group_group-1", "settle_up_group_group-3"]
+
+    def test_cached_groups_are_not_refetched(
+        self, async_settle_up_client, mock_settleup
+    ):
+        mock_settleup.http_client.get.side_effect = _aroute
+        mock_settleup.cache.aget_many.return_value = {
+            "settle_up_group_group-2": _entry(
+                SettleUpGroup(name="Cached", id="group-2"), age=5
+            )
+        }
+
+        groups = asyncio.run(async_settle_up_client.get_groups())
+
+        assert [g.name for g in groups] == ["Name group-3", "Cached", "Name group-1"]
+        urls = [c.args[0] for c in mock_settleup.http_client.get.call_args_list]
+        assert not any(url.endswith("/groups/group-2.json") for url in urls)
+        assert mock_settleup.cache.aset.call_args_list[-1].args[0] == (
+            "settle_up_groups"
+        )
+
+    def test_sync_client_isolates_failures(self, settle_up_client, mock_settleup):
+        mock_settleup.requests.get.side_effect = _route
+
+        groups = settle_up_client.get_groups()
+
+        assert [g.id for g in groups] == ["group-3", "group-1"]
+        cached_keys = [c.args[0] for c in mock_settleup.cache.set.call_args_list]
+        assert "settle_up_groups" not in cached_keys
+
+
+@pytest.fixture
+def swr_cache(mock_settleup):
+    """A real local-memory cache in place of the always-miss mock."""
+    cache = LocMemCache("settleup-swr-test", {})
+    cache.clear()
+    with patch("backend_api.settleup_utils.cache", cache):
+        yield cache
+
+
+def _entry(value, age: float) -> dict:
+    return {"value": value, "fetched_at": time.time() - age}
+
+
+class TestStaleWhileRevalidate:
+    """Soft TTL serves stale members at once and refreshes them in the background."""
+
+    def test_fresh_members_are_served_from_cache(
+        self, async_settle_up_client, mock_settleup, swr_cache
+    ):
+        swr_cache.set("group-1_settle_up_users", _entry([{"id": "m1"}], age=5))
+
+        members = asyncio.run(
+            async_settle_up_client.get_group_members_by_group("group-1")
+        )
+
+        assert members == [{"id": "m1"}]
+        mock_settleup.http_client.get.assert_not_awaited()
+
+    def test_stale_members_are_served_then_refreshed_once(
+        self, async_settle_up_client, mock_settleup, swr_cache
+    ):
+        swr_cache.set("group-1_settle_up_users", _entry([{"id": "m1"}], age=3600))
+        refreshes = REFRESH_SECONDS["members"].snapshot()["count"]
+        stale = STALE_AGE_SECONDS["members"].snapshot()["count"]
+
+        async def scenario():
+            served = await asyncio.gather(
+                *(
+                    async_settle_up_client.get_group_members_by_group("group-1")
+                    for _ in range(3)
+                )
+            )
+            await asyncio.gather(*settleup_utils._background_refreshes)
+            return served
+
+        served = asyncio.run(scenario())
+
+        assert served == [[{"id": "m1"}]] * 3
+        assert mock_settleup.http_client.get.await_count == 1
+        refreshed = swr_cache.get("group-1_settle_up_users")["value"]
+        assert [m["id"] for m in refreshed] == ["Member 1", "Member 2"]
+        assert REFRESH_SECONDS["members"].snapshot()["count"] == refreshes + 1
+        assert STALE_AGE_SECONDS["members"].snapshot()["count"] == stale + 3
+
+    def test_invalidated_members_are_refetched(
+        self, async_settle_up_client, mock_settleup, swr_cache
+    ):
+        swr_cache.set("group-1_settle_up_users", _entry([{"id": "m1"}], age=5))
+
+        async def scenario():
+            await invalidate_settle_up_users(MagicMock(), group_id="group-1")
+            return await async_settle_up_client.get_group_members_by_group("group-1")
+
+        members = asyncio.run(scenario())
+
+        assert [m["id"] for m in members] == ["Member 1", "Member 2"]
+        mock_settleup.http_client.get.assert_awaited_once()
+
+    def test_invalidating_groups_refetches_the_listing_and_its_groups(
+        self, async_settle_up_client, mock_settleup, swr_cache
+    ):
+        mock_settleup.http_client.get.side_effect = _aroute
+        group = SettleUpGroup(name="Trip", id="group-1")
+        swr_cache.set("settle_up_groups", _entry([group], age=5))
+        swr_cache.set("settle_up_group_group-1", _entry(group, age=5))
+
+        async def scenario():
+            await invalidate_settle_up_groups(MagicMock())
+            return await async_settle_up_client.get_groups()
+
+        groups = asyncio.run(scenario())
+
+        assert [g.name for g in groups] == ["Name group-3", "Name group-1"]
+
+    def test_renamed_group_shows_up_once_the_stale_listing_is_refreshed(
+        self, async_settle_up_client, mock_settleup, swr_cache
+    ):
+        async def route(url, **kwargs):
+            if "/userGroups/" in url:
+                return _response({"group-1": {}})
+            return _response({"name": "New name"})
+
+        mock_settleup.http_client.get.side_effect = route
+        old = [SettleUpGroup(name="Old name", id="group-1")]
+        swr_cache.set("settle_up_groups", _entry(old, age=3600))
+        swr_cache.set("settle_up_group_group-1", _entry(old[0], age=3600))
+
+        async def scenario():
+            served = await async_settle_up_client.get_groups()
+            await asyncio.gather(*settleup_utils._background_refreshes)
+            return served, await async_settle_up_client.get_groups()
+
+        served, refreshed = asyncio.run(scenario())
+
+        assert served == old
+        assert refreshed == [SettleUpGroup(name="New name", id="group-1")]
@@ -176,3 +176,8 @@ class TestTransaction:
         assert settle_up_client._compute_weights((150.0, 50.0)) == [3, 1]
         assert settle_up_client._compute_weights((100.0, 100.0)) == [1, 1]
         assert settle_up_client._compute_weights((36, 64)) == [9, 16]
+
+    def test_compute_weights_with_nothing_owed(self, settle_up_client):
+        """_compute_weights returns zero weights instead of dividing by a zero GCD."""
+        assert settle_up_client._compute_weights(()) == []
+        assert settle_up_client._compute_weights((0.0, 0.0)) == [0, 0]
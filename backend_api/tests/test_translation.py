@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from backend_api.translation import (
+    normalize_text,
+    translate_texts,
+    translation_cache_key,
+)
+
+
+@pytest.fixture
+def translator():
+    """Patch the per-loop translator and the cache the translations go through."""
+    fake = MagicMock()
+
+    async def translate(text, dest):
+        if isinstance(text, list):
+            return [SimpleNamespace(text=f"en:{t}") for t in text]
+        return SimpleNamespace(text="\n".join(f"en:{t}" for t in text.split("\n")))
+
+    fake.translate = AsyncMock(side_effect=translate)
+
+    with (
+        patch("backend_api.translation.get_translator", return_value=fake),
+        patch("backend_api.translation.cache") as cache,
+    ):
+        cache.aget_many = AsyncMock(return_value={})
+        cache.aset_many = AsyncMock()
+        yield SimpleNamespace(translate=fake.translate, cache=cache)
+
+
+class TestNormalizeText:
+    def test_folds_width_variants_and_whitespace(self):
+        assert normalize_text(" ﾚｼﾞ袋　 Ｌサイズ ") == "レジ袋 Lサイズ"
+
+    def test_variants_share_a_cache_key(self):
+        assert translation_cache_key(normalize_text("ｷﾞｭｳﾆｭｳ")) == (
+            translation_cache_key(normalize_text("ギュウニュウ"))
+        )
+
+
+class TestTranslateTexts:
+    def test_misses_go_out_as_one_request_in_order(self, translator):
+        result = asyncio.run(translate_texts(["牛乳", "レジ袋", "牛乳"]))
+
+        assert result == ["en:牛乳", "en:レジ袋", "en:牛乳"]
+        translator.translate.assert_awaited_once_with("牛乳\nレジ袋", dest="en")
+        stored = translator.cache.aset_many.await_args.args[0]
+        assert stored == {
+            translation_cache_key("牛乳"): "en:牛乳",
+            translation_cache_key("レジ袋"): "en:レジ袋",
+        }
+
+    def test_cached_texts_skip_the_translator(self, translator):
+        translator.cache.aget_many.return_value = {
+            translation_cache_key("牛乳"): "Milk"
+        }
+
+        result = asyncio.run(translate_texts(["牛乳", "レジ袋"]))
+
+        assert result == ["Milk", "en:レジ袋"]
+        translator.translate.assert_awaited_once_with("レジ袋", dest="en")
+
+    def test_all_cached_makes_no_request(self, translator):
+        translator.cache.aget_many.return_value = {
+            translation_cache_key("牛乳"): "Milk"
+        }
+
+        assert asyncio.run(translate_texts(["牛乳"])) == ["Milk"]
+        translator.translate.assert_not_awaited()
+        translator.cache.aset_many.assert_not_awaited()
+
+    def test_falls_back_per_text_when_lines_dont_match(self, translator):
+        translator.translate.side_effect = [
+            SimpleNamespace(text="merged"),
+            [SimpleNamespace(text="Milk"), SimpleNamespace(text="Bag")],
+        ]
+
+        assert asyncio.run(translate_texts(["牛乳", "レジ袋"])) == ["Milk", "Bag"]
+        assert translator.translate.await_args.args[0] == ["牛乳", "レジ袋"]
+
+    def test_cache_errors_fall_through_to_the_translator(self, translator):
+        translator.cache.aget_many.side_effect = ConnectionError("redis down")
+        translator.cache.aset_many.side_effect = ConnectionError("redis down")
+
+        assert asyncio.run(translate_texts(["牛乳"])) == ["en:牛乳"]
+
+    def test_blank_texts_are_not_translated(self, translator):
+        assert asyncio.run(translate_texts(["", "  "])) == ["", ""]
+        translator.translate.assert_not_awaited()
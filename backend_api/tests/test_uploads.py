@@ -0,0 +1,168 @@
+import asyncio
+import io
+import mmap
+import os
+import tracemalloc
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    TemporaryUploadedFile,
+)
+from ninja.errors import HttpError
+from PIL import Image
+
+from backend_api.api import post_ocr_receipt
+from backend_api.dataclasses.receipt_item import ReceiptData
+from backend_api.uploads import ReceiptUpload, sniff_media_type
+
+MB = 2**20
+
+
+def _jpeg(width: int = 8, height: int = 8) -> bytes:
+    out = io.BytesIO()
+    Image.new("L", (width, height), 255).save(out, format="JPEG")
+    return out.getvalue()
+
+
+JPEG = _jpeg()
+
+
+def _in_memory_upload(data: bytes) -> InMemoryUploadedFile:
+    return InMemoryUploadedFile(
+        io.BytesIO(data), "file", "receipt.jpg", "image/jpeg", len(data), None
+    )
+
+
+def _temporary_upload(data: bytes) -> TemporaryUploadedFile:
+    file = TemporaryUploadedFile("receipt.jpg", "image/jpeg", len(data), None)
+    file.write(data)
+    file.flush()
+    return file
+
+
+class TestReceiptUpload:
+    def test_in_memory_upload_shares_the_bytesio_buffer(self):
+        file = _in_memory_upload(JPEG)
+
+        upload = ReceiptUpload.from_uploaded_file(file)
+
+        assert upload.buffer == JPEG
+        assert upload.buffer.readonly
+        assert upload.buffer.obj is file.file.getvalue()  # no copy
+        file.close()  # Django closes uploads while readers may still hold it.
+        assert upload.buffer == JPEG
+
+    def test_temporary_upload_is_memory_mapped(self):
+        file = _temporary_upload(JPEG)
+
+        upload = ReceiptUpload.from_uploaded_file(file)
+
+        assert isinstance(upload.buffer.obj, mmap.mmap)
+        assert upload.buffer == JPEG
+        file.close()  # Django deletes the temp file; the mapping stays valid.
+        assert upload.buffer == JPEG
+
+    def test_rejects_uploads_over_the_size_limit(self, settings):
+        settings.RECEIPT_UPLOAD_MAX_BYTES = 4
+
+        with pytest.raises(HttpError) as exc:
+            ReceiptUpload.from_uploaded_file(_in_memory_upload(b"12345"))
+
+        assert exc.value.status_code == 413
+
+    def test_rejects_empty_uploads(self):
+        with pytest.raises(HttpError) as exc:
+            ReceiptUpload.from_uploaded_file(_in_memory_upload(b""))
+
+        assert exc.value.status_code == 400
+
+    def test_rejects_files_that_are_not_a_decodable_image(self):
+        with pytest.raises(HttpError) as exc:
+            ReceiptUpload.from_uploaded_file(_in_memory_upload(b"not an image"))
+
+        assert exc.value.status_code == 415
+
+    def test_accepts_heic(self):
+        img = Image.new("RGB", (16, 16), "white")
+        out = io.BytesIO()
+        img.save(out, format="HEIF")
+
+        upload = ReceiptUpload.from_uploaded_file(_in_memory_upload(out.getvalue()))
+
+        assert sniff_media_type(upload.buffer) == "image/heif"
+
+    def test_readers_keep_independent_positions(self):
+        upload = ReceiptUpload(memoryview(b"0123456789"))
+        first, second = upload.reader(), upload.reader()
+
+        assert first.read(4) == b"0123"
+        assert second.read() == b"0123456789"
+        assert first.read() == b"456789"
+        first.seek(-2, io.SEEK_END)
+        assert first.read() == b"89"
+
+
+class TestConcurrentLargeUploadsMemory:
+    UPLOADS = 4
+    SIZE = 8 * MB
+
+    @pytest.fixture
+    def pipeline(self, settings):
+        """Run the real view with the LLM and the upload SDK stubbed out."""
+        settings.OCR_CACHE_ENABLED = False
+        settings.RECEIPT_IMAGE_PREPROCESS = False
+        settings.RECEIPT_UPLOAD_MAX_BYTES = 2 * self.SIZE
+
+        receipt = ReceiptData(en_shop_name="Shop", jp_shop_name="店", total_amount=1)
+        agent = MagicMock()
+
+        async def run(prompt):
+            # Pretend to serialize the payload like a provider would.
+            assert len(prompt[1].data) == self.SIZE
+            return SimpleNamespace(output=receipt, all_messages=list)
+
+        agent.run = run
+
+        def upload(file):
+            name, data = file
+            # Stream it out in chunks, like the multipart encoder would.
+            for offset in range(0, len(data), MB):
+                bytes(data[offset : offset + MB])
+            return {"secure_url": f"https://example.com/{name}"}
+
+        with (
+            patch("backend_api.ocr.get_receipt_agent", return_value=agent),
+            patch("backend_api.services.cloudinary.uploader.upload", upload),
+        ):
+            yield
+
+    async def _post_all(self, files):
+        return await asyncio.gather(
+            *(post_ocr_receipt(MagicMock(), file=file) for file in files)
+        )
+
+    @pytest.mark.parametrize("make_file", [_in_memory_upload, _temporary_upload])
+    def test_each_upload_is_copied_into_the_heap_at_most_once(
+        self, pipeline, make_file
+    ):
+        # A real JPEG header, padded out with noise past its end.
+        files = [
+            make_file(JPEG + os.urandom(self.SIZE - len(JPEG)))
+            for _ in range(self.UPLOADS)
+        ]
+
+        tracemalloc.start()
+        try:
+            receipts = asyncio.run(self._post_all(files))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            for file in files:
+                file.close()
+
+        assert all(r.receipt_image_url for r in receipts)
+        # One copy each (the LLM payload bytes), plus slack for chunk buffers.
+        assert peak < self.UPLOADS * self.SIZE * 1.25
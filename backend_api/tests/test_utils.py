@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from backend_api.utils import gather_or_cancel
+
+
+class TestGatherOrCancel:
+    """Concurrent awaits with fail-fast cancellation and unwrapped errors."""
+
+    def test_returns_results_in_argument_order(self):
+        async def value(v, delay):
+            await asyncio.sleep(delay)
+            return v
+
+        results = asyncio.run(gather_or_cancel(value("slow", 0.02), value("fast", 0)))
+        assert results == ["slow", "fast"]
+
+    def test_failure_cancels_siblings_and_reraises_original(self):
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def boom():
+            raise ValueError("upload failed")
+
+        async def main():
+            with pytest.raises(ValueError, match="upload failed"):
+                await gather_or_cancel(slow(), boom())
+            return cancelled.is_set()
+
+        assert asyncio.run(main()) is True
+
+    def test_cancelling_caller_cancels_children(self):
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def main():
+            task = asyncio.ensure_future(gather_or_cancel(slow(), slow()))
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return cancelled.is_set()
+
+        assert asyncio.run(main()) is True
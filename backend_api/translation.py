@@ -0,0 +1,100 @@
+"""Cached Japanese-to-English translation for the receipt agent's tool.
+
+Item names like 牛乳 or レジ袋 repeat across thousands of receipts, so every
+translation is stored in the default (Redis) cache under the SHA-256 of its
+normalized source text (NFKC, so half-width ｶﾀｶﾅ and full-width ＡＢＣ share an
+entry with their canonical forms; whitespace collapsed). Only misses reach
+Google, and all of a call's misses go out as a single newline-joined request.
+
+``googletrans.Translator`` owns an ``httpx.AsyncClient``, so like the shared
+HTTP pool it is created once per event loop rather than per tool call.
+
+As with the OCR cache, Redis errors are logged and treated as misses.
+"""
+
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from weakref import WeakKeyDictionary
+
+from django.conf import settings
+from django.core.cache import cache
+from googletrans import Translator
+
+from backend_api.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "translation:ja_en"
+
+_translators: WeakKeyDictionary[asyncio.AbstractEventLoop, Translator] = (
+    WeakKeyDictionary()
+)
+
+
+def get_translator() -> Translator:
+    """Return the translator for the running event loop, creating it once."""
+    loop = asyncio.get_running_loop()
+
+    if (translator := _translators.get(loop)) is None:
+        translator = Translator(
+            list_operation_max_concurrency=settings.TRANSLATION_MAX_CONCURRENCY
+        )
+        _translators[loop] = translator
+
+    return translator
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form of ``text`` used for the cache key and the request."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def translation_cache_key(text: str) -> str:
+    return f"{KEY_PREFIX}:{hashlib.sha256(text.encode()).hexdigest()}"
+
+
+async def _translate(texts: list[str]) -> list[str]:
+    translator = get_translator()
+
+    # One request for the whole batch; fall back to one per text if Google
+    # merged or split lines so results can't be matched back up.
+    joined = await translator.translate("\n".join(texts), dest="en")
+    lines = joined.text.split("\n")
+    if len(lines) == len(texts):
+        return [line.strip() for line in lines]
+
+    results = await translator.translate(texts, dest="en")
+    return [result.text for result in results]
+
+
+async def translate_texts(texts: list[str]) -> list[str]:
+    """Translate ``texts`` to English, in order, from the cache where possible."""
+    normalized = [normalize_text(text) for text in texts]
+    keys = {text: translation_cache_key(text) for text in normalized if text}
+
+    try:
+        cached = await cache.aget_many(list(keys.values()))
+    except Exception as e:
+        logger.warning("Translation cache lookup failed; treating as a miss: %s", e)
+        CACHE_REQUESTS.labels(cache="translation", result="error").inc()
+        cached = {}
+
+    translations = {text: cached[key] for text, key in keys.items() if key in cached}
+    misses = [text for text in keys if text not in translations]
+    CACHE_REQUESTS.labels(cache="translation", result="hit").inc(len(translations))
+    CACHE_REQUESTS.labels(cache="translation", result="miss").inc(len(misses))
+
+    if misses:
+        fresh = dict(zip(misses, await _translate(misses)))
+        translations.update(fresh)
+        try:
+            await cache.aset_many(
+                {keys[text]: value for text, value in fresh.items()},
+                timeout=settings.TRANSLATION_CACHE_TIMEOUT,
+            )
+        except Exception as e:
+            logger.warning("Translation cache store failed: %s", e)
+
+    return [translations.get(text, "") for text in normalized]
@@ -0,0 +1,119 @@
+"""Shared, zero-copy view of an uploaded receipt file.
+
+Django hands the view either an ``InMemoryUploadedFile`` (small uploads, held in
+a ``BytesIO``) or a ``TemporaryUploadedFile`` (spooled to disk past
+``FILE_UPLOAD_MAX_MEMORY_SIZE``). ``ReceiptUpload`` exposes both as one
+read-only ``memoryview`` — over the ``BytesIO``'s own bytes object, or an mmap
+of the temp file — so the cache-key hasher, preprocessing and the uploaders all
+read the same bytes instead of each taking its own copy.
+
+Uploads are checked to be an image Pillow can decode (HEIC included, via
+``pillow-heif``) before anything else reads them; other files are rejected
+with a 415 rather than sent on under a guessed media type.
+
+The view never needs closing: the mmap is released once the last reader drops
+it (an abandoned upload thread may still hold one), and the mapping outlives
+Django deleting the temp file at the end of the request.
+"""
+
+import io
+import mmap
+
+from django.conf import settings
+from ninja import UploadedFile
+from ninja.errors import HttpError
+from PIL import Image, UnidentifiedImageError
+from pillow_heif import register_heif_opener
+
+register_heif_opener()
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable file object over a buffer, for APIs that want a stream.
+
+    Each reader keeps its own position, so concurrent consumers don't race on
+    a shared ``seek``/``read`` like they would on the upload itself.
+    """
+
+    def __init__(self, buffer: memoryview, name: str = "receipt"):
+        self._buffer = buffer
+        self._pos = 0
+        self.name = name
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        chunk = self._buffer[self._pos : self._pos + len(b)]
+        b[: len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self)}
+        self._pos = max(base[whence] + offset, 0)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+
+def sniff_media_type(image: bytes | memoryview) -> str | None:
+    """Media type of the encoded bytes, whatever the client declared.
+
+    ``None`` if Pillow can't decode them. Only the header is read.
+    """
+    try:
+        with Image.open(BufferReader(memoryview(image))) as img:
+            return Image.MIME.get(img.format)
+    except (UnidentifiedImageError, OSError):
+        return None
+
+
+class ReceiptUpload:
+    def __init__(self, buffer: memoryview, name: str = "receipt"):
+        self.buffer = buffer
+        self.name = name
+
+    @classmethod
+    def from_uploaded_file(cls, file: UploadedFile) -> "ReceiptUpload":
+        """Wrap ``file`` without copying it, enforcing the size limit and format."""
+        if file.size > settings.RECEIPT_UPLOAD_MAX_BYTES:
+            raise HttpError(
+                413,
+                f"Receipt image exceeds {settings.RECEIPT_UPLOAD_MAX_BYTES} bytes.",
+            )
+        if not file.size:
+            raise HttpError(400, "Receipt image is empty.")
+
+        if hasattr(file, "temporary_file_path"):
+            with open(file.temporary_file_path(), "rb") as f:
+                # The mapping keeps its own reference; the fd can close now.
+                buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        elif isinstance(file.file, io.BytesIO):
+            # getvalue() hands out the BytesIO's internal bytes without copying.
+            # Unlike getbuffer() it leaves no export behind, which would make
+            # Django's close() of the upload raise while a reader (e.g. an
+            # abandoned upload thread or a stream) still holds the view.
+            buffer = memoryview(file.file.getvalue())
+        else:
+            file.seek(0)
+            buffer = memoryview(file.read())
+
+        if sniff_media_type(buffer) is None:
+            raise HttpError(415, "Receipt image format is not supported.")
+
+        return cls(buffer, name=file.name or "receipt")
+
+    def reader(self) -> BufferReader:
+        """A fresh stream over the shared buffer, positioned at the start."""
+        return BufferReader(self.buffer, name=self.name)
+
+    def __len__(self) -> int:
+        return len(self.buffer)
@@ -7,6 +7,7 @@ include other shared helpers (including I/O-touching ones); keep those distinct
 from ``settleup_utils.SettleUpClient`` so this module stays cohesive.
 """
 
+import asyncio
 import math
 from collections import defaultdict
 from functools import reduce
@@ -23,8 +24,8 @@ def compute_weights(shares) -> list[int]:
     # Step 1: convert shares to integers if they aren't already
     scaled = [int(round(s * 100)) for s in shares]
 
-    # Step 2: find GCD of all shares
-    gcd_all = reduce(math.gcd, scaled)
+    # Step 2: find GCD of all shares (1 if nobody owes anything)
+    gcd_all = reduce(math.gcd, scaled, 0) or 1
 
     # Step 3: divide each share by the GCD to get weights
     weights = [s // gcd_all for s in scaled]
@@ -96,3 +97,32 @@ def compute_member_totals(
                 )
 
     return member_receipt_item_total_map
+
+
+async def gather_or_cancel(*aws):
+    """Run awaitables concurrently and return their results in order.
+
+    Unlike ``asyncio.gather``, the first failure cancels the siblings instead of
+    leaving them running, and the original exception is re-raised as-is (not
+    wrapped in an ``ExceptionGroup`` like ``TaskGroup``), so callers and Ninja's
+    exception handlers see the same error a sequential ``await`` would raise.
+    Cancelling the caller cancels every child as well.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in tasks:
+            if task.done() and not task.cancelled() and task.exception():
+                raise task.exception()
+        return [task.result() for task in tasks]
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+
+def format_sse(event: str, data: str) -> str:
+    """Encode one server-sent event (``data`` must be a single line, e.g. JSON)."""
+    return f"event: {event}\ndata: {data}\n\n"
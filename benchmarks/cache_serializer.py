@@ -0,0 +1,137 @@
+"""Payload size and encode/decode time of cached values, pickle vs orjson.
+
+Runs representative cache values (the Settle Up group listing and members, the
+Firebase credentials, an OCR result, a queued OCR job's JPEG) through django-redis's encode/decode path,
+i.e. everything ``cache.set``/``cache.get`` do besides the Redis round trip,
+under four configurations: django-redis's default pickle, pickle with zlib on
+every value over 15 bytes, ``CacheSerializer`` alone, and ``CacheSerializer``
+with the configured ``ThresholdCompressor``.
+
+Usage:
+    uv run python -m benchmarks.cache_serializer [--repeat 2000]
+"""
+
+import argparse
+import io
+import os
+import time
+from datetime import datetime, timezone
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+django.setup()
+
+from PIL import Image  # noqa: E402
+
+from django_redis.client import DefaultClient  # noqa: E402
+
+from backend_api.dataclasses.receipt_item import ReceiptItemData  # noqa: E402
+from backend_api.dataclasses.settleup import SettleUpGroup  # noqa: E402
+from backend_api.schemas import OCRReceiptPostOut  # noqa: E402
+from settledown.settings import CACHES  # noqa: E402
+
+PICKLE = {}
+PICKLE_ZLIB = {"COMPRESSOR": "django_redis.compressors.zlib.ZlibCompressor"}
+ORJSON = {"SERIALIZER": "backend_api.cache_serializer.CacheSerializer"}
+CONFIGURED = CACHES["default"]["OPTIONS"]
+
+
+def values() -> dict:
+    fetched_at = time.time()
+    receipt = OCRReceiptPostOut(
+        receipt_items=[
+            ReceiptItemData(
+                english_name=f"Onigiri salmon {i}",
+                japanese_name=f"おにぎり 鮭 {i}",
+                item_order=i,
+                cost=150 + i,
+                quantity=1,
+            )
+            for i in range(30)
+        ],
+        en_shop_name="Lawson",
+        jp_shop_name="ローソン",
+        tax_percentage=8,
+        total_amount=5000,
+        receipt_date=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        receipt_image_url="https://res.cloudinary.com/demo/image/upload/receipt.jpg",
+    )
+    return {
+        "groups": {
+            "value": [
+                SettleUpGroup(name=f"Trip {i}", id=f"-Nx{i:017d}") for i in range(20)
+            ],
+            "fetched_at": fetched_at,
+        },
+        "members": {
+            "value": [{"id": f"-Mem{i:016d}", "name": f"Member {i}"} for i in range(8)],
+            "fetched_at": fetched_at,
+        },
+        "credentials": {
+            "creds": {
+                "localId": "x" * 28,
+                "idToken": "e" * 900,
+                "refreshToken": "r" * 250,
+            },
+            "expires_at": fetched_at,
+        },
+        "ocr result": receipt,
+        "ocr job image": jpeg(),
+    }
+
+
+def jpeg() -> bytes:
+    buffer = io.BytesIO()
+    Image.effect_noise((1200, 1600), 40).convert("RGB").save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def client(options: dict) -> DefaultClient:
+    return DefaultClient("redis://bench", {"OPTIONS": options}, backend=None)
+
+
+def best_of(function, argument, repeat: int, rounds: int = 5) -> float:
+    """Fastest mean time per call over ``rounds`` runs of ``repeat`` calls."""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function(argument)
+        timings.append((time.perf_counter() - start) / repeat)
+    return min(timings)
+
+
+def measure(client: DefaultClient, value, repeat: int) -> tuple[int, float, float]:
+    encoded = client.encode(value)
+    assert client.decode(encoded) == value
+    return (
+        len(encoded),
+        best_of(client.encode, value, repeat),
+        best_of(client.decode, encoded, repeat),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    configurations = {
+        "pickle": client(PICKLE),
+        "pickle+zlib": client(PICKLE_ZLIB),
+        "orjson": client(ORJSON),
+        "orjson+threshold": client(CONFIGURED),
+    }
+    for name, value in values().items():
+        print(name)
+        for label, configured in configurations.items():
+            size, encode, decode = measure(configured, value, args.repeat)
+            print(
+                f"  {label:17} {size:6d} bytes  "
+                f"set {encode * 1e6:7.1f}us  get {decode * 1e6:7.1f}us"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Per-request cache overhead of the Settle Up lookups, with and without the L1.
+
+Each simulated request does what a transaction post does before any real work:
+list the groups, then read one group's members. Both entries are warm in a
+stand-in for Redis that charges ``--rtt`` per round trip and counts them, so
+the numbers are the cache overhead alone. The run is repeated with the
+per-process L1 disabled (every lookup goes to Redis) and enabled (a warm worker
+only reads the version stamp, once per check interval).
+
+Usage:
+    uv run python -m benchmarks.l1_cache [--requests 2000] [--rtt 0.0005]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from unittest.mock import patch
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache.backends.locmem import LocMemCache  # noqa: E402
+
+from backend_api.dataclasses.settleup import SettleUpGroup  # noqa: E402
+from backend_api.l1_cache import L1Cache, VersionStamp  # noqa: E402
+from backend_api.settleup_utils import (  # noqa: E402
+    GROUPS_CACHE_KEY,
+    AsyncSettleUpClient,
+)
+
+GROUPS = 5
+
+
+class SlowCache(LocMemCache):
+    """Local memory that pays a network round trip per async call."""
+
+    def __init__(self, rtt: float):
+        super().__init__("bench-l1", {})
+        self.rtt = rtt
+        self.round_trips = 0
+
+    async def _round_trip(self, method, *args, **kwargs):
+        self.round_trips += 1
+        await asyncio.sleep(self.rtt)
+        return method(*args, **kwargs)
+
+    async def aget(self, *args, **kwargs):
+        return await self._round_trip(self.get, *args, **kwargs)
+
+    async def aadd(self, *args, **kwargs):
+        return await self._round_trip(self.add, *args, **kwargs)
+
+    async def aincr(self, *args, **kwargs):
+        return await self._round_trip(self.incr, *args, **kwargs)
+
+
+class BenchAsyncSettleUpClient(AsyncSettleUpClient):
+    @staticmethod
+    def _get_credentials() -> dict:
+        return {"localId": "bench-user", "idToken": "bench-token"}
+
+
+def warm(cache: SlowCache) -> None:
+    client = BenchAsyncSettleUpClient
+    groups = [SettleUpGroup(name=f"Group {i}", id=f"group-{i}") for i in range(GROUPS)]
+    cache.set(GROUPS_CACHE_KEY, client._cache_entry(groups), timeout=None)
+    for group in groups:
+        members = [{"id": f"member-{i}", "name": f"Member {i}"} for i in range(6)]
+        cache.set(
+            client._members_cache_key(group.id),
+            client._cache_entry(members),
+            timeout=None,
+        )
+
+
+async def run(requests: int, rtt: float, l1: L1Cache) -> tuple[float, float]:
+    cache = SlowCache(rtt)
+    cache.clear()
+    warm(cache)
+    stamp = VersionStamp(
+        "settle_up_l1_version", settings.SETTLE_UP_L1_VERSION_CHECK_INTERVAL
+    )
+    client = BenchAsyncSettleUpClient()
+
+    with patch.multiple(
+        "backend_api.settleup_utils", cache=cache, L1=l1, L1_VERSION=stamp
+    ):
+        start = time.perf_counter()
+        for i in range(requests):
+            await client.get_groups()
+            await client.get_group_members_by_group(f"group-{i % GROUPS}")
+        elapsed = time.perf_counter() - start
+    return elapsed / requests, cache.round_trips / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rtt", type=float, default=0.0005, help="seconds")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, {args.rtt * 1000:.2f}ms per Redis round trip")
+    for label, l1 in (
+        ("redis only", L1Cache(maxsize=0, ttl=0)),
+        ("l1 + redis", L1Cache(settings.SETTLE_UP_L1_MAX_ENTRIES, 60)),
+    ):
+        per_request, round_trips = asyncio.run(run(args.requests, args.rtt, l1))
+        stats = l1.stats()
+        print(
+            f"{label}: {per_request * 1e6:8.1f}us/request, "
+            f"{round_trips:.3f} round trips/request, "
+            f"L1 hit rate {stats['hit_rate']:.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
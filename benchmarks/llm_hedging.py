@@ -0,0 +1,104 @@
+"""Tail latency of model calls with and without hedging, over a stub LLM.
+
+The stub answers after a log-normal delay (median ``--median`` seconds, shape
+``--sigma``), and a fraction ``--stall-rate`` of calls stall for ``--stall``
+seconds on top, the long tail seen from hosted LLM endpoints. ``--requests``
+calls run ``--concurrency`` at a time, once through the plain model and once
+through ``HedgedModel`` at the configured percentile and budget. Times are
+divided by ``--speedup`` so a run takes seconds; they are reported unscaled.
+
+Usage:
+    uv run python -m benchmarks.llm_hedging [--requests 1000] [--concurrency 20]
+        [--median 4] [--sigma 0.3] [--stall-rate 0.03] [--stall 20]
+        [--percentile 95] [--budget 0.05] [--speedup 10]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from pydantic_ai import Agent  # noqa: E402
+from pydantic_ai.messages import ModelResponse, TextPart  # noqa: E402
+from pydantic_ai.models.function import FunctionModel  # noqa: E402
+
+from backend_api.llm_hedging import HEDGES, HedgeBudget, HedgedModel  # noqa: E402
+
+
+def stub_model(args, calls: list) -> FunctionModel:
+    async def run(messages, info):
+        calls.append(None)
+        seconds = random.lognormvariate(0, args.sigma) * args.median
+        if random.random() < args.stall_rate:
+            seconds += args.stall
+        await asyncio.sleep(seconds / args.speedup)
+        return ModelResponse(parts=[TextPart("receipt")])
+
+    return FunctionModel(run)
+
+
+async def measure(args, agent: Agent) -> list[float]:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await agent.run("receipt")
+            return (time.perf_counter() - start) * args.speedup
+
+    return await asyncio.gather(*(one() for _ in range(args.requests)))
+
+
+def report(name: str, latencies: list[float], calls: int, requests: int) -> None:
+    cuts = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:8} p50 {cuts[49]:6.2f}s  p95 {cuts[94]:6.2f}s  "
+        f"p99 {cuts[98]:6.2f}s  max {max(latencies):6.2f}s  "
+        f"extra calls {calls / requests - 1:6.1%}"
+    )
+
+
+async def main_async(args):
+    settings.LLM_HEDGE_PERCENTILE = args.percentile
+    settings.LLM_HEDGE_BUDGET = args.budget
+    settings.LLM_HEDGE_MIN_DELAY = 0
+
+    calls = []
+    latencies = await measure(args, Agent(stub_model(args, calls)))
+    report("plain", latencies, len(calls), args.requests)
+
+    calls = []
+    won, lost = HEDGES.value(result="won"), HEDGES.value(result="lost")
+    model = HedgedModel(
+        stub_model(args, calls), stub_model(args, calls), budget=HedgeBudget()
+    )
+    latencies = await measure(args, Agent(model))
+    report("hedged", latencies, len(calls), args.requests)
+    won, lost = HEDGES.value(result="won") - won, HEDGES.value(result="lost") - lost
+    print(f"hedges won {won:.0f} of {won + lost:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--median", type=float, default=4.0, help="seconds")
+    parser.add_argument("--sigma", type=float, default=0.3)
+    parser.add_argument("--stall-rate", type=float, default=0.03)
+    parser.add_argument("--stall", type=float, default=20.0, help="seconds")
+    parser.add_argument("--percentile", type=float, default=95)
+    parser.add_argument("--budget", type=float, default=0.05)
+    parser.add_argument("--speedup", type=float, default=10)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
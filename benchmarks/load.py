@@ -0,0 +1,373 @@
+"""Load test of the ASGI app under hypercorn, with every paid service stubbed.
+
+Starts a stub Firebase server (``stub_firebase``) and a stub Cloudinary/catbox
+server (``stub_uploads``), then hypercorn with ``--workers`` workers serving
+``benchmarks.load_app:application``: the real app, with the receipt agent's
+model replaced by a pydantic-ai ``FunctionModel`` of configurable latency. No
+LLM tokens are spent, no images leave the machine, and Settle Up is never
+called.
+
+Then ``--concurrency`` simulated clients, each sending its next request as soon
+as the last one is answered, drive a weighted ``--mix`` of:
+
+- ``ocr``: ``POST /api/v1/receipts/receipt-items/``
+- ``stream``: ``POST /api/v1/receipts/receipt-items/stream/``, read to the end
+- ``groups``: ``GET /api/v1/settle-up/groups/``
+- ``members``: ``GET /api/v1/settle-up/users/?group_id=...``
+- ``transaction``: ``POST /api/v1/settle-up/transactions/`` with a fresh payload
+  and ``Idempotency-Key`` each time
+
+for ``--duration`` seconds after one warm-up request of each kind. The report
+gives throughput and p50/p95/p99 latency per kind and overall, and each
+worker's resident memory after warm-up, at its peak and at the end (read from
+``/proc``, so Linux only).
+
+The cache is a local-memory cache per worker unless ``--redis-url`` is given.
+The stubs and the clients share this process, so at high concurrency check
+that the harness isn't the bottleneck (its CPU use shows in ``top``).
+
+Usage:
+    uv run python -m benchmarks.load [--workers 2] [--concurrency 32] [--duration 30]
+        [--mix ocr=2,stream=1,groups=4,members=4,transaction=2]
+        [--llm-ttft 1.0] [--llm-tps 200] [--llm-items 15]
+        [--upload-latency 0.3] [--upload-error-rate 0] [--firebase-latency 0.05]
+        [--image receipt.jpg] [--redis-url redis://localhost:6379/2] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+from PIL import Image, ImageDraw
+
+from benchmarks.stub_firebase import run_stub_firebase
+from benchmarks.stub_uploads import run_stub_uploads
+
+TOKEN = "load-test"
+KINDS = ("ocr", "stream", "groups", "members", "transaction")
+DEFAULT_MIX = "ocr=2,stream=1,groups=4,members=4,transaction=2"
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in KINDS:
+            raise argparse.ArgumentTypeError(f"unknown request kind {kind!r}")
+        weights[kind] = float(weight)
+    return {kind: weight for kind, weight in weights.items() if weight > 0}
+
+
+def receipt_image() -> bytes:
+    """A phone-photo-sized JPEG of a receipt-like page, for preprocessing."""
+    image = Image.new("L", (2250, 3000), 90)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((500, 200, 1750, 2800), fill=235)
+    rnd = random.Random(0)
+    for y in range(300, 2700, 60):
+        draw.rectangle((560, y, 560 + rnd.randint(300, 900), y + 25), fill=30)
+        draw.rectangle((1500, y, 1690, y + 25), fill=30)
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+
+class Requests:
+    """Builds and sends one request of each kind."""
+
+    def __init__(self, client: httpx.AsyncClient, image: bytes, groups: int):
+        self.client = client
+        self.image = image
+        self.group_count = groups
+        self.rnd = random.Random(0)
+
+    async def send(self, kind: str) -> httpx.Response:
+        return await getattr(self, kind)()
+
+    async def ocr(self):
+        files = {"file": ("receipt.jpg", self.image, "image/jpeg")}
+        return await self.client.post("/api/v1/receipts/receipt-items/", files=files)
+
+    async def stream(self):
+        files = {"file": ("receipt.jpg", self.image, "image/jpeg")}
+        async with self.client.stream(
+            "POST", "/api/v1/receipts/receipt-items/stream/", files=files
+        ) as response:
+            await response.aread()
+        return response
+
+    async def groups(self):
+        return await self.client.get("/api/v1/settle-up/groups/")
+
+    async def members(self):
+        group_id = f"group-{self.rnd.randrange(self.group_count)}"
+        return await self.client.get(
+            "/api/v1/settle-up/users/", params={"group_id": group_id}
+        )
+
+    async def transaction(self):
+        costs = [self.rnd.randint(1, 300) * 10 for _ in range(6)]
+        payload = {
+            "purpose": f"Load test {uuid.uuid4().hex[:8]}",
+            "paying_member_id": "member-0",
+            "tax_percentage": 8,
+            "total_amount": sum(costs),
+            "user_receipt_items": [
+                {"member_id": f"member-{i % 2}", "cost": cost}
+                for i, cost in enumerate(costs)
+            ],
+            "group_id": f"group-{self.rnd.randrange(self.group_count)}",
+        }
+        return await self.client.post(
+            "/api/v1/settle-up/transactions/",
+            json=payload,
+            headers={"Idempotency-Key": uuid.uuid4().hex},
+        )
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, port: int, firebase_url: str, upload_url: str, log):
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "benchmarks.load_settings",
+        "APP_AUTH": TOKEN,
+        "LLM_API_KEY": TOKEN,
+        "SETTLE_UP_USER": TOKEN,
+        "CLOUDINARY_API_KEY": TOKEN,
+        "CLOUDINARY_API_SECRET": TOKEN,
+        "CLOUDINARY_CLOUD_NAME": "stub",
+        "CATBOX_UPLOAD_URL": f"{upload_url}/user/api.php",
+        "LOAD_FIREBASE_URL": firebase_url,
+        "LOAD_UPLOAD_URL": upload_url,
+        "LOAD_REDIS_URL": args.redis_url or "",
+        "LOAD_LLM_ITEMS": str(args.llm_items),
+        "LOAD_LLM_TPS": str(args.llm_tps),
+        "LOAD_LLM_TTFT": str(args.llm_ttft),
+    }
+    command = [
+        sys.executable,
+        "-m",
+        "hypercorn",
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--workers",
+        str(args.workers),
+        "benchmarks.load_app:application",
+    ]
+    return subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, server, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("hypercorn exited during startup")
+        try:
+            if (await client.get("/api/metrics")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"hypercorn not ready after {timeout}s")
+
+
+def worker_pids(pid: int) -> list[int]:
+    """hypercorn's worker processes (spawned children, not the resource tracker)."""
+    children = Path(f"/proc/{pid}/task/{pid}/children").read_text().split()
+    return [
+        int(child)
+        for child in children
+        if b"resource_tracker" not in Path(f"/proc/{child}/cmdline").read_bytes()
+    ]
+
+
+def rss_mib(pid: int) -> float:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def sample_memory(pids: list[int], memory: dict, interval: float = 0.5):
+    while True:
+        for pid in pids:
+            rss = rss_mib(pid)
+            memory[pid]["peak"] = max(memory[pid]["peak"], rss)
+            memory[pid]["end"] = rss
+        await asyncio.sleep(interval)
+
+
+def percentile(latencies: list[float], q: float) -> float:
+    """Nearest-rank percentile of sorted ``latencies``."""
+    if not latencies:
+        return float("nan")
+    return latencies[min(len(latencies) - 1, max(0, round(q * len(latencies)) - 1))]
+
+
+def summarize(latencies: list[float], errors: int, duration: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput": (len(latencies) + errors) / duration,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": latencies[-1] if latencies else float("nan"),
+    }
+
+
+async def run(args, base_url: str, server) -> dict:
+    mix = parse_mix(args.mix)
+    image = args.image.read_bytes() if args.image else receipt_image()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {TOKEN}"},
+        limits=limits,
+        timeout=300,
+    ) as client:
+        await wait_until_ready(client, server)
+        requests = Requests(client, image, args.groups)
+        for kind in mix:
+            response = await requests.send(kind)
+            if response.status_code >= 400:
+                raise RuntimeError(f"warm-up {kind} failed: {response.status_code}")
+
+        pids = worker_pids(server.pid)
+        memory = {pid: {"start": rss_mib(pid), "peak": 0.0, "end": 0.0} for pid in pids}
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        messages = []
+        kinds, weights = list(mix), list(mix.values())
+
+        async def user(seed: int):
+            rnd = random.Random(seed)
+            while time.perf_counter() < deadline:
+                kind = rnd.choices(kinds, weights)[0]
+                start = time.perf_counter()
+                try:
+                    response = await requests.send(kind)
+                    failed = response.status_code >= 400
+                    message = f"{kind}: HTTP {response.status_code}"
+                except httpx.HTTPError as e:
+                    failed, message = True, f"{kind}: {type(e).__name__} {e}"
+                if failed:
+                    errors[kind] += 1
+                    messages.append(message)
+                else:
+                    latencies[kind].append(time.perf_counter() - start)
+
+        sampler = asyncio.create_task(sample_memory(pids, memory))
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(user(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+
+    every = [latency for kind in kinds for latency in latencies[kind]]
+    return {
+        "config": {**vars(args), "image": str(args.image) if args.image else None},
+        "duration": elapsed,
+        "total": summarize(every, sum(errors.values()), elapsed),
+        "kinds": {
+            kind: summarize(latencies[kind], errors[kind], elapsed) for kind in kinds
+        },
+        "workers": memory,
+        "errors": messages[:10],
+    }
+
+
+def report(result: dict):
+    def row(name, s):
+        print(
+            f"{name:12} {s['requests']:7d} {s['errors']:6d} {s['throughput']:8.1f}"
+            + "".join(f" {s[q] * 1000:9.0f}" for q in ("p50", "p95", "p99", "max"))
+        )
+
+    config = result["config"]
+    print(
+        f"{config['workers']} worker(s), {config['concurrency']} clients, "
+        f"{result['duration']:.1f}s"
+    )
+    print(
+        f"{'':12} {'requests':>7} {'errors':>6} {'req/s':>8}"
+        + "".join(f" {q + ' ms':>9}" for q in ("p50", "p95", "p99", "max"))
+    )
+    for kind, summary in result["kinds"].items():
+        row(kind, summary)
+    row("all", result["total"])
+
+    print("worker RSS, MiB:")
+    for pid, memory in result["workers"].items():
+        print(
+            f"  pid {pid}: {memory['start']:.1f} after warm-up, "
+            f"{memory['peak']:.1f} peak, {memory['end']:.1f} at the end"
+        )
+    for message in result["errors"]:
+        print(f"error: {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--llm-ttft", type=float, default=1.0, help="seconds")
+    parser.add_argument("--llm-tps", type=float, default=200, help="tokens/s")
+    parser.add_argument("--llm-items", type=int, default=15)
+    parser.add_argument("--upload-latency", type=float, default=0.3, help="seconds")
+    parser.add_argument("--upload-error-rate", type=float, default=0.0)
+    parser.add_argument("--firebase-latency", type=float, default=0.05)
+    parser.add_argument("--groups", type=int, default=5)
+    parser.add_argument("--members", type=int, default=4)
+    parser.add_argument("--image", type=Path)
+    parser.add_argument("--redis-url")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+    parse_mix(args.mix)
+
+    port = free_port()
+    with (
+        run_stub_firebase(
+            args.firebase_latency, 0.03, args.groups, args.members
+        ) as firebase_url,
+        run_stub_uploads(args.upload_latency, args.upload_error_rate) as upload_url,
+        tempfile.TemporaryFile() as log,
+    ):
+        server = start_server(args, port, firebase_url, upload_url, log)
+        try:
+            result = asyncio.run(run(args, f"http://127.0.0.1:{port}", server))
+        except Exception:
+            log.seek(0)
+            sys.stderr.write(log.read().decode(errors="replace")[-5000:])
+            raise
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report(result)
+    if args.json:
+        args.json.write_text(json.dumps(result, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""ASGI entrypoint for the app under load (see ``benchmarks.load``).
+
+``settledown.asgi:application`` with the paid services swapped out in each
+worker as it imports this module:
+
+- The receipt agent's model is the stub from ``benchmarks.receipt_stream``: a
+  pydantic-ai ``FunctionModel`` that answers with ``LOAD_LLM_ITEMS`` line items
+  after ``LOAD_LLM_TTFT`` seconds plus the time to write them at
+  ``LOAD_LLM_TPS`` tokens/s. It never calls the translate tool.
+- Cloudinary uploads go to the stub upload server at ``LOAD_UPLOAD_URL``.
+- Firebase credentials are seeded into the cache, where the token manager
+  adopts them, so no worker signs in with pyrebase.
+"""
+
+import os
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.load_settings")
+
+import cloudinary  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+
+from settledown.asgi import application  # noqa: E402, F401
+from backend_api.ocr import get_receipt_agent  # noqa: E402
+from backend_api.settleup_auth import get_token_manager  # noqa: E402
+from benchmarks.receipt_stream import stub_model  # noqa: E402
+from benchmarks.stub_firebase import USER_ID  # noqa: E402
+
+# Far enough out that the background refresh never fires during a run.
+CREDENTIALS_LIFETIME = 365 * 24 * 60 * 60
+
+get_receipt_agent().model = stub_model(
+    int(os.environ["LOAD_LLM_ITEMS"]),
+    float(os.environ["LOAD_LLM_TPS"]),
+    float(os.environ["LOAD_LLM_TTFT"]),
+)
+cloudinary.config(upload_prefix=os.environ["LOAD_UPLOAD_URL"])
+cache.set(
+    get_token_manager()._cache_key,
+    {
+        "creds": {"localId": USER_ID, "idToken": "load-token"},
+        "expires_at": time.time() + CREDENTIALS_LIFETIME,
+    },
+    timeout=None,
+)
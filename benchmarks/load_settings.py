@@ -0,0 +1,23 @@
+"""Django settings for the app under load (see ``benchmarks.load``).
+
+The real settings, with Settle Up pointed at the harness's stub Firebase
+server (``LOAD_FIREBASE_URL``). The cache is Redis at ``LOAD_REDIS_URL`` when
+given, and otherwise a local-memory cache per worker, so the harness runs
+without Redis. The OCR result cache is off either way: every receipt request
+pays for the full pipeline.
+"""
+
+import os
+
+from settledown.settings import *  # noqa: F403
+from settledown.settings import CACHES
+
+DEBUG = False
+
+SETTLE_UP_BASE_URL = os.environ["LOAD_FIREBASE_URL"]
+OCR_CACHE_ENABLED = False
+
+if redis_url := os.getenv("LOAD_REDIS_URL"):
+    CACHES = {"default": {**CACHES["default"], "LOCATION": redis_url}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
@@ -0,0 +1,295 @@
+"""Microbenchmarks of the settlement math and schema validation, with baselines.
+
+Times, per call:
+
+- ``compute_member_totals`` and ``compute_weights``;
+- ``SettleUpClient.create_transaction``: members lookup and payload build, with
+  the HTTP POST stubbed out (the stub still JSON-encodes the body, as
+  ``requests`` would);
+- ``TransactionPostIn`` validation from a dict and from request JSON, and
+  ``OCRReceiptPostOut`` validation from a dict and dumping to response JSON.
+
+Each runs at every size in ``SIZES``, from a convenience-store receipt to a
+thousand-line receipt split between dozens of members. A benchmark is timed in
+``--rounds`` rounds of as many calls as fill ``--min-time`` seconds; the
+fastest round is the least noisy estimate and is what comparisons use.
+
+``--save NAME`` writes the results to ``benchmarks/results/NAME.json`` along
+with the commit and interpreter they were measured on. ``--compare NAME``
+prints each benchmark's change against a saved run and exits with status 1 if
+any is slower by more than ``--threshold``. Only compare runs from the same
+machine. A typical check before deploying:
+
+    git stash && uv run python -m benchmarks.micro --save baseline && git stash pop
+    uv run python -m benchmarks.micro --compare baseline
+
+Usage:
+    uv run python -m benchmarks.micro [--filter compute_weights] [--rounds 7]
+        [--min-time 0.2] [--save NAME] [--compare NAME] [--threshold 0.1]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+django.setup()
+
+from backend_api import settleup_utils  # noqa: E402
+from backend_api.dataclasses.receipt_item import ReceiptItemData  # noqa: E402
+from backend_api.schemas import (  # noqa: E402
+    OCRReceiptPostOut,
+    TransactionPostIn,
+)
+from backend_api.utils import compute_member_totals, compute_weights  # noqa: E402
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Receipt line items and group members.
+SIZES = {
+    "small": (10, 2),
+    "typical": (30, 4),
+    "large": (300, 12),
+    "extreme": (1000, 48),
+}
+
+
+class BenchSettleUpClient(settleup_utils.SettleUpClient):
+    """A client with fixed credentials and members, and no cache."""
+
+    def __init__(self, members: list[dict]):
+        self.user_id = "bench-user"
+        self.auth_params = {"auth": "bench-token"}
+        self.members = members
+
+    def get_group_members_by_group(self, group_id: str) -> list[dict]:
+        return self.members
+
+
+class _Response:
+    def json(self):
+        return {"name": "-bench-transaction"}
+
+
+_dumps = json.dumps
+
+
+def _post(url, json=None, params=None):
+    # Serializing the body is part of what ``requests.post`` costs us.
+    _dumps(json)
+    return _Response()
+
+
+def _transaction(items: int, members: int) -> dict:
+    rnd = random.Random(items * 1000 + members)
+    ids = [f"-Member{i:013d}" for i in range(members)]
+    receipt_items = [
+        {"member_id": rnd.choice(ids), "cost": rnd.randint(1, 300) * 10}
+        for _ in range(items)
+    ]
+    shared = [rnd.randint(1, 300) * 10 for _ in range(max(1, items // 10))]
+    subtotal = sum(item["cost"] for item in receipt_items) + sum(shared)
+    return {
+        "purpose": "Groceries",
+        "paying_member_id": ids[0],
+        "tax_percentage": 8,
+        "total_amount": subtotal * 108 / 100,
+        "user_receipt_items": receipt_items,
+        "split_receipt_items": shared,
+        "group_id": "-Group000000000000",
+        "receipt_date": "2026-01-01T12:00:00+09:00",
+        "receipt_image_url": "https://res.cloudinary.com/demo/image/upload/r.jpg",
+    }
+
+
+def _receipt(items: int) -> dict:
+    return OCRReceiptPostOut(
+        receipt_items=[
+            ReceiptItemData(
+                english_name=f"Onigiri salmon {i}",
+                japanese_name=f"おにぎり 鮭 {i}",
+                item_order=i,
+                cost=150 + i,
+                quantity=1,
+            )
+            for i in range(items)
+        ],
+        en_shop_name="Lawson",
+        jp_shop_name="ローソン",
+        tax_percentage=8,
+        total_amount=5000,
+        receipt_date=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        receipt_image_url="https://res.cloudinary.com/demo/image/upload/r.jpg",
+    ).model_dump(mode="json")
+
+
+def benchmarks() -> dict:
+    """Every benchmark, by ``name[size]``: a function taking no arguments."""
+    cases = {}
+    for size, (items, members) in SIZES.items():
+        data = _transaction(items, members)
+        payload = TransactionPostIn.model_validate(data)
+        raw = json.dumps(data).encode()
+        group = [{"id": f"-Member{i:013d}", "name": f"M{i}"} for i in range(members)]
+        totals = tuple(
+            compute_member_totals(
+                payload.user_receipt_items,
+                payload.tax_percentage,
+                group,
+                payload.total_amount,
+                payload.split_receipt_items,
+            ).values()
+        )
+        client = BenchSettleUpClient(group)
+        receipt = _receipt(items)
+        response = OCRReceiptPostOut.model_validate(receipt)
+
+        cases.update(
+            {
+                f"compute_member_totals[{size}]": _bind(
+                    compute_member_totals,
+                    payload.user_receipt_items,
+                    payload.tax_percentage,
+                    group,
+                    payload.total_amount,
+                    payload.split_receipt_items,
+                ),
+                f"compute_weights[{size}]": _bind(compute_weights, totals),
+                f"create_transaction[{size}]": _bind(
+                    client.create_transaction, payload
+                ),
+                f"TransactionPostIn.validate[{size}]": _bind(
+                    TransactionPostIn.model_validate, data
+                ),
+                f"TransactionPostIn.validate_json[{size}]": _bind(
+                    TransactionPostIn.model_validate_json, raw
+                ),
+                f"OCRReceiptPostOut.validate[{size}]": _bind(
+                    OCRReceiptPostOut.model_validate, receipt
+                ),
+                f"OCRReceiptPostOut.dump_json[{size}]": response.model_dump_json,
+            }
+        )
+    return cases
+
+
+def _bind(function, *args):
+    return lambda: function(*args)
+
+
+def measure(function, rounds: int, min_time: float) -> dict:
+    timer = timeit.Timer(function)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    times = [t / number * 1e9 for t in timer.repeat(rounds, number)]
+    return {
+        "min_ns": min(times),
+        "median_ns": statistics.median(times),
+        "stdev_ns": statistics.stdev(times) if rounds > 1 else 0.0,
+        "loops": number,
+    }
+
+
+def metadata(args) -> dict:
+    def git(*command):
+        return subprocess.run(
+            ["git", *command], capture_output=True, text=True, check=False
+        ).stdout.strip()
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} {platform.node()}",
+        "rounds": args.rounds,
+        "min_time": args.min_time,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print each benchmark's change against ``baseline``; return regressions."""
+    regressions = []
+    for name, result in results.items():
+        if (before := baseline.get(name)) is None:
+            continue
+        change = result["min_ns"] / before["min_ns"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  faster"
+        print(
+            f"  {name:48} {_format_ns(before['min_ns']):>10} -> "
+            f"{_format_ns(result['min_ns']):>10}  {change:+7.1%}{flag}"
+        )
+    return regressions
+
+
+def _format_ns(ns: float) -> str:
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f} {unit}"
+    return f"{ns:.0f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="only names containing this")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds/round")
+    parser.add_argument("--save", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads((RESULTS_DIR / f"{args.compare}.json").read_text())
+
+    results = {}
+    with patch.object(settleup_utils.requests, "post", _post):
+        for name, function in benchmarks().items():
+            if args.filter not in name:
+                continue
+            result = results[name] = measure(function, args.rounds, args.min_time)
+            print(
+                f"{name:50} {_format_ns(result['min_ns']):>10}  "
+                f"median {_format_ns(result['median_ns']):>10}  "
+                f"± {_format_ns(result['stdev_ns'])}"
+            )
+
+    if args.save:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f"{args.save}.json"
+        path.write_text(
+            json.dumps({"meta": metadata(args), "results": results}, indent=2) + "\n"
+        )
+        print(f"saved {path}")
+
+    if baseline is not None:
+        meta = baseline["meta"]
+        print(f"\nvs {args.compare} ({meta['commit']}, {meta['created']}):")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(
+                f"{len(regressions)} benchmark(s) slower by over {args.threshold:.0%}"
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Bytes, vision tokens and extraction parity before/after image preprocessing.
+
+Runs every image in a local corpus directory through
+``preprocess_receipt_image`` and reports payload bytes, image dimensions and an
+estimate of the vision tokens each version costs (OpenAI's 32px-patch costing
+for the gpt-5-mini family: at most 1536 patches, times 1.62).
+
+With ``--extract`` both versions are also sent to the real receipt agent
+(needs ``LLM_API_KEY``; spends tokens) to report measured input tokens, latency
+and whether the extracted fields match.
+
+Usage:
+    uv run python -m benchmarks.preprocess_images path/to/receipts [--extract]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+django.setup()
+
+from pydantic_ai import BinaryContent  # noqa: E402
+
+from backend_api.image_preprocessing import (  # noqa: E402
+    estimate_vision_tokens,
+    image_size,
+    preprocess_receipt_image,
+    sniff_media_type,
+)
+from backend_api.ocr import get_receipt_agent  # noqa: E402
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".heic", ".heif", ".webp"}
+
+
+async def extract(data: bytes, media_type: str):
+    start = time.perf_counter()
+    result = await get_receipt_agent().run(
+        ["here is the image receipt:", BinaryContent(data=data, media_type=media_type)]
+    )
+    return result.output, result.usage().input_tokens, time.perf_counter() - start
+
+
+def same_extraction(a, b) -> bool:
+    def key(receipt):
+        return (
+            receipt.total_amount,
+            receipt.tax_percentage,
+            sorted(item.cost for item in receipt.receipt_items),
+        )
+
+    return key(a) == key(b)
+
+
+async def run(args):
+    paths = sorted(
+        p for p in args.corpus.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES
+    )
+    totals = {"raw_bytes": 0, "bytes": 0, "raw_tokens": 0, "tokens": 0}
+    matches = 0
+
+    for path in paths:
+        raw = path.read_bytes()
+        start = time.perf_counter()
+        data, media_type = preprocess_receipt_image(raw)
+        elapsed = time.perf_counter() - start
+
+        raw_tokens = estimate_vision_tokens(*image_size(raw))
+        tokens = estimate_vision_tokens(*image_size(data))
+        totals["raw_bytes"] += len(raw)
+        totals["bytes"] += len(data)
+        totals["raw_tokens"] += raw_tokens
+        totals["tokens"] += tokens
+        line = (
+            f"{path.name:<30} {len(raw) / 1024:8.0f}KB -> {len(data) / 1024:6.0f}KB"
+            f"  ~{raw_tokens:5d} -> ~{tokens:5d} tok  {elapsed * 1000:6.0f}ms"
+        )
+
+        if args.extract:
+            before, raw_in, raw_s = await extract(raw, sniff_media_type(raw))
+            after, in_tokens, seconds = await extract(data, media_type)
+            parity = same_extraction(before, after)
+            matches += parity
+            line += (
+                f"  | input {raw_in} -> {in_tokens} tok"
+                f"  {raw_s:5.1f}s -> {seconds:5.1f}s"
+                f"  {'match' if parity else 'DIFF'}"
+            )
+        print(line)
+
+    if not paths:
+        print(f"No images found in {args.corpus}")
+        return
+
+    print(
+        f"\n{len(paths)} images: {totals['raw_bytes'] / 2**20:.1f}MB ->"
+        f" {totals['bytes'] / 2**20:.1f}MB,"
+        f" ~{totals['raw_tokens']} -> ~{totals['tokens']} vision tokens"
+    )
+    if args.extract:
+        print(f"extraction parity: {matches}/{len(paths)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", type=Path)
+    parser.add_argument("--extract", action="store_true")
+    # One event loop for every run: the cached agent's HTTP client is bound to it.
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
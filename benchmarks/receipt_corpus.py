@@ -0,0 +1,348 @@
+"""Record a receipt corpus's LLM calls once, then replay and score them offline.
+
+A corpus is a directory of receipt photos with hand-checked expected results:
+
+    corpus/
+      images/<name>.jpg              receipt photos
+      labels/<name>.json             the expected ReceiptData, as JSON
+      cassettes/<config>/<name>.json recorded LLM calls, one set per configuration
+
+``record`` runs the real receipt agent (needs ``LLM_API_KEY``; spends tokens)
+over every image under one named configuration (model, or fast and strong
+model for the cascade, and image preprocessing) and saves each extraction's
+model calls and tool results to a cassette (see ``backend_api.llm_cassettes``).
+With ``--write-labels`` it also drafts a label from the output for every image
+that has none yet; check those by hand.
+
+``replay`` re-runs ``extract_receipt`` over the cassettes of each
+configuration, with the preprocessing it was recorded with. The current
+instructions, output validator and tool code all run; only the model and the
+translation service are answered from the cassettes, so it runs offline and
+costs nothing. For each configuration it reports:
+
+- field accuracy against the labels: shop names, tax, total, date, the item
+  count and each item's names, cost, quantity and discount;
+- receipts extracted exactly right, and runs that failed;
+- validator retries, input and output tokens per receipt, as recorded;
+- for cascade configurations, the share of receipts the fast tier escalated;
+- validator retries sent without the full image (see
+  ``backend_api.receipt_repair``) and the vision tokens that saved;
+- latency per receipt: the recorded model time plus the replay's own time;
+- stale calls, whose request no longer matches the recording because the
+  prompt or preprocessing changed. Re-record to measure such a change, since
+  the model would answer differently.
+
+Record a configuration per variant to compare, e.g. a smaller image size,
+another model, a cascade (``--fast-model``) against the strong model alone, or
+targeted repair against full-image retries (``--no-repair``). After a validator
+or post-processing change, replay the existing cassettes to compare.
+
+Usage:
+    uv run python -m benchmarks.receipt_corpus record corpus --config baseline
+        [--model gpt-5-mini] [--fast-model gpt-5-nano]
+        [--max-edge 1600] [--jpeg-quality 85] [--no-preprocess]
+        [--no-repair] [--write-labels]
+    uv run python -m benchmarks.receipt_corpus replay corpus [--config baseline ...]
+        [--json results.json]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from pydantic_ai.exceptions import UnexpectedModelBehavior  # noqa: E402
+
+from backend_api.dataclasses.receipt_item import ReceiptData  # noqa: E402
+from backend_api.llm_cassettes import (  # noqa: E402
+    Cassette,
+    CassetteMiss,
+    RecordingModel,
+    ReplayModel,
+    replay_tools,
+)
+from backend_api.ocr import (  # noqa: E402
+    CASCADE_DECISIONS,
+    extract_receipt,
+    get_fast_receipt_agent,
+    get_receipt_agent,
+)
+from backend_api.ocr_cache import PROMPT_HASH  # noqa: E402
+from backend_api.receipt_repair import REPAIR_TOKENS_SAVED, REPAIRS  # noqa: E402
+from benchmarks.preprocess_images import IMAGE_SUFFIXES  # noqa: E402
+
+HEADER_FIELDS = ("en_shop_name", "jp_shop_name", "tax_percentage", "total_amount")
+ITEM_FIELDS = ("english_name", "japanese_name", "cost", "quantity", "discount")
+# Compared case-insensitively; translations vary in capitalization only.
+CASEFOLDED = {"en_shop_name", "english_name"}
+
+
+def images(corpus: Path) -> list[Path]:
+    return sorted(
+        path
+        for path in (corpus / "images").iterdir()
+        if path.suffix.lower() in IMAGE_SUFFIXES
+    )
+
+
+def configure(config: dict) -> None:
+    """Apply a cassette configuration's model and preprocessing settings."""
+    settings.LLM_MODEL = config["model"]
+    settings.LLM_FAST_MODEL = config.get("fast_model", "")
+    settings.RECEIPT_IMAGE_PREPROCESS = config["preprocess"]
+    settings.RECEIPT_IMAGE_MAX_EDGE = config["max_edge"]
+    settings.RECEIPT_IMAGE_JPEG_QUALITY = config["jpeg_quality"]
+    settings.RECEIPT_REPAIR_ENABLED = config.get("repair", True)
+    get_receipt_agent.cache_clear()
+    get_fast_receipt_agent.cache_clear()
+
+
+def agents() -> list:
+    """The agents the configured extraction runs: the cascade's tiers, or one."""
+    if settings.LLM_FAST_MODEL:
+        return [get_fast_receipt_agent(), get_receipt_agent()]
+    return [get_receipt_agent()]
+
+
+async def record(args) -> None:
+    config = {
+        "model": args.model,
+        "fast_model": args.fast_model,
+        "preprocess": args.preprocess,
+        "max_edge": args.max_edge,
+        "jpeg_quality": args.jpeg_quality,
+        "repair": args.repair,
+        "instructions": PROMPT_HASH,
+        "commit": subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        ).stdout.strip(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    configure(config)
+
+    for path in images(args.corpus):
+        image = path.read_bytes()
+        cassette = Cassette(
+            {**config, "image_sha256": hashlib.sha256(image).hexdigest()}
+        )
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for agent in agents():
+                    model = RecordingModel(agent.model, cassette)
+                    stack.enter_context(agent.override(model=model))
+                receipt = await extract_receipt(image)
+        except Exception as e:
+            cassette.config["error"] = f"{type(e).__name__}: {e}"
+            receipt = None
+        cassette.save(args.corpus / "cassettes" / args.config / f"{path.stem}.json")
+
+        label = args.corpus / "labels" / f"{path.stem}.json"
+        if args.write_labels and receipt is not None and not label.exists():
+            label.parent.mkdir(parents=True, exist_ok=True)
+            label.write_text(receipt.model_dump_json(indent=1) + "\n")
+        print(
+            f"{path.name}: {len(cassette.calls)} call(s), "
+            f"{time.perf_counter() - start:.1f}s"
+            + (f", {cassette.config['error']}" if receipt is None else "")
+        )
+
+
+def score(expected: ReceiptData, actual: ReceiptData | None) -> tuple[int, int]:
+    """Fields of ``expected`` that ``actual`` got right, and the fields compared.
+
+    Items are matched by ``item_order``; a missing or extra item gets every
+    one of its fields wrong.
+    """
+    expected_items = sorted(expected.receipt_items, key=lambda item: item.item_order)
+    total = len(HEADER_FIELDS) + 2 + len(ITEM_FIELDS) * len(expected_items)
+    if actual is None:
+        return 0, total
+
+    actual_items = sorted(actual.receipt_items, key=lambda item: item.item_order)
+    extra = max(0, len(actual_items) - len(expected_items))
+    correct = sum(_same(name, expected, actual) for name in HEADER_FIELDS)
+    correct += expected.receipt_date.date() == actual.receipt_date.date()
+    correct += len(expected_items) == len(actual_items)
+    for want, got in zip(expected_items, actual_items):
+        correct += sum(_same(name, want, got) for name in ITEM_FIELDS)
+    return correct, total + len(ITEM_FIELDS) * extra
+
+
+def _same(name: str, expected, actual) -> bool:
+    want, got = getattr(expected, name), getattr(actual, name)
+    if name in CASEFOLDED:
+        return want.casefold().strip() == got.casefold().strip()
+    return want == got
+
+
+async def replay_one(image: bytes, cassette: Cassette) -> dict:
+    # One model serves every tier, in the order the calls were recorded.
+    model = ReplayModel(cassette)
+    start = time.perf_counter()
+    error = None
+    try:
+        with ExitStack() as stack:
+            for agent in agents():
+                stack.enter_context(agent.override(model=model))
+            stack.enter_context(replay_tools(cassette))
+            receipt = await extract_receipt(image)
+    except (CassetteMiss, UnexpectedModelBehavior) as e:
+        receipt, error = None, f"{type(e).__name__}: {e}"
+    local = time.perf_counter() - start
+
+    usage = [response.usage for response in cassette.responses()[: model.served]]
+    return {
+        "receipt": receipt,
+        "error": error,
+        "retries": model.retries,
+        "stale": model.stale,
+        "input_tokens": sum(u.input_tokens for u in usage),
+        "output_tokens": sum(u.output_tokens for u in usage),
+        "latency": model.duration + local,
+    }
+
+
+async def replay_config(corpus: Path, config: str) -> dict:
+    runs, correct, compared, exact = [], 0, 0, 0
+    decisions = _cascade_decisions()
+    repairs = REPAIRS.value(image="none") + REPAIRS.value(image="crop")
+    tokens_saved = REPAIR_TOKENS_SAVED.value()
+    for path in sorted((corpus / "cassettes" / config).glob("*.json")):
+        cassette = Cassette.load(path)
+        image = next((corpus / "images").glob(f"{path.stem}.*")).read_bytes()
+        configure(cassette.config)
+        run = await replay_one(image, cassette)
+        runs.append(run)
+
+        label = corpus / "labels" / f"{path.stem}.json"
+        if label.exists():
+            expected = ReceiptData.model_validate_json(label.read_text())
+            right, fields = score(expected, run["receipt"])
+            correct, compared = correct + right, compared + fields
+            exact += right == fields
+        if run["error"]:
+            print(f"  {config}/{path.stem}: {run['error']}")
+
+    latencies = sorted(run["latency"] for run in runs)
+    count = len(runs) or 1
+    decisions = {
+        outcome: n - decisions.get(outcome, 0)
+        for outcome, n in _cascade_decisions().items()
+    }
+    fast_runs = sum(decisions.values())
+    return {
+        "receipts": len(runs),
+        "field_accuracy": correct / compared if compared else None,
+        "exact": exact,
+        "failed": sum(run["error"] is not None for run in runs),
+        "stale_calls": sum(run["stale"] for run in runs),
+        "escalation_rate": (
+            1 - decisions.get("accepted", 0) / fast_runs if fast_runs else None
+        ),
+        "escalations": {k: n for k, n in decisions.items() if k != "accepted" and n},
+        "repairs": REPAIRS.value(image="none") + REPAIRS.value(image="crop") - repairs,
+        "repair_image_tokens_saved": REPAIR_TOKENS_SAVED.value() - tokens_saved,
+        "retries_per_receipt": sum(run["retries"] for run in runs) / count,
+        "input_tokens_per_receipt": sum(run["input_tokens"] for run in runs) / count,
+        "output_tokens_per_receipt": sum(run["output_tokens"] for run in runs) / count,
+        "latency_p50": statistics.median(latencies) if latencies else None,
+        "latency_p95": (
+            latencies[min(len(latencies) - 1, round(0.95 * len(latencies)))]
+            if latencies
+            else None
+        ),
+    }
+
+
+def _cascade_decisions() -> dict[str, float]:
+    return {
+        labels["outcome"]: value for _, labels, value in CASCADE_DECISIONS.samples()
+    }
+
+
+async def replay(args) -> None:
+    # The agent is built with a client that never gets used.
+    settings.LLM_API_KEY = settings.LLM_API_KEY or "replay"
+    configs = args.config or sorted(
+        path.name for path in (args.corpus / "cassettes").iterdir() if path.is_dir()
+    )
+    results = {config: await replay_config(args.corpus, config) for config in configs}
+
+    print(
+        f"{'config':16} {'receipts':>8} {'accuracy':>8} {'exact':>5} {'failed':>6} "
+        f"{'stale':>5} {'escal.':>6} {'retries':>7} {'repairs':>7} "
+        f"{'in tok':>7} {'out tok':>7} {'p50 s':>6} {'p95 s':>6}"
+    )
+    for config, r in results.items():
+        accuracy = (
+            f"{r['field_accuracy']:.1%}" if r["field_accuracy"] is not None else "-"
+        )
+        escalated = (
+            f"{r['escalation_rate']:.0%}" if r["escalation_rate"] is not None else "-"
+        )
+        print(
+            f"{config:16} {r['receipts']:8d} {accuracy:>8} {r['exact']:5d} "
+            f"{r['failed']:6d} {r['stale_calls']:5d} {escalated:>6} "
+            f"{r['retries_per_receipt']:7.2f} {r['repairs']:7.0f} "
+            f"{r['input_tokens_per_receipt']:7.0f} "
+            f"{r['output_tokens_per_receipt']:7.0f} "
+            f"{r['latency_p50'] or 0:6.2f} {r['latency_p95'] or 0:6.2f}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record")
+    record_parser.add_argument("corpus", type=Path)
+    record_parser.add_argument("--config", required=True)
+    record_parser.add_argument("--model", default=settings.LLM_MODEL)
+    record_parser.add_argument("--fast-model", default=settings.LLM_FAST_MODEL)
+    record_parser.add_argument(
+        "--max-edge", type=int, default=settings.RECEIPT_IMAGE_MAX_EDGE
+    )
+    record_parser.add_argument(
+        "--jpeg-quality", type=int, default=settings.RECEIPT_IMAGE_JPEG_QUALITY
+    )
+    record_parser.add_argument(
+        "--no-preprocess",
+        dest="preprocess",
+        action="store_false",
+        default=settings.RECEIPT_IMAGE_PREPROCESS,
+    )
+    record_parser.add_argument(
+        "--no-repair",
+        dest="repair",
+        action="store_false",
+        default=settings.RECEIPT_REPAIR_ENABLED,
+    )
+    record_parser.add_argument("--write-labels", action="store_true")
+
+    replay_parser = commands.add_parser("replay")
+    replay_parser.add_argument("corpus", type=Path)
+    replay_parser.add_argument("--config", action="append")
+    replay_parser.add_argument("--json", type=Path)
+
+    args = parser.parse_args()
+    asyncio.run(record(args) if args.command == "record" else replay(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Time to first item (streamed) vs time to the complete response (regular run).
+
+By default the receipt agent runs over a stub model that writes a receipt's
+output-tool JSON at a steady token rate (``--items`` line items, ``--tps``
+tokens/s, ``--ttft`` seconds before the first token), so the numbers isolate
+how early the stream surfaces data. ``--image`` runs the real agent on a
+receipt photo instead (needs ``LLM_API_KEY``; spends tokens).
+
+Usage:
+    uv run python -m benchmarks.receipt_stream [--items 25] [--tps 60] [--ttft 1.5]
+    uv run python -m benchmarks.receipt_stream --image path/to/receipt.jpg
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from PIL import Image  # noqa: E402
+from pydantic_ai.messages import ModelResponse, ToolCallPart  # noqa: E402
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel  # noqa: E402
+
+from backend_api.ocr import extract_receipt, get_receipt_agent  # noqa: E402
+from backend_api.receipts import stream_receipt_events  # noqa: E402
+from backend_api.uploads import ReceiptUpload  # noqa: E402
+
+# Roughly how many characters of JSON one output token carries.
+CHARS_PER_TOKEN = 4
+
+
+def fake_receipt(items: int) -> str:
+    return json.dumps(
+        {
+            "en_shop_name": "Sample Mart",
+            "jp_shop_name": "サンプルマート",
+            "tax_percentage": 8,
+            "total_amount": 150 * items,
+            "receipt_date": "2026-05-30T12:34:56Z",
+            "receipt_items": [
+                {
+                    "english_name": f"Item {i}",
+                    "japanese_name": f"商品{i}",
+                    "item_order": i,
+                    "cost": 150,
+                    "quantity": 1,
+                    "discount": 0,
+                }
+                for i in range(1, items + 1)
+            ],
+        },
+        ensure_ascii=False,
+    )
+
+
+def stub_model(items: int, tps: float, ttft: float) -> FunctionModel:
+    payload = fake_receipt(items)
+    tokens = [
+        payload[i : i + CHARS_PER_TOKEN]
+        for i in range(0, len(payload), CHARS_PER_TOKEN)
+    ]
+
+    async def run(messages, info):
+        await asyncio.sleep(ttft + len(tokens) / tps)
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, payload)])
+
+    async def stream(messages, info):
+        start = time.perf_counter()
+        for i, token in enumerate(tokens):
+            # Sleep to an absolute schedule so per-sleep overhead doesn't drift.
+            await asyncio.sleep(start + ttft + (i + 1) / tps - time.perf_counter())
+            name = None if i else info.output_tools[0].name
+            yield {0: DeltaToolCall(name=name, json_args=token)}
+
+    return FunctionModel(run, stream_function=stream)
+
+
+async def time_regular(image: bytes) -> float:
+    start = time.perf_counter()
+    await extract_receipt(image)
+    return time.perf_counter() - start
+
+
+async def time_streamed(image: bytes) -> tuple[float | None, float, int]:
+    start = time.perf_counter()
+    first_item, items = None, 0
+    async for event in stream_receipt_events(ReceiptUpload(memoryview(image))):
+        if event.startswith("event: item"):
+            items += 1
+            first_item = first_item or time.perf_counter() - start
+    return first_item, time.perf_counter() - start, items
+
+
+def blank_jpeg() -> bytes:
+    """A tiny decodable image for the stub model, which never looks at it."""
+    out = io.BytesIO()
+    Image.new("L", (8, 8), 255).save(out, format="JPEG")
+    return out.getvalue()
+
+
+async def main(args):
+    image = args.image.read_bytes() if args.image else blank_jpeg()
+    regular = await time_regular(image)
+    first_item, complete, items = await time_streamed(image)
+
+    print(f"regular run, time to complete response: {regular:6.2f}s")
+    print(f"streamed run, time to first item:       {first_item or 0:6.2f}s")
+    print(f"streamed run, time to final receipt:    {complete:6.2f}s ({items} items)")
+    if first_item:
+        print(f"first item {regular / first_item:.1f}x sooner than the full response")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--image", type=Path)
+    parser.add_argument("--items", type=int, default=25)
+    parser.add_argument("--tps", type=float, default=60)
+    parser.add_argument("--ttft", type=float, default=1.5)
+    args = parser.parse_args()
+
+    async def upload(upload):
+        return "https://example.com/receipt.jpg"
+
+    settings.OCR_CACHE_ENABLED = False
+    with patch("backend_api.receipts.aupload_receipt_image", upload):
+        if args.image:
+            asyncio.run(main(args))
+        else:
+            settings.LLM_API_KEY = settings.LLM_API_KEY or "stub"
+            settings.RECEIPT_IMAGE_PREPROCESS = False
+            model = stub_model(args.items, args.tps, args.ttft)
+            with get_receipt_agent().override(model=model):
+                asyncio.run(main(args))
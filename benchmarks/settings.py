@@ -0,0 +1,11 @@
+"""Django settings for the local benchmarks.
+
+Every external service is replaced by a local stand-in, so benchmarks never
+touch Redis, Firebase or the network: the cache is a no-op ``DummyCache`` (each
+call pays the full HTTP path being measured) and ``SETTLE_UP_BASE_URL`` is
+pointed at the stub server by each script.
+"""
+
+from settledown.settings import *  # noqa: F403
+
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
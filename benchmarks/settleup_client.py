@@ -0,0 +1,103 @@
+"""Throughput of the sync vs pooled async Settle Up client under concurrency.
+
+Both clients fetch group members from a local stub Firebase server (see
+``stub_firebase``) with the cache disabled, so every call pays the HTTP path.
+The sync client opens a new connection per call (bare ``requests``) on a thread
+pool, as the old sync views did; the async client reuses the keep-alive pool.
+
+Usage:
+    uv run python -m benchmarks.settleup_client [--requests 500] [--concurrency 20]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from backend_api.settleup_utils import (  # noqa: E402
+    AsyncSettleUpClient,
+    SettleUpClient,
+)
+from benchmarks.stub_firebase import USER_ID, run_stub_firebase  # noqa: E402
+
+FAKE_CREDS = {"localId": USER_ID, "idToken": "bench-token"}
+
+
+class BenchSettleUpClient(SettleUpClient):
+    @staticmethod
+    def _get_credentials() -> dict:
+        return FAKE_CREDS
+
+
+class BenchAsyncSettleUpClient(AsyncSettleUpClient):
+    @staticmethod
+    def _get_credentials() -> dict:
+        return FAKE_CREDS
+
+
+def bench_sync(requests: int, concurrency: int) -> float:
+    client = BenchSettleUpClient()
+    group_ids = [f"group-{i % 5}" for i in range(requests)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client.get_group_members_by_group, group_ids))
+    return time.perf_counter() - start
+
+
+async def bench_async(requests: int, concurrency: int) -> float:
+    client = BenchAsyncSettleUpClient()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(i):
+        async with semaphore:
+            await client.get_group_members_by_group(f"group-{i % 5}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(fetch(i) for i in range(requests)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds")
+    parser.add_argument(
+        "--connect-delay",
+        type=float,
+        default=0.1,
+        help="simulated TCP+TLS handshake per new connection, seconds",
+    )
+    args = parser.parse_args()
+
+    with run_stub_firebase(args.latency, args.connect_delay) as base_url:
+        settings.SETTLE_UP_BASE_URL = base_url
+        settings.HTTP_CLIENT_MAX_CONNECTIONS = args.concurrency
+
+        results = {
+            "sync (requests, thread pool)": bench_sync(args.requests, args.concurrency),
+            "async (pooled httpx)": asyncio.run(
+                bench_async(args.requests, args.concurrency)
+            ),
+        }
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    baseline = next(iter(results.values()))
+    for name, elapsed in results.items():
+        print(
+            f"{name:<30} {elapsed:7.3f}s  {args.requests / elapsed:8.1f} req/s"
+            f"  x{baseline / elapsed:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
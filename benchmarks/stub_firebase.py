@@ -0,0 +1,87 @@
+"""Local stand-in for the Settle Up Firebase REST API.
+
+Serves the handful of ``.json`` paths ``SettleUpClient`` calls, with a fixed
+per-request latency and a per-connection "handshake" delay. The latter models
+the TCP+TLS setup a real HTTPS call to Firebase pays for every new connection,
+which is exactly the cost a keep-alive pool avoids.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+USER_ID = "bench-user"
+
+
+def _make_handler(latency: float, connect_delay: float, groups: int, members: int):
+    class StubFirebaseHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+        # Headers and body go out in separate writes; without this, Nagle plus
+        # delayed ACKs stall every keep-alive response by ~40ms.
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            # One handler instance per connection: charge the handshake once.
+            time.sleep(connect_delay)
+            super().setup()
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, body):
+            time.sleep(latency)
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            kind, _, resource = path.strip("/").removesuffix(".json").partition("/")
+
+            if kind == "userGroups":
+                self._send({f"group-{i}": {"order": i} for i in range(groups)})
+            elif kind == "groups":
+                self._send({"name": f"Group {resource}"})
+            elif kind == "members":
+                self._send(
+                    {f"member-{i}": {"name": f"Member {i}"} for i in range(members)}
+                )
+            else:
+                self.send_error(404)
+
+        def _write(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            self._send({"name": f"-stub{time.time_ns()}"})
+
+        do_POST = _write
+        do_PATCH = _write
+        do_PUT = _write
+
+    return StubFirebaseHandler
+
+
+@contextmanager
+def run_stub_firebase(
+    latency: float = 0.01,
+    connect_delay: float = 0.03,
+    groups: int = 5,
+    members: int = 4,
+):
+    """Serve the stub on a free local port; yield its base URL."""
+    handler = _make_handler(latency, connect_delay, groups, members)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,72 @@
+"""Local stand-in for the receipt image hosts, Cloudinary and catbox.moe.
+
+Accepts Cloudinary's upload API (``POST /v1_1/<cloud>/image/upload``, answered
+with the ``secure_url`` the app reads) and catbox's (``POST /user/api.php``,
+answered with the URL as plain text) after a fixed latency. A fraction
+``error_rate`` of Cloudinary uploads fail with a 500, so the catbox fallback
+gets exercised too.
+
+Point the app at it with ``cloudinary.config(upload_prefix=<url>)`` and the
+``CATBOX_UPLOAD_URL=<url>/user/api.php`` setting.
+"""
+
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _make_handler(latency: float, error_rate: float):
+    class StubUploadHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latency)
+            path = self.path.split("?", 1)[0]
+            name = f"{time.time_ns()}.jpg"
+
+            if path.endswith("/image/upload"):
+                if random.random() < error_rate:
+                    body = {"error": {"message": "stub upload failure"}}
+                    self._send(500, json.dumps(body).encode(), "application/json")
+                    return
+                url = f"https://res.cloudinary.com/stub/image/upload/{name}"
+                body = json.dumps({"secure_url": url}).encode()
+                self._send(200, body, "application/json")
+            elif path == "/user/api.php":
+                self._send(
+                    200, f"https://files.catbox.moe/{name}".encode(), "text/plain"
+                )
+            else:
+                self.send_error(404)
+
+    return StubUploadHandler
+
+
+@contextmanager
+def run_stub_uploads(latency: float = 0.3, error_rate: float = 0.0):
+    """Serve the stub on a free local port; yield its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(latency, error_rate))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
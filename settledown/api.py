@@ -1,7 +1,10 @@
 from django.conf import settings
+from django.http import HttpResponse
+from ninja.errors import HttpError
 from ninja import NinjaAPI, Swagger
 from ninja.security import HttpBearer
 
+from backend_api import metrics, profiling
 from backend_api.api import router as backend_api_router
 from backend_api.settleup_api import router as settleup_api_router
 
@@ -32,3 +35,18 @@ api = NinjaAPI(auth=GlobalAuth(), docs=Swagger(settings={"persistAuthorization":
 
 api.add_router("/v1/receipts/", backend_api_router)
 api.add_router("/v1/settle-up/", settleup_api_router)
+
+
+@api.get("/metrics", include_in_schema=False)
+async def get_metrics(request):
+    """This worker's metrics in the Prometheus text format."""
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@api.get("/profiles/{profile_id}", include_in_schema=False)
+async def get_profile(request, profile_id: str):
+    """A request profile in the collapsed-stack format, for flame graph tools."""
+    profile = await profiling.get_profile(profile_id)
+    if profile is None:
+        raise HttpError(404, "Profile not found or expired")
+    return HttpResponse(profile, content_type="text/plain; charset=utf-8")
@@ -18,9 +18,59 @@ from pathlib import Path
 load_dotenv()
 
 LLM_API_KEY = os.getenv("LLM_API_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-5-mini")
+# Model cascade (see backend_api/ocr.py): when set, receipts go to this model
+# first and escalate to LLM_MODEL only when its output fails validation, looks
+# implausible, or has more than RECEIPT_CASCADE_MAX_ITEMS items.
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "")
+RECEIPT_CASCADE_MAX_ITEMS = int(os.getenv("RECEIPT_CASCADE_MAX_ITEMS", 25))
+# Hedged LLM requests (see backend_api/llm_hedging.py): a model call still
+# running past the LLM_HEDGE_PERCENTILE of recent latencies (and at least
+# LLM_HEDGE_MIN_DELAY seconds) is sent again, to LLM_HEDGE_BASE_URL if set, for
+# at most LLM_HEDGE_BUDGET extra calls per call.
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", 2.0))
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", 0.05))
+LLM_HEDGE_BASE_URL = os.getenv("LLM_HEDGE_BASE_URL")
+LLM_HEDGE_API_KEY = os.getenv("LLM_HEDGE_API_KEY")
 CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
 CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
 CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME", "dpbqobzo9")
+# Fallback image host when a Cloudinary upload fails.
+CATBOX_UPLOAD_URL = os.getenv("CATBOX_UPLOAD_URL", "https://catbox.moe/user/api.php")
+UPLOAD_MAX_WORKERS = int(os.getenv("UPLOAD_MAX_WORKERS", 8))
+
+# Uploaded receipts larger than this are rejected with 413; past the spool
+# threshold Django writes them to a temp file, which the view mmaps (see
+# backend_api/uploads.py) instead of reading into memory.
+RECEIPT_UPLOAD_MAX_BYTES = int(os.getenv("RECEIPT_UPLOAD_MAX_BYTES", 20 * 2**20))
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(
+    os.getenv("FILE_UPLOAD_MAX_MEMORY_SIZE", 2_621_440)  # Django's default, 2.5MB
+)
+
+# Batch OCR: most images per request, and most LLM extractions in flight per
+# batch (image uploads are bounded by UPLOAD_MAX_WORKERS).
+RECEIPT_BATCH_MAX_FILES = int(os.getenv("RECEIPT_BATCH_MAX_FILES", 20))
+RECEIPT_BATCH_LLM_CONCURRENCY = int(os.getenv("RECEIPT_BATCH_LLM_CONCURRENCY", 4))
+
+# Asynchronous OCR jobs (see backend_api/ocr_jobs.py): how long job records and
+# images live, jobs each `manage.py ocr_worker` runs at once, and how often the
+# SSE stream checks a job for updates.
+OCR_JOB_TIMEOUT = int(os.getenv("OCR_JOB_TIMEOUT", 24 * 60 * 60))
+OCR_WORKER_CONCURRENCY = int(os.getenv("OCR_WORKER_CONCURRENCY", 4))
+OCR_JOB_POLL_INTERVAL = float(os.getenv("OCR_JOB_POLL_INTERVAL", 0.5))
+
+# Receipt image preprocessing before LLM submission (see
+# backend_api/image_preprocessing.py).
+RECEIPT_IMAGE_PREPROCESS = (
+    os.getenv("RECEIPT_IMAGE_PREPROCESS", "true").lower() == "true"
+)
+RECEIPT_IMAGE_MAX_EDGE = int(os.getenv("RECEIPT_IMAGE_MAX_EDGE", 1600))
+RECEIPT_IMAGE_JPEG_QUALITY = int(os.getenv("RECEIPT_IMAGE_JPEG_QUALITY", 85))
+# Retry receipts that fail validation with only the part of the image the fix
+# needs (see backend_api/receipt_repair.py) instead of the whole image again.
+RECEIPT_REPAIR_ENABLED = os.getenv("RECEIPT_REPAIR_ENABLED", "true").lower() == "true"
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,6 +101,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so a profiled request includes the other middleware.
+    "backend_api.profiling.RequestProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -152,7 +204,52 @@ SETTLE_UP_CONFIG = {
 }
 SETTLE_UP_USER = os.getenv("SETTLE_UP_USER")
 SETTLE_UP_PASSWORD = os.getenv("SETTLE_UP_PASSWORD")
+# Renew the Firebase id token this many seconds before it expires.
+SETTLE_UP_TOKEN_REFRESH_MARGIN = int(os.getenv("SETTLE_UP_TOKEN_REFRESH_MARGIN", 300))
 SETTLE_UP_BASE_URL = f"https://{os.getenv('SETTLE_UP_API_DOMAIN')}"
+SETTLE_UP_GROUP_FETCH_CONCURRENCY = int(
+    os.getenv("SETTLE_UP_GROUP_FETCH_CONCURRENCY", 8)
+)
+# Most transactions POST /settle-up/transactions/batch/ accepts in one request.
+SETTLE_UP_TRANSACTION_BATCH_MAX = int(os.getenv("SETTLE_UP_TRANSACTION_BATCH_MAX", 100))
+# Settle Up groups and members are served from the cache stale-while-revalidate:
+# past the soft TTL the cached copy is returned and refreshed in the background;
+# past the hard TTL it is gone and the next request fetches inline.
+SETTLE_UP_CACHE_SOFT_TTL = int(os.getenv("SETTLE_UP_CACHE_SOFT_TTL", 60 * 10))
+SETTLE_UP_CACHE_HARD_TTL = int(os.getenv("SETTLE_UP_CACHE_HARD_TTL", 86500))
+# Each worker also keeps up to SETTLE_UP_L1_MAX_ENTRIES of them in memory for
+# SETTLE_UP_L1_TTL seconds (0 entries disables this), and notices another
+# worker's refresh or invalidation within SETTLE_UP_L1_VERSION_CHECK_INTERVAL.
+SETTLE_UP_L1_MAX_ENTRIES = int(os.getenv("SETTLE_UP_L1_MAX_ENTRIES", 256))
+SETTLE_UP_L1_TTL = float(os.getenv("SETTLE_UP_L1_TTL", 30))
+SETTLE_UP_L1_VERSION_CHECK_INTERVAL = float(
+    os.getenv("SETTLE_UP_L1_VERSION_CHECK_INTERVAL", 1)
+)
+# How long a posted transaction's outcome is remembered for retries (by
+# Idempotency-Key, or by payload hash without one), and how long a duplicate
+# waits on the in-flight original before giving up with 409.
+TRANSACTION_IDEMPOTENCY_TIMEOUT = int(
+    os.getenv("TRANSACTION_IDEMPOTENCY_TIMEOUT", 60 * 60 * 24)
+)
+TRANSACTION_IDEMPOTENCY_PAYLOAD_TIMEOUT = int(
+    os.getenv("TRANSACTION_IDEMPOTENCY_PAYLOAD_TIMEOUT", 60 * 10)
+)
+TRANSACTION_IDEMPOTENCY_LOCK_TIMEOUT = int(
+    os.getenv("TRANSACTION_IDEMPOTENCY_LOCK_TIMEOUT", 30)
+)
+
+# Opt-in profiling of single requests (see backend_api/profiling.py): off
+# removes the middleware; sampling period in seconds, and how long profiles
+# are kept in Redis.
+REQUEST_PROFILING_ENABLED = (
+    os.getenv("REQUEST_PROFILING_ENABLED", "false").lower() == "true"
+)
+REQUEST_PROFILE_INTERVAL = float(os.getenv("REQUEST_PROFILE_INTERVAL", 0.005))
+REQUEST_PROFILE_TIMEOUT = int(os.getenv("REQUEST_PROFILE_TIMEOUT", 24 * 60 * 60))
+
+# Shared keep-alive pool for outbound async HTTP (see backend_api/http_client.py).
+HTTP_CLIENT_TIMEOUT = float(os.getenv("HTTP_CLIENT_TIMEOUT", 10))
+HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", 20))
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/1")
 APP_AUTH = os.getenv("APP_AUTH")
@@ -163,6 +260,26 @@ CACHES = {
         "LOCATION": REDIS_URL,
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            # orjson with tagged pydantic models (see backend_api/cache_serializer.py),
+            # compressed from CACHE_COMPRESS_MIN_LENGTH bytes up.
+            "SERIALIZER": "backend_api.cache_serializer.CacheSerializer",
+            "COMPRESSOR": "backend_api.cache_serializer.ThresholdCompressor",
+            "COMPRESSOR_BACKEND": os.getenv(
+                "CACHE_COMPRESSOR", "django_redis.compressors.zlib.ZlibCompressor"
+            ),
+            "COMPRESS_MIN_LENGTH": int(os.getenv("CACHE_COMPRESS_MIN_LENGTH", 1024)),
         },
     }
 }
+
+# Content-addressed OCR result cache (see backend_api/ocr_cache.py).
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+OCR_CACHE_TIMEOUT = int(os.getenv("OCR_CACHE_TIMEOUT", 7 * 24 * 60 * 60))
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", 5000))
+
+# Japanese-to-English translation cache for the agent's tool (see
+# backend_api/translation.py).
+TRANSLATION_CACHE_TIMEOUT = int(
+    os.getenv("TRANSLATION_CACHE_TIMEOUT", 90 * 24 * 60 * 60)
+)
+TRANSLATION_MAX_CONCURRENCY = int(os.getenv("TRANSLATION_MAX_CONCURRENCY", 4))